@@ -0,0 +1,77 @@
+"""
+Time CfdReport.report, and the CfdPlot image, on a synthetic board.
+
+    python -m benchmarks.bench_cfd --transitions 500000 --image cfd.png
+"""
+import argparse
+import random
+import time
+
+from jamp.plot import CfdPlot
+from jamp.resources import CfdReport
+
+FIRST_CHANGE_TIME = 1615964978673  # ms, the first change in tests/test_data/mock_cfd.json
+
+
+def synthetic_cfd(transitions: int, columns: int = 5, seed: int = 0) -> dict:
+    """
+    Build a cumulativeflowdiagram payload in the shape of mock_cfd.json where
+    issues are created into the first column and move randomly between columns.
+    """
+    rnd = random.Random(seed)
+    column_changes = {}
+    current = {}
+    timestamp = FIRST_CHANGE_TIME
+    issues = max(1, transitions // 4)
+
+    for _ in range(transitions):
+        timestamp += rnd.randint(1, 60000)
+        key = f'SYN-{rnd.randint(1, issues)}'
+        change = {'key': key}
+        if key in current:
+            change['columnFrom'] = current[key]
+            column_to = rnd.randrange(columns)
+        else:
+            column_to = 0
+        change['columnTo'] = column_to
+        change['statusTo'] = str(10000 + column_to)
+        current[key] = column_to
+        column_changes.setdefault(str(timestamp), []).append(change)
+
+    return {'id': 1,
+            'columns': [{'name': f'Column {i}'} for i in range(columns)],
+            'columnChanges': column_changes,
+            'firstChangeTime': FIRST_CHANGE_TIME,
+            'now': timestamp}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark CfdReport.report')
+    parser.add_argument('--transitions', type=int, default=500000)
+    parser.add_argument('--columns', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--image', type=str,
+                        help='also time drawing the cumulative flow diagram to this file')
+    args = parser.parse_args()
+
+    raw = synthetic_cfd(args.transitions, args.columns)
+    options = {'agile_rest_path': None, 'server': 'localhost', 'agile_rest_api_version': '2'}
+
+    for i in range(args.repeat):
+        start = time.perf_counter()
+        cfd = CfdReport(options=options, session=None, raw=raw,
+                        config={'currentViewConfig': {'name': 'Synthetic board'}})
+        parsed = time.perf_counter()
+        df = cfd.report()
+        done = time.perf_counter()
+        print(f'run {i + 1}: parse {parsed - start:.3f}s, report {done - parsed:.3f}s '
+              f'({len(df)} rows x {len(df.columns)} columns)')
+
+        if args.image:
+            start = time.perf_counter()
+            CfdPlot().plot(cfd, args.image)
+            print(f'run {i + 1}: plot {time.perf_counter() - start:.3f}s')
+
+
+if __name__ == "__main__":
+    main()
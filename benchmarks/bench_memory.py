@@ -0,0 +1,85 @@
+"""
+Compare the peak RSS of keeping full SprintReports against keeping SprintSummaries
+for a program-wide extract.
+
+    python -m benchmarks.bench_memory --sprints 5000
+
+Each mode runs in its own interpreter so the peaks don't mix.
+"""
+import argparse
+import copy
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from jira import JIRA
+
+import jamp
+from jamp.resources import SprintReport, SprintSummary
+
+SERVER = 'https://localhost'
+SPRINT_REPORT_JSON = os.path.join(os.path.dirname(__file__), os.pardir,
+                                  'tests', 'test_data', 'mock_av_sprint_6_report_1067.json')
+MODES = ('reports', 'summaries')
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def extract(mode: str, sprints: int) -> list:
+    """
+    Build one report per sprint from a fresh copy of the json, as if each had been
+    fetched, and keep whatever build_report would hold on to.
+    """
+    with open(SPRINT_REPORT_JSON) as f:
+        text = f.read()
+
+    options = copy.deepcopy(JIRA.DEFAULT_OPTIONS)
+    options['server'] = SERVER
+    jamp.FIELD_MAPS.get(SERVER, lambda: {'Story Points': 'customfield_10111'})
+
+    kept = []
+    for sprint_id in range(sprints):
+        raw = json.loads(text)
+        raw['id'] = sprint_id
+        sr = SprintReport(options=dict(options), session=None, raw=raw, added_sum=0)
+        kept.append(sr if mode == 'reports' else SprintSummary.from_report(sr))
+    return kept
+
+
+def run_mode(mode: str, sprints: int) -> None:
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    kept = extract(mode, sprints)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({'mode': mode, 'sprints': len(kept), 'seconds': elapsed,
+                      'baseline_mb': baseline, 'peak_mb': peak_rss_mb()}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark sprint report memory')
+    parser.add_argument('--sprints', type=int, default=5000)
+    parser.add_argument('--mode', choices=MODES, help='run a single mode in this process')
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.sprints)
+        return
+
+    for mode in MODES:
+        result = subprocess.run([sys.executable, '-m', 'benchmarks.bench_memory',
+                                 '--mode', mode, '--sprints', str(args.sprints)],
+                                check=True, capture_output=True, text=True)
+        r = json.loads(result.stdout.splitlines()[-1])
+        print(f"{r['mode']:>9}: {r['sprints']} sprints, peak RSS {r['peak_mb']:.1f} MB "
+              f"(+{r['peak_mb'] - r['baseline_mb']:.1f} MB), {r['seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
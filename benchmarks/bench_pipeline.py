@@ -0,0 +1,195 @@
+"""
+pytest-benchmark suite over the report pipeline's hot paths, on small, medium
+and large synthetic programs (benchmarks.synthetic).
+
+    python -m pytest benchmarks/bench_pipeline.py
+
+Timings only compare on the same machine, so baselines are not tracked (git
+ignores benchmarks/baselines).  Save one from the unchanged tree, then compare a
+change against it, failing if any mean is 20% slower:
+
+    python -m pytest benchmarks/bench_pipeline.py --benchmark-storage=benchmarks/baselines --benchmark-autosave
+    python -m pytest benchmarks/bench_pipeline.py --benchmark-storage=benchmarks/baselines \\
+        --benchmark-compare --benchmark-compare-fail=mean:20%
+
+Add -k small (or medium, large) to run one size.
+"""
+import os
+import sys
+from unittest.mock import patch
+
+import matplotlib.pyplot as plt
+import pytest
+from jira.resources import Board, Sprint
+
+from auth import JIRA_PASSWORD_ENV
+from benchmarks.bench_cfd import synthetic_cfd
+from benchmarks.standin import story_points, STORY_POINTS_FIELD
+from benchmarks.synthetic import SyntheticProgram
+from jamp import FIELD_MAPS
+from jamp.client import _sprint_report_json
+from jamp.export import ReportOutput
+from jamp.plot import MetricPlot
+from jamp.resources import SprintReport, VelocityReport, CfdReport
+from metrics import JiraProgramMetrics
+
+BENCH_SERVER = 'http://bench.invalid'
+
+# boards x sprints x issues per sprint, and column changes for CfdReport.report
+DATASETS = {'small': {'boards': 1, 'sprints': 6, 'issues': 10, 'cfd_transitions': 10000},
+            'medium': {'boards': 4, 'sprints': 26, 'issues': 50, 'cfd_transitions': 100000},
+            'large': {'boards': 8, 'sprints': 26, 'issues': 100, 'cfd_transitions': 1000000}}
+
+
+def _options(agile_rest_path=None) -> dict:
+    return {'agile_rest_path': agile_rest_path, 'server': BENCH_SERVER, 'agile_rest_api_version': '2'}
+
+
+class Dataset:
+    """The payloads of one synthetic program, generated once per session."""
+
+    def __init__(self, boards: int, sprints: int, issues: int, cfd_transitions: int):
+        self.program = SyntheticProgram(boards=boards, sprints=sprints, issues=issues)
+
+        self.boards = self.program.boards()
+        self.sprints = {board['id']: self.program.sprints(board['id']) for board in self.boards}
+        self.sprint_reports = {}
+        self.added_sums = {}
+        for board_id, sprints in self.sprints.items():
+            for sprint in sprints:
+                raw = _sprint_report_json(self.program.sprint_report(board_id, sprint['id']),
+                                          board_id, sprint['id'])
+                self.sprint_reports[sprint['id']] = raw
+                self.added_sums[sprint['id']] = sum(
+                    story_points(key) for key in raw['contents']['issueKeysAddedDuringSprint'])
+
+        self.velocity = {board['id']: dict(self.program.velocity(board['id']), id=board['id'])
+                         for board in self.boards}
+        self.board_cfd = dict(self.program.cfd(1), id=1)
+        self.cfd = dict(synthetic_cfd(cfd_transitions), id=1)
+
+    def sprint_report(self, board_id, sprint_id) -> SprintReport:
+        return SprintReport(_options(), None, self.sprint_reports[sprint_id],
+                            added_sum=self.added_sums[sprint_id])
+
+    def velocity_report(self, board_id, **kwargs) -> VelocityReport:
+        return VelocityReport(_options(), None, self.velocity[board_id])
+
+
+class StubJira:
+    """boards() and sprints() from a Dataset, as jira resources."""
+
+    def __init__(self, dataset: Dataset):
+        self._boards = [Board(_options('agile'), None, dict(board, self=f'{BENCH_SERVER}/board'))
+                        for board in dataset.boards]
+        self._sprints = {board_id: [Sprint(_options('agile'), None, dict(sprint, self=f'{BENCH_SERVER}/sprint'))
+                                    for sprint in sprints]
+                         for board_id, sprints in dataset.sprints.items()}
+
+    def boards(self, **kwargs):
+        return self._boards
+
+    def sprints(self, board_id, **kwargs):
+        return self._sprints[board_id]
+
+
+@pytest.fixture(scope='session', autouse=True)
+def field_map():
+    # Every SprintReport looks up the story points field; serve it from the registry
+    FIELD_MAPS.get(BENCH_SERVER, lambda: {'Story Points': STORY_POINTS_FIELD})
+
+
+@pytest.fixture(scope='session', params=list(DATASETS))
+def dataset(request):
+    return Dataset(**DATASETS[request.param])
+
+
+@pytest.fixture
+def sprint_raw(dataset):
+    """The sprint with the most issues."""
+    return max(dataset.sprint_reports.values(),
+               key=lambda raw: sum(len(value) for value in raw['contents'].values()
+                                   if isinstance(value, list)))
+
+
+@pytest.fixture
+def metrics(dataset, tmp_path):
+    args = ['metrics.py',
+            '--user', 'bench',
+            '--server', BENCH_SERVER,
+            '--file', str(tmp_path / 'sprints.xlsx'),
+            '--image', str(tmp_path / 'sprints.png')]
+    with patch.object(sys, 'argv', args), patch.dict(os.environ, {JIRA_PASSWORD_ENV: 'bench'}), \
+            patch('metrics.JIRA'), patch('metrics.JIRAReports'), patch('metrics.JiraFieldMapper'):
+        pm = JiraProgramMetrics()
+
+    pm.jira_client = StubJira(dataset)
+    pm.reports_client = dataset
+    return pm
+
+
+@pytest.fixture
+def sprint_frame(metrics):
+    return metrics.build_report()
+
+
+def test_sprint_report_parse(benchmark, sprint_raw):
+    added_sum = sum(story_points(key) for key in sprint_raw['contents']['issueKeysAddedDuringSprint'])
+    sr = benchmark(SprintReport, _options(), None, sprint_raw, added_sum=added_sum)
+    assert sr.committed > 0
+
+
+def test_sprint_report_committed(benchmark, sprint_raw):
+    sr = SprintReport(_options(), None, sprint_raw, added_sum=0.0)
+
+    def committed():
+        return sr._committed_sum(), sr._added_initial_estimate_sum()
+
+    assert (sr.committed, sr.issues_added_initial_estimate_sum) == benchmark(committed)
+
+
+def test_velocity_lookups(benchmark, dataset):
+    vr = dataset.velocity_report(1)
+    sprint_ids = [sprint['id'] for sprint in dataset.sprints[1]]
+
+    def lookups():
+        return [(vr.committed(sprint_id), vr.completed(sprint_id)) for sprint_id in sprint_ids]
+
+    assert len(sprint_ids) == len(benchmark(lookups))
+
+
+def test_cfd_report(benchmark, dataset):
+    df = benchmark(lambda: CfdReport(_options(), None, dataset.cfd).report())
+    assert len(df) == sum(len(value) for value in dataset.cfd['columnChanges'].values())
+
+
+def test_build_report(benchmark, metrics, dataset):
+    df = benchmark(metrics.build_report)
+    assert len(dataset.sprint_reports) == len(df)
+
+
+def test_metric_plot(benchmark, sprint_frame, tmp_path):
+    plotter = MetricPlot(str(tmp_path / 'sprints.png'))
+
+    def plot():
+        plotter.plot(sprint_frame)
+        plt.close('all')
+
+    benchmark(plot)
+
+
+def test_sprint_report_xlsx(benchmark, metrics, sprint_frame):
+    benchmark(metrics.build_sprint_report, sprint_frame)
+    assert os.path.getsize(metrics._args.file) > 0
+
+
+def test_cfd_report_xlsx(benchmark, metrics, dataset, tmp_path):
+    df = CfdReport(_options(), None, dataset.board_cfd).report()
+    filename = str(tmp_path / 'cfd.xlsx')
+
+    def write():
+        with ReportOutput(filename) as output:
+            output.add_table('CFD Board 1').write(df)
+
+    benchmark(write)
+    assert os.path.getsize(filename) > 0
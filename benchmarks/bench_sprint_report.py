@@ -0,0 +1,43 @@
+"""
+Time the SprintReport attribute reads made for every row of build_report.
+
+    python -m pytest -s benchmarks/bench_sprint_report.py
+"""
+import timeit
+
+from jamp.resources import SprintReport
+
+READS = 100000
+
+HOT_ATTRIBUTES = ('completedIssuesEstimateSum',
+                  'puntedIssuesEstimateSum',
+                  'issuesNotCompletedEstimateSum',
+                  'puntedIssuesCount',
+                  'issuesNotCompletedInCurrentSprintCount',
+                  'completedIssuesCount',
+                  'committed',
+                  'committed_count',
+                  'added_count')
+
+
+def test_bench_sprint_report_reads(sprint_report):
+    def reads():
+        for item in HOT_ATTRIBUTES:
+            getattr(sprint_report, item)
+
+    def getattr_reads():
+        # What every read cost when it went through __getattr__
+        for item in HOT_ATTRIBUTES:
+            if item in sprint_report.__dict__:
+                SprintReport.__getattr__(sprint_report, item)
+            else:
+                getattr(sprint_report, item)
+
+    fast = min(timeit.repeat(reads, number=READS // len(HOT_ATTRIBUTES), repeat=3))
+    slow = min(timeit.repeat(getattr_reads, number=READS // len(HOT_ATTRIBUTES), repeat=3))
+    print(f'\n{READS} reads: {fast * 1000:.1f} ms precomputed, '
+          f'{slow * 1000:.1f} ms through __getattr__ ({slow / fast:.1f}x)')
+
+    for item in HOT_ATTRIBUTES:
+        if item in sprint_report.__dict__:
+            assert SprintReport.__getattr__(sprint_report, item) == getattr(sprint_report, item)
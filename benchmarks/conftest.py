@@ -0,0 +1,2 @@
+# Make the test fixtures (sprint_report, mock_cfd, ...) available to the benchmarks
+from tests.conftest import *  # noqa: F401,F403
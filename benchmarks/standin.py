@@ -0,0 +1,456 @@
+"""
+A local stand-in for the Jira REST, agile and greenhopper endpoints jamp uses,
+so metrics.py can be load tested and benchmarked with no network.
+
+    python -m benchmarks.standin --boards 20 --sprints 26 --latency 0.05 --port 8008
+    JIRA_PASSWORD=x python metrics.py --server http://127.0.0.1:8008 --user bench \\
+        --board Board --file program.xlsx --image program.png --workers 8
+
+The server answers from a program object (ReplayProgram here, or the
+generator in benchmarks.synthetic) that supplies the JSON shapes found in
+tests/test_data.  Every response can be delayed, and a share of them
+replaced with 429 (with Retry-After) or 500 errors.
+"""
+import argparse
+import copy
+import json
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from benchmarks.bench_cfd import synthetic_cfd
+from jamp import VELOCITY_PARM_DATE_FORMAT
+
+TEST_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             'tests', 'test_data')
+
+SPRINT_REPORT_TEMPLATES = ('mock_av_sprint_1_report_1058.json',
+                           'mock_av_sprint_2_report_1059.json',
+                           'mock_av_sprint_6_report_1067.json')
+
+STORY_POINTS_FIELD = 'customfield_10030'
+FIELD_NAMES = {'summary': 'Summary',
+               'status': 'Status',
+               'customfield_10020': 'Sprint',
+               STORY_POINTS_FIELD: 'Story Points'}
+
+SERVER_VERSION = [8, 13, 0]
+DEFAULT_PAGE_SIZE = 50
+SPRINT_DAYS = 14
+PROGRAM_START = datetime(2020, 1, 6, 9, 0)
+
+AGILE_DATE_FORMAT = '%Y-%m-%dT%H:%M:%S.000+0000'
+GREENHOPPER_DATE_FORMAT = '%d/%b/%y %I:%M %p'
+
+KEY_IN_JQL = re.compile(r'key\s+in\s*\(([^)]*)\)', re.IGNORECASE)
+
+
+def load_test_data(name: str):
+    with open(os.path.join(TEST_DATA_DIR, name)) as f:
+        return json.load(f)
+
+
+def story_points(issue_key: str) -> float:
+    """The same 1..8 points for an issue key on every run."""
+    return float(zlib.crc32(issue_key.encode()) % 8 + 1)
+
+
+def _stat(value) -> dict:
+    if value is None:
+        return {'text': 'null'}
+    return {'value': float(value), 'text': str(float(value))}
+
+
+def _parse_velocity_date(value: str):
+    try:
+        return datetime.strptime(value.rstrip('Z'), VELOCITY_PARM_DATE_FORMAT)
+    except (AttributeError, ValueError):
+        return None
+
+
+class ReplayProgram:
+    """
+    The fixture payloads replayed across boards x sprints.  Each sprint report is
+    a copy of one of the mock_av_sprint_* reports with the sprint rewritten, and
+    each board's CFD is synthesized with 'cfd_transitions' column changes.
+
+    Programs are duck typed; the stand-in server needs boards(), sprints(),
+    sprint_report(), velocity(), board_config(), cfd(), field_names(),
+    issues() and teams().
+    """
+
+    def __init__(self, boards: int = 1, sprints: int = 6, cfd_transitions: int = 1000):
+        self._boards = boards
+        self._sprints = sprints
+        self._cfd_transitions = cfd_transitions
+        self._templates = [load_test_data(name) for name in SPRINT_REPORT_TEMPLATES]
+        self._config = load_test_data('mock_board_config.json')
+        self._teams = load_test_data('mock_teams.json')
+
+    @staticmethod
+    def board_name(board_id: int) -> str:
+        return f'Board {board_id}'
+
+    @staticmethod
+    def sprint_id(board_id: int, index: int) -> int:
+        return board_id * 1000 + index
+
+    def _sprint_dates(self, index: int) -> tuple:
+        start = PROGRAM_START + timedelta(days=SPRINT_DAYS * index)
+        return start, start + timedelta(days=SPRINT_DAYS)
+
+    def _sprint_state(self, index: int) -> str:
+        return 'active' if index == self._sprints - 1 else 'closed'
+
+    def _find_sprint(self, board_id: int, sprint_id: int):
+        index = sprint_id - board_id * 1000
+        if not 1 <= board_id <= self._boards or not 0 <= index < self._sprints:
+            return None
+        return index
+
+    def boards(self) -> list:
+        return [{'id': board_id, 'name': self.board_name(board_id), 'type': 'scrum'}
+                for board_id in range(1, self._boards + 1)]
+
+    def sprints(self, board_id: int):
+        if not 1 <= board_id <= self._boards:
+            return None
+
+        sprints = []
+        for index in range(self._sprints):
+            start, end = self._sprint_dates(index)
+            sprint = {'id': self.sprint_id(board_id, index),
+                      'state': self._sprint_state(index),
+                      'name': f'{self.board_name(board_id)} Sprint {index + 1}',
+                      'startDate': start.strftime(AGILE_DATE_FORMAT),
+                      'endDate': end.strftime(AGILE_DATE_FORMAT),
+                      'originBoardId': board_id}
+            if sprint['state'] == 'closed':
+                sprint['completeDate'] = sprint['endDate']
+            sprints.append(sprint)
+        return sprints
+
+    def sprint_report(self, board_id: int, sprint_id: int):
+        index = self._find_sprint(board_id, sprint_id)
+        if index is None:
+            return None
+
+        report = copy.deepcopy(self._templates[index % len(self._templates)])
+        start, end = self._sprint_dates(index)
+        state = self._sprint_state(index).upper()
+        report['sprint'].update({'id': sprint_id,
+                                 'sequence': sprint_id,
+                                 'name': f'{self.board_name(board_id)} Sprint {index + 1}',
+                                 'state': state,
+                                 'startDate': start.strftime(GREENHOPPER_DATE_FORMAT),
+                                 'endDate': end.strftime(GREENHOPPER_DATE_FORMAT),
+                                 'completeDate': end.strftime(GREENHOPPER_DATE_FORMAT)
+                                 if state == 'CLOSED' else ''})
+        return report
+
+    def velocity(self, board_id: int, finished_after: datetime = None, finished_before: datetime = None):
+        if not 1 <= board_id <= self._boards:
+            return None
+
+        sprints = []
+        entries = {}
+        for index in range(self._sprints):
+            _, end = self._sprint_dates(index)
+            if self._sprint_state(index) != 'closed' or \
+                    (finished_after and end < finished_after) or \
+                    (finished_before and end > finished_before):
+                continue
+
+            sprint_id = self.sprint_id(board_id, index)
+            contents = self._templates[index % len(self._templates)]['contents']
+            sprints.append({'id': sprint_id, 'sequence': sprint_id,
+                            'name': f'{self.board_name(board_id)} Sprint {index + 1}',
+                            'state': 'CLOSED'})
+            entries[str(sprint_id)] = {
+                'estimated': _stat(contents['allIssuesEstimateSum'].get('value', 0.0)),
+                'completed': _stat(contents['completedIssuesEstimateSum'].get('value', 0.0))}
+
+        # Newest first, as Jira returns them
+        return {'sprints': sprints[::-1], 'velocityStatEntries': entries}
+
+    def board_config(self, board_id: int):
+        if not 1 <= board_id <= self._boards:
+            return None
+
+        config = copy.deepcopy(self._config)
+        config['currentViewConfig'].update({'id': board_id, 'name': self.board_name(board_id)})
+        return config
+
+    def cfd(self, board_id: int):
+        if not 1 <= board_id <= self._boards:
+            return None
+
+        columns = len(self._config['currentViewConfig']['columns'])
+        return synthetic_cfd(self._cfd_transitions, columns, seed=board_id)
+
+    def field_names(self) -> dict:
+        return dict(FIELD_NAMES)
+
+    def issues(self, issue_keys: list) -> list:
+        return [{'key': issue_key, 'fields': {STORY_POINTS_FIELD: story_points(issue_key)}}
+                for issue_key in issue_keys]
+
+    def teams(self) -> list:
+        return copy.deepcopy(self._teams)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive, so the clients' pooled connections are exercised
+    protocol_version = 'HTTP/1.1'
+
+    routes = (
+        (re.compile(r'/rest/api/2/serverInfo$'), 'server_info'),
+        (re.compile(r'/rest/api/2/field$'), 'fields'),
+        (re.compile(r'/rest/api/2/search$'), 'search'),
+        (re.compile(r'/rest/agile/1\.0/board$'), 'boards'),
+        (re.compile(r'/rest/agile/1\.0/board/(\d+)/sprint$'), 'sprints'),
+        (re.compile(r'/rest/greenhopper/1\.0/rapid/charts/sprintreport$'), 'sprint_report'),
+        (re.compile(r'/rest/greenhopper/1\.0/rapid/charts/velocity\.json$'), 'velocity'),
+        (re.compile(r'/rest/greenhopper/1\.0/xboard/config\.json$'), 'board_config'),
+        (re.compile(r'/rest/greenhopper/1\.0/rapid/charts/cumulativeflowdiagram$'), 'cfd'),
+        (re.compile(r'/rest/teams-api/1\.0/team$'), 'teams'),
+    )
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        for pattern, endpoint in self.routes:
+            match = pattern.match(url.path)
+            if match:
+                break
+        else:
+            endpoint, match = None, None
+
+        self.server.standin.handle(self, endpoint, match.groups() if match else (), params)
+
+    def send_json(self, status: int, body, headers: dict = None) -> int:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json;charset=UTF-8')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+        return len(payload)
+
+
+class StandinServer:
+    """
+    Serve a program on 127.0.0.1 from a background thread.
+
+        with StandinServer(ReplayProgram(boards=10), latency=0.05, throttle_rate=0.01) as server:
+            jira = JIRA(server.url, basic_auth=('bench', 'x'), options={'agile_rest_path': 'agile'})
+
+    :param latency: seconds added to every response
+    :param jitter: up to this many seconds more, chosen at random per response
+    :param throttle_rate: share of requests answered 429 with a Retry-After header
+    :param error_rate: share of requests answered 500
+    :param retry_after: Retry-After seconds sent with a 429
+    :param seed: seed for the jitter and the injected failures
+    """
+
+    def __init__(self, program, port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 throttle_rate: float = 0.0, error_rate: float = 0.0, retry_after: int = 1,
+                 seed: int = 0):
+        self.program = program
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = Counter()
+        self.statuses = Counter()
+        self.bytes_sent = 0
+
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.standin = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self._httpd.server_address[1]}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _draw(self) -> tuple:
+        with self._lock:
+            delay = self.latency + self._random.random() * self.jitter
+            failure = self._random.random()
+        return delay, failure
+
+    def _record(self, endpoint: str, status: int, sent: int) -> None:
+        with self._lock:
+            self.requests[endpoint] += 1
+            self.statuses[status] += 1
+            self.bytes_sent += sent
+
+    def handle(self, request: _Handler, endpoint: str, args: tuple, params: dict) -> None:
+        delay, failure = self._draw()
+        if delay:
+            time.sleep(delay)
+
+        headers = None
+        if endpoint is None:
+            status, body = 404, {'errorMessages': [f'No stand-in for {request.path}']}
+        elif failure < self.throttle_rate:
+            status, body = 429, {'errorMessages': ['Rate limit exceeded.']}
+            headers = {'Retry-After': str(self.retry_after)}
+        elif failure < self.throttle_rate + self.error_rate:
+            status, body = 500, {'errorMessages': ['Internal server error (injected).']}
+        else:
+            body = getattr(self, f'_{endpoint}')(params, *args)
+            status = 200
+            if body is None:
+                status, body = 404, {'errorMessages': ['Not found.']}
+
+        self._record(endpoint or 'unknown', status, request.send_json(status, body, headers))
+
+    @staticmethod
+    def _page(values: list, params: dict) -> dict:
+        start_at = int(params.get('startAt', 0))
+        max_results = int(params.get('maxResults', DEFAULT_PAGE_SIZE))
+        page = values[start_at:start_at + max_results]
+        return {'maxResults': max_results,
+                'startAt': start_at,
+                'total': len(values),
+                'isLast': start_at + len(page) >= len(values),
+                'values': page}
+
+    def _server_info(self, params):
+        return {'baseUrl': self.url,
+                'version': '.'.join(str(number) for number in SERVER_VERSION),
+                'versionNumbers': SERVER_VERSION,
+                'deploymentType': 'Server',
+                'serverTitle': 'jamp stand-in'}
+
+    def _fields(self, params):
+        return [{'id': field_id, 'name': name, 'custom': field_id.startswith('customfield_'),
+                 'clauseNames': [name.lower()]}
+                for field_id, name in self.program.field_names().items()]
+
+    def _search(self, params):
+        if 'names' in params.get('expand', ''):
+            return {'startAt': 0, 'maxResults': 1, 'total': 0, 'issues': [],
+                    'names': self.program.field_names()}
+
+        match = KEY_IN_JQL.search(params.get('jql', ''))
+        keys = [key.strip() for key in match.group(1).split(',') if key.strip()] if match else []
+        issues = self.program.issues(keys)
+        return {'startAt': 0, 'maxResults': len(issues), 'total': len(issues), 'issues': issues}
+
+    def _with_self(self, values: list, path: str) -> list:
+        # The agile API links every board and sprint to itself, and jira's
+        # ...Board/Sprint resources rely on it
+        return [dict(value, self=f'{self.url}/rest/agile/1.0/{path}/{value["id"]}') for value in values]
+
+    def _boards(self, params):
+        return self._page(self._with_self(self.program.boards(), 'board'), params)
+
+    def _sprints(self, params, board_id):
+        sprints = self.program.sprints(int(board_id))
+        return None if sprints is None else self._page(self._with_self(sprints, 'sprint'), params)
+
+    def _sprint_report(self, params):
+        return self.program.sprint_report(int(params.get('rapidViewId', 0)),
+                                          int(params.get('sprintId', 0)))
+
+    def _velocity(self, params):
+        return self.program.velocity(int(params.get('rapidViewId', 0)),
+                                     _parse_velocity_date(params.get('sprintsFinishedAfter')),
+                                     _parse_velocity_date(params.get('sprintsFinishedBefore')))
+
+    def _board_config(self, params):
+        return self.program.board_config(int(params.get('rapidViewId', 0)))
+
+    def _cfd(self, params):
+        return self.program.cfd(int(params.get('rapidViewId', 0)))
+
+    def _teams(self, params):
+        return self.program.teams()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a stand-in Jira for metrics.py')
+    parser.add_argument('--port', type=int, default=8008)
+    parser.add_argument('--boards', type=int, default=10)
+    parser.add_argument('--sprints', type=int, default=26,
+                        help='sprints per board')
+    parser.add_argument('--cfd_transitions', type=int, default=10000,
+                        help='column changes in each board\'s CFD')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help='up to this many random seconds more per response')
+    parser.add_argument('--throttle_rate', type=float, default=0.0,
+                        help='share of requests answered 429')
+    parser.add_argument('--error_rate', type=float, default=0.0,
+                        help='share of requests answered 500')
+    parser.add_argument('--retry_after', type=int, default=1,
+                        help='Retry-After seconds sent with a 429')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    program = ReplayProgram(boards=args.boards, sprints=args.sprints,
+                            cfd_transitions=args.cfd_transitions)
+    server = StandinServer(program, port=args.port, latency=args.latency, jitter=args.jitter,
+                           throttle_rate=args.throttle_rate, error_rate=args.error_rate,
+                           retry_after=args.retry_after, seed=args.seed)
+
+    print(f'Stand-in Jira on {server.url} ({args.boards} boards x {args.sprints} sprints), '
+          'Ctrl-C to stop')
+    started = time.perf_counter()
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+    elapsed = time.perf_counter() - started
+    total = sum(server.requests.values())
+    print(f'{total} requests in {elapsed:.1f}s, {server.bytes_sent / 1e6:.1f} MB sent')
+    for endpoint, count in server.requests.most_common():
+        print(f'  {endpoint:<16}{count:>8}')
+    print('  statuses: ' + ', '.join(f'{status}: {count}' for status, count in sorted(server.statuses.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Generate large synthetic programs in the shape of the tests/test_data
+fixtures, for benchmarks and load tests.
+
+    python -m benchmarks.synthetic --boards 50 --sprints 26 --issues 40 --out program/
+    python -m benchmarks.synthetic --boards 50 --sprints 26 --issues 40 --serve 8008
+
+Everything is derived from the seed and the board and sprint ids, so the same
+parameters produce byte-identical payloads on every run and in any request
+order, and a slow build_report or CfdReport.report can be reproduced exactly.
+"""
+import argparse
+import json
+import os
+import random
+import time
+from datetime import timezone
+
+from benchmarks.standin import ReplayProgram, StandinServer, story_points, STORY_POINTS_FIELD
+
+# Share of a sprint's issues that are added after it starts, removed (punted),
+# left unfinished, or re-estimated during the sprint
+ADDED_RATIO = 0.15
+PUNTED_RATIO = 0.05
+NOT_COMPLETED_RATIO = 0.2
+REESTIMATED_RATIO = 0.1
+REWORK_RATIO = 0.1  # share of column changes that move an issue back a column
+
+MS_PER_DAY = 24 * 60 * 60 * 1000
+SPRINT_LISTS = ('completedIssues', 'issuesNotCompletedInCurrentSprint',
+                'puntedIssues', 'issuesCompletedInAnotherSprint')
+
+
+def _sum_stat(issues: list, key: str) -> dict:
+    if not issues:
+        return {'text': 'null'}
+    value = float(sum(issue[key]['statFieldValue']['value'] for issue in issues))
+    return {'value': value, 'text': str(value)}
+
+
+class SyntheticProgram(ReplayProgram):
+    """
+    N boards x M sprints x K issues, with the issue lists of each sprint report
+    built from the mock_av_sprint_* issue shape.  Each sprint draws its churn
+    from its own Random(seed, board, sprint), so sprints can be generated
+    lazily, in parallel and in any order.
+
+    :param issues: issues committed at the start of each sprint
+    :param added_ratio: share of issues added during the sprint
+    :param punted_ratio: share of issues removed from the sprint
+    :param not_completed_ratio: share of the remaining issues left unfinished
+    :param reestimated_ratio: share of issues whose estimate changes in the sprint
+    :param rework_ratio: share of CFD column changes that move an issue back
+    """
+
+    def __init__(self, boards: int = 1, sprints: int = 6, issues: int = 10, seed: int = 0,
+                 added_ratio: float = ADDED_RATIO, punted_ratio: float = PUNTED_RATIO,
+                 not_completed_ratio: float = NOT_COMPLETED_RATIO,
+                 reestimated_ratio: float = REESTIMATED_RATIO, rework_ratio: float = REWORK_RATIO):
+        ReplayProgram.__init__(self, boards=boards, sprints=sprints)
+        self._issues = issues
+        self._seed = seed
+        self._added_ratio = added_ratio
+        self._punted_ratio = punted_ratio
+        self._not_completed_ratio = not_completed_ratio
+        self._reestimated_ratio = reestimated_ratio
+        self._rework_ratio = rework_ratio
+        self._issue_template = self._templates[0]['contents']['completedIssues'][0]
+
+    def _random(self, *ids) -> random.Random:
+        # String seeds hash the same in every process, unlike hash()
+        return random.Random(':'.join(str(part) for part in (self._seed,) + ids))
+
+    @staticmethod
+    def issue_key(board_id: int, number: int) -> str:
+        return f'SYN{board_id}-{number}'
+
+    def _issue(self, key: str, number: int, initial: float, current: float, done: bool) -> dict:
+        issue = dict(self._issue_template)
+        issue.update({'id': number,
+                      'key': key,
+                      'summary': f'Synthetic issue {key}',
+                      'done': done,
+                      'estimateStatistic': {'statFieldId': STORY_POINTS_FIELD,
+                                            'statFieldValue': {'value': initial}},
+                      'currentEstimateStatistic': {'statFieldId': STORY_POINTS_FIELD,
+                                                   'statFieldValue': {'value': current}}})
+        return issue
+
+    def sprint_issues(self, board_id: int, index: int) -> dict:
+        """
+        The issues of one sprint, in the sprint report lists.
+
+        :return: dict of list name -> issue dicts, plus 'added' -> added issue keys
+        """
+        rnd = self._random(board_id, index)
+        added = int(round(self._issues * self._added_ratio))
+        first_number = index * (self._issues + added) + 1
+
+        lists = {name: [] for name in SPRINT_LISTS}
+        added_keys = []
+        for offset in range(self._issues + added):
+            number = first_number + offset
+            key = self.issue_key(board_id, number)
+            if offset >= self._issues:
+                added_keys.append(key)
+
+            # An added issue's search lookup returns story_points(key), so keep
+            # ...its current estimate at that
+            current = story_points(key)
+            initial = current
+            if offset < self._issues and rnd.random() < self._reestimated_ratio:
+                initial = float(max(1, current + rnd.choice((-3, -2, -1, 1, 2, 3))))
+
+            if rnd.random() < self._punted_ratio:
+                name = 'puntedIssues'
+            elif rnd.random() < self._not_completed_ratio:
+                name = 'issuesNotCompletedInCurrentSprint'
+            else:
+                name = 'completedIssues'
+
+            lists[name].append(self._issue(key, board_id * 1000000 + number, initial, current,
+                                           name == 'completedIssues'))
+
+        lists['added'] = added_keys
+        return lists
+
+    def sprint_report(self, board_id: int, sprint_id: int):
+        report = ReplayProgram.sprint_report(self, board_id, sprint_id)
+        if report is None:
+            return None
+
+        lists = self.sprint_issues(board_id, self._find_sprint(board_id, sprint_id))
+        completed = lists['completedIssues']
+        not_completed = lists['issuesNotCompletedInCurrentSprint']
+        punted = lists['puntedIssues']
+
+        contents = {name: lists[name] for name in SPRINT_LISTS}
+        contents.update({
+            'completedIssuesInitialEstimateSum': _sum_stat(completed, 'estimateStatistic'),
+            'completedIssuesEstimateSum': _sum_stat(completed, 'currentEstimateStatistic'),
+            'issuesNotCompletedInitialEstimateSum': _sum_stat(not_completed, 'estimateStatistic'),
+            'issuesNotCompletedEstimateSum': _sum_stat(not_completed, 'currentEstimateStatistic'),
+            'allIssuesEstimateSum': _sum_stat(completed + not_completed, 'currentEstimateStatistic'),
+            'puntedIssuesInitialEstimateSum': _sum_stat(punted, 'estimateStatistic'),
+            'puntedIssuesEstimateSum': _sum_stat(punted, 'currentEstimateStatistic'),
+            'issuesCompletedInAnotherSprintInitialEstimateSum': {'text': 'null'},
+            'issuesCompletedInAnotherSprintEstimateSum': {'text': 'null'},
+            'issueKeysAddedDuringSprint': {key: True for key in lists['added']}})
+        report['contents'] = contents
+        return report
+
+    def velocity(self, board_id: int, finished_after=None, finished_before=None):
+        r_json = ReplayProgram.velocity(self, board_id, finished_after, finished_before)
+        if r_json is None:
+            return None
+
+        for sprint in r_json['sprints']:
+            lists = self.sprint_issues(board_id, self._find_sprint(board_id, sprint['id']))
+            added = set(lists['added'])
+            committed = [issue for name in SPRINT_LISTS for issue in lists[name]
+                         if issue['key'] not in added]
+            r_json['velocityStatEntries'][str(sprint['id'])] = {
+                'estimated': _sum_stat(committed, 'estimateStatistic'),
+                'completed': _sum_stat(lists['completedIssues'], 'currentEstimateStatistic')}
+
+        return r_json
+
+    def cfd(self, board_id: int):
+        """
+        Column changes for every issue on the board: into the first column before
+        (or, if added, during) its sprint, then forward a column at a time, with
+        the odd step back, until done or the sprint ends.
+        """
+        if not 1 <= board_id <= self._boards:
+            return None
+
+        columns = self._config['currentViewConfig']['columns']
+        last_column = len(columns) - 1
+        column_changes = {}
+        first_change = None
+        now = None
+
+        def change(timestamp, key, column_from, column_to):
+            event = {'key': key, 'columnTo': column_to, 'statusTo': str(10000 + column_to)}
+            if column_from is not None:
+                event['columnFrom'] = column_from
+            column_changes.setdefault(str(timestamp), []).append(event)
+
+        for index in range(self._sprints):
+            rnd = self._random(board_id, index, 'cfd')
+            start, end = self._sprint_dates(index)
+            # UTC, so the payload doesn't depend on the local time zone
+            start_ms = int(start.replace(tzinfo=timezone.utc).timestamp() * 1000)
+            end_ms = int(end.replace(tzinfo=timezone.utc).timestamp() * 1000)
+            lists = self.sprint_issues(board_id, index)
+            added = set(lists['added'])
+
+            for name in ('completedIssues', 'issuesNotCompletedInCurrentSprint', 'puntedIssues'):
+                for issue in lists[name]:
+                    key = issue['key']
+                    if key in added:
+                        timestamp = rnd.randint(start_ms, end_ms - 1)
+                    else:
+                        timestamp = start_ms - rnd.randint(1, 7 * MS_PER_DAY)
+                    change(timestamp, key, None, 0)
+                    first_change = timestamp if first_change is None else min(first_change, timestamp)
+
+                    target = last_column if name == 'completedIssues' else \
+                        0 if name == 'puntedIssues' else rnd.randint(0, last_column - 1)
+                    column = 0
+                    while column != target:
+                        timestamp = rnd.randint(timestamp + 1, max(timestamp + 1, end_ms))
+                        if column > 0 and rnd.random() < self._rework_ratio:
+                            step = column - 1
+                        else:
+                            step = column + 1
+                        change(timestamp, key, column, step)
+                        column = step
+                    now = timestamp if now is None else max(now, timestamp)
+
+        # Jira sends the changes in time order
+        column_changes = {timestamp: column_changes[timestamp]
+                          for timestamp in sorted(column_changes, key=int)}
+        return {'columns': [{'name': column['name']} for column in columns],
+                'columnChanges': column_changes,
+                'firstChangeTime': first_change,
+                'now': now}
+
+    def write(self, directory: str) -> int:
+        """
+        Write every payload the stand-in would serve as JSON files.
+
+        :return: number of files written
+        """
+        os.makedirs(directory, exist_ok=True)
+
+        def dump(name, r_json):
+            with open(os.path.join(directory, name), 'w') as f:
+                json.dump(r_json, f)
+
+        files = [('boards.json', self.boards()), ('names.json', self.field_names())]
+        for board in self.boards():
+            board_id = board['id']
+            sprints = self.sprints(board_id)
+            files.append((f'board_{board_id}_sprints.json', sprints))
+            files.append((f'board_{board_id}_config.json', self.board_config(board_id)))
+            files.append((f'board_{board_id}_velocity.json', self.velocity(board_id)))
+            files.append((f'board_{board_id}_cfd.json', self.cfd(board_id)))
+            for sprint in sprints:
+                files.append((f'board_{board_id}_sprint_{sprint["id"]}_report.json',
+                              self.sprint_report(board_id, sprint['id'])))
+
+        for name, r_json in files:
+            dump(name, r_json)
+        return len(files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic Jira program')
+    parser.add_argument('--boards', type=int, default=10)
+    parser.add_argument('--sprints', type=int, default=26,
+                        help='sprints per board')
+    parser.add_argument('--issues', type=int, default=20,
+                        help='issues committed per sprint')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--added_ratio', type=float, default=ADDED_RATIO)
+    parser.add_argument('--punted_ratio', type=float, default=PUNTED_RATIO)
+    parser.add_argument('--not_completed_ratio', type=float, default=NOT_COMPLETED_RATIO)
+    parser.add_argument('--reestimated_ratio', type=float, default=REESTIMATED_RATIO)
+    parser.add_argument('--rework_ratio', type=float, default=REWORK_RATIO)
+    parser.add_argument('--out', type=str,
+                        help='directory to write the program\'s JSON payloads to')
+    parser.add_argument('--serve', type=int,
+                        help='serve the program from the stand-in Jira on this port')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds added to every stand-in response')
+    args = parser.parse_args()
+
+    program = SyntheticProgram(boards=args.boards, sprints=args.sprints, issues=args.issues,
+                               seed=args.seed, added_ratio=args.added_ratio,
+                               punted_ratio=args.punted_ratio,
+                               not_completed_ratio=args.not_completed_ratio,
+                               reestimated_ratio=args.reestimated_ratio,
+                               rework_ratio=args.rework_ratio)
+
+    if args.out:
+        start = time.perf_counter()
+        count = program.write(args.out)
+        print(f'Wrote {count} files to {args.out} in {time.perf_counter() - start:.1f}s')
+
+    if args.serve:
+        with StandinServer(program, port=args.serve, latency=args.latency) as server:
+            print(f'Stand-in Jira on {server.url}, Ctrl-C to stop')
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                pass
+
+
+if __name__ == "__main__":
+    main()
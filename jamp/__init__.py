@@ -1,6 +1,13 @@
 import datetime
+import hashlib
+import json
+import os
+import threading
+import time
 from jira.resources import Resource
 
+from jamp.instrument import PROFILER
+
 
 JIRA_KEY_FIELDS = 'fields'
 JIRA_KEY_KEY = 'key'
@@ -11,6 +18,8 @@ VELOCITY_PARM_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
 
 NAN = float("NaN")
 
+FIELD_MAP_CACHE_TTL = 24 * 60 * 60  # seconds
+
 
 def jira_date_str(date: datetime) -> str:
     # TODO: Why does the 'Z' thing work and does this mess up stats?
@@ -18,6 +27,101 @@ def jira_date_str(date: datetime) -> str:
     return date.strftime(VELOCITY_PARM_DATE_FORMAT)[:-3] + 'Z'
 
 
+class FieldMapRegistry:
+    """
+    Process-wide store of field-name to field-key maps, keyed by server.
+
+    The map only changes when someone adds or renames a custom field, so every
+    JiraFieldMapper for the same server shares a single copy rather than issuing
+    its own 'search?expand=names' request.  When a cache directory is configured
+    the map is also written to disk and reused by later runs until it is older
+    than the TTL.
+    """
+
+    def __init__(self, cache_dir=None, ttl=FIELD_MAP_CACHE_TTL):
+        self._lock = threading.Lock()
+        self._maps = {}
+        self._cache_dir = cache_dir
+        self._ttl = ttl
+
+    def configure(self, cache_dir=None, ttl=FIELD_MAP_CACHE_TTL) -> None:
+        self._cache_dir = cache_dir
+        self._ttl = ttl
+
+    def clear(self) -> None:
+        with self._lock:
+            self._maps.clear()
+
+    def get(self, server: str, fetch) -> dict:
+        """
+        Return the map for the server, calling 'fetch()' only when neither the
+        in-memory registry nor the on-disk cache can supply it.
+
+        :param server: Jira server url used as the registry key
+        :param fetch: callable returning a fresh {name: key} dict
+        :return: dict
+        """
+        with self._lock:
+            if server not in self._maps:
+                field_map = self._load(server)
+                if field_map is None:
+                    PROFILER.cache('field_map', hit=False)
+                    with PROFILER.phase('field_map'):
+                        field_map = fetch()
+                    self._save(server, field_map)
+                else:
+                    PROFILER.cache('field_map', hit=True)
+                self._maps[server] = field_map
+            else:
+                PROFILER.cache('field_map', hit=True)
+
+            return self._maps[server]
+
+    def cached(self, server: str):
+        """
+        Return the map for the server if the registry or the on-disk cache already
+        has it, otherwise None.  Nothing is fetched.
+        """
+        with self._lock:
+            if server not in self._maps:
+                field_map = self._load(server)
+                if field_map is None:
+                    return None
+                self._maps[server] = field_map
+
+            return self._maps[server]
+
+    def _cache_file(self, server: str) -> str:
+        digest = hashlib.sha1(server.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self._cache_dir, f'field_map_{digest}.json')
+
+    def _load(self, server: str):
+        if not self._cache_dir:
+            return None
+
+        try:
+            with open(self._cache_file(server)) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if cached.get('server') != server or time.time() - cached.get('created', 0) > self._ttl:
+            return None
+
+        return cached['map']
+
+    def _save(self, server: str, field_map: dict) -> None:
+        if not self._cache_dir:
+            return
+
+        os.makedirs(self._cache_dir, exist_ok=True)
+        with open(self._cache_file(server), 'w') as f:
+            json.dump({'server': server, 'created': time.time(), 'map': field_map}, f)
+
+
+FIELD_MAPS = FieldMapRegistry()
+
+
 class JiraFieldMapper:
 
     def __init__(self, options, session):
@@ -26,6 +130,9 @@ class JiraFieldMapper:
         self._map = self._build_field_name_map()
 
     def _build_field_name_map(self):
+        return FIELD_MAPS.get(self._options['server'], self._fetch_field_name_map)
+
+    def _fetch_field_name_map(self):
         # Here's how to get the field-to-name mapping from the issues resource...
         # The following is best, but it only shows the create screen types.
         #     issue_key = "issue/createmeta?projectKeys=JAMP&expand=projects.issuetypes.fields"
@@ -0,0 +1,137 @@
+import asyncio
+import base64
+import copy
+
+import aiohttp
+from jira import JIRA, JIRAError
+
+import jamp
+from jamp.client import _sprint_report_path, _sprint_report_json, _velocity_report_path, \
+    _velocity_windows, _merge_velocity_json, _cfd_config_path, _cfd_report_path, VELOCITY_WINDOW_DAYS
+from jamp.resources import SprintReport, VelocityReport, CfdReport, \
+    KEY_ISSUE_KEYS_ADDED_DURING_SPRINT, _chunk_issue_keys, _search_params, _sum_story_points
+
+DEFAULT_MAX_IN_FLIGHT = 20
+
+
+class AsyncJIRAReports:
+    """
+    asyncio sibling of JIRAReports.
+
+    All requests share one pooled aiohttp session, and a semaphore caps the
+    number of requests in flight across every coroutine using the client, so a
+    single process can gather hundreds of boards without flooding the server.
+    The reports returned are the same SprintReport, VelocityReport and CfdReport
+    objects that JIRAReports builds.
+
+        async with AsyncJIRAReports(server, basic_auth=(user, password)) as client:
+            reports = await asyncio.gather(*[client.sprint_report(board_id, sprint_id)
+                                             for board_id, sprint_id in sprints])
+    """
+
+    def __init__(self, server, basic_auth=None, max_in_flight=DEFAULT_MAX_IN_FLIGHT, options=None):
+        self._options = copy.deepcopy(JIRA.DEFAULT_OPTIONS)
+        if options:
+            self._options.update(options)
+        self._options['server'] = server
+
+        self._headers = {"Accept": "application/json,*.*;q=0.9"}
+        if basic_auth:
+            credentials = base64.b64encode(':'.join(basic_auth).encode('utf-8')).decode('ascii')
+            self._headers['Authorization'] = f'Basic {credentials}'
+
+        self._max_in_flight = max_in_flight
+        self._http = None
+        self._in_flight = None
+        self._field_map_lock = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self) -> None:
+        connector = aiohttp.TCPConnector(limit=self._max_in_flight,
+                                         ssl=None if self._options['verify'] else False)
+        self._http = aiohttp.ClientSession(connector=connector, headers=self._headers)
+        self._in_flight = asyncio.Semaphore(self._max_in_flight)
+        self._field_map_lock = asyncio.Lock()
+
+    async def close(self) -> None:
+        if self._http:
+            await self._http.close()
+            self._http = None
+
+    def _get_url(self, path, base=JIRA.JIRA_BASE_URL) -> str:
+        options = self._options.copy()
+        options.update({'path': path})
+        return base.format(**options)
+
+    async def _get_json(self, path, params=None, base=JIRA.JIRA_BASE_URL):
+        url = self._get_url(path, base)
+        async with self._in_flight:
+            async with self._http.get(url, params=params) as r:
+                if r.status != 200:
+                    raise JIRAError(status_code=r.status, text=await r.text(), url=url)
+                return await r.json(content_type=None)
+
+    async def _field_map(self) -> dict:
+        server = self._options['server']
+        async with self._field_map_lock:
+            field_map = jamp.FIELD_MAPS.cached(server)
+            if field_map is None:
+                r_json = await self._get_json('search', params={'maxResults': 1, 'expand': 'names'})
+                names = {value: key for key, value in r_json['names'].items()}
+                field_map = jamp.FIELD_MAPS.get(server, lambda: names)
+
+        return field_map
+
+    async def _story_points_sum(self, issue_keys: list) -> float:
+        if not issue_keys:
+            return 0
+
+        story_points_field = (await self._field_map())['Story Points']
+        searches = [self._get_json('search', params=_search_params(chunk, story_points_field))
+                    for chunk in _chunk_issue_keys(issue_keys)]
+
+        story_points_sum = 0
+        for r_json in await asyncio.gather(*searches):
+            story_points_sum += _sum_story_points(r_json['issues'], story_points_field)
+
+        return story_points_sum
+
+    async def sprint_report(self, board_id, sprint_id) -> SprintReport:
+        r_json = await self._get_json(_sprint_report_path(board_id, sprint_id),
+                                      base=JIRA.AGILE_BASE_URL)
+        r_json = _sprint_report_json(r_json, board_id, sprint_id)
+
+        # Resolve everything SprintReport would otherwise fetch synchronously
+        await self._field_map()
+        added_sum = await self._story_points_sum(list(r_json['contents'][KEY_ISSUE_KEYS_ADDED_DURING_SPRINT]))
+
+        return SprintReport(options=self._options, session=None, raw=r_json, added_sum=added_sum)
+
+    async def velocity_report(self, board_id, finished_before=None, finished_after=None,
+                              window_days=VELOCITY_WINDOW_DAYS) -> VelocityReport:
+        windows = _velocity_windows(finished_after, finished_before, window_days)
+        r_jsons = await asyncio.gather(*[self._get_json(_velocity_report_path(board_id, after, before),
+                                                        base=JIRA.AGILE_BASE_URL)
+                                         for after, before in windows])
+
+        r_json = _merge_velocity_json(list(r_jsons))
+        r_json['id'] = board_id
+
+        return VelocityReport(options=self._options, session=None, raw=r_json)
+
+    async def cfd_report(self, board_id, finished_before=None, finished_after=None) -> CfdReport:
+        config = await self._get_json(_cfd_config_path(board_id),
+                                      base=JIRA.AGILE_BASE_URL)
+
+        r_json = await self._get_json(_cfd_report_path(board_id, config),
+                                      base=JIRA.AGILE_BASE_URL)
+
+        r_json['id'] = board_id
+
+        return CfdReport(options=self._options, session=None, raw=r_json, config=config)
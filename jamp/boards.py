@@ -0,0 +1,45 @@
+from bisect import bisect_left
+
+MATCH_EXACT = 'MATCH_EXACT'
+MATCH_STARTS_WITH = 'MATCH_STARTS_WITH'
+
+
+class BoardIndex:
+    """
+    Board catalogue indexed by exact name and by name prefix, so any number of
+    --board filters can be resolved against a single boards() download.
+
+    Matches are always returned in catalogue order.
+    """
+
+    def __init__(self, boards):
+        self._boards = list(boards)
+        self._by_name = {}
+        for position, board in enumerate(self._boards):
+            self._by_name.setdefault(board.name, []).append(position)
+
+        # (name, position) pairs sorted by name, for prefix range lookups
+        self._sorted = sorted((board.name, position) for position, board in enumerate(self._boards))
+        self._sorted_names = [name for name, _ in self._sorted]
+
+    def __len__(self):
+        return len(self._boards)
+
+    def exact(self, name: str) -> list:
+        return [self._boards[position] for position in self._by_name.get(name, [])]
+
+    def starts_with(self, prefix: str) -> list:
+        positions = []
+        for name, position in self._sorted[bisect_left(self._sorted_names, prefix):]:
+            if not name.startswith(prefix):
+                break
+            positions.append(position)
+
+        return [self._boards[position] for position in sorted(positions)]
+
+    def match(self, pattern: str, command: str) -> list:
+        if command == MATCH_EXACT:
+            return self.exact(pattern)
+        if command == MATCH_STARTS_WITH:
+            return self.starts_with(pattern)
+        return []
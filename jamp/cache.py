@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+SPRINT_STATE_CLOSED = 'CLOSED'
+
+RESPONSE_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.jamp', 'cache')
+RESPONSE_CACHE_TTL = 15 * 60  # seconds
+RESPONSE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+KEY_URL = 'url'
+KEY_PARAMS = 'params'
+KEY_STORED = 'stored'
+KEY_PERMANENT = 'permanent'
+KEY_JSON = 'json'
+
+
+def is_closed_sprint_report(r_json) -> bool:
+    """
+    True if the json is a sprint report for a CLOSED sprint, whose content no
+    longer changes.
+    """
+    try:
+        return r_json['sprint']['state'] == SPRINT_STATE_CLOSED
+    except (KeyError, TypeError):
+        return False
+
+
+class ResponseCache:
+    """
+    On-disk cache of json responses, keyed by URL and query params.
+
+    Permanent entries (e.g. reports for CLOSED sprints) are kept until they are
+    evicted; everything else expires after the TTL.  When the cache grows past
+    max_bytes the least recently used entries are removed first.  File
+    modification times record the last use, so the LRU order survives between
+    runs.
+    """
+
+    def __init__(self, cache_dir=RESPONSE_CACHE_DIR, ttl=RESPONSE_CACHE_TTL,
+                 max_bytes=RESPONSE_CACHE_MAX_BYTES):
+        self._cache_dir = cache_dir
+        self._ttl = ttl
+        self._max_bytes = max_bytes
+        self._size = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(url: str, params=None) -> str:
+        if isinstance(params, dict):
+            params = sorted(params.items())
+        text = json.dumps([url, params], default=str)
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def _entry_file(self, key: str) -> str:
+        return os.path.join(self._cache_dir, f'{key}.json')
+
+    def get(self, url: str, params=None):
+        """
+        :return: the cached json, or None if it is missing or expired
+        """
+        entry_file = self._entry_file(self.key(url, params))
+        try:
+            with open(entry_file) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if not entry[KEY_PERMANENT] and time.time() - entry[KEY_STORED] > self._ttl:
+            return None
+
+        try:
+            os.utime(entry_file)
+        except OSError:
+            pass  # Evicted by another thread since we read it
+
+        return entry[KEY_JSON]
+
+    def put(self, url: str, r_json, params=None, permanent=False) -> None:
+        entry = {KEY_URL: url,
+                 KEY_PARAMS: params,
+                 KEY_STORED: time.time(),
+                 KEY_PERMANENT: permanent,
+                 KEY_JSON: r_json}
+        text = json.dumps(entry, default=str)
+
+        entry_file = self._entry_file(self.key(url, params))
+        with self._lock:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            if self._size is None:
+                self._size = self._disk_size()
+            if os.path.exists(entry_file):
+                self._size -= os.path.getsize(entry_file)
+
+            # Write then rename, so readers never see a partial entry
+            with open(entry_file + '.tmp', 'w') as f:
+                f.write(text)
+            os.replace(entry_file + '.tmp', entry_file)
+            self._size += os.path.getsize(entry_file)
+
+            if self._size > self._max_bytes:
+                self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            for _, _, path in self._entries():
+                os.remove(path)
+            self._size = 0
+
+    def _entries(self) -> list:
+        entries = []
+        if not os.path.isdir(self._cache_dir):
+            return entries
+
+        for name in os.listdir(self._cache_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self._cache_dir, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _disk_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self) -> None:
+        # Oldest use first, down to 90% of the bound so every put doesn't evict
+        target = self._max_bytes * 0.9
+        for _, size, path in sorted(self._entries()):
+            if self._size <= target:
+                break
+            os.remove(path)
+            self._size -= size
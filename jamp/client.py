@@ -3,49 +3,240 @@ import pprint
 
 from jira import JIRA
 from jira.client import ResultList
+from requests.adapters import HTTPAdapter, DEFAULT_POOLSIZE
 
-from jamp.resources import SprintReport, Team, VelocityReport, CfdReport
+from jamp.resources import SprintReport, Team, VelocityReport, CfdReport, KEY_VELOCITY_STAT_ENTRIES
 from jamp import jira_date_str
+from jamp.cache import is_closed_sprint_report
+from jamp.instrument import PROFILER
 
 
-class JIRAReports(JIRA):
+def size_connection_pool(session, size: int) -> None:
+    """
+    Grow the session's per-host connection pool so 'size' threads can share it
+    without requests discarding connections.  The default pool is left alone.
+    """
+    if size <= DEFAULT_POOLSIZE:
+        return
+
+    adapter = HTTPAdapter(pool_connections=DEFAULT_POOLSIZE, pool_maxsize=size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+
+def _sprint_report_path(board_id, sprint_id) -> str:
+    # ...rest/greenhopper/1.0/rapid/charts/sprintreport?rapidViewId=1&sprintId=1
+    parms = f'rapidViewId={board_id}&sprintId={sprint_id}'
+    return f'rapid/charts/sprintreport?{parms}'
+
+
+def _sprint_report_json(r_json, board_id, sprint_id):
+    # This is a hack to make the Sprint Report a resource, even if it's not
+    # ...really a resource.
+    if 'id' not in r_json:
+        r_json['board_id'] = board_id
+        r_json['sprint_id'] = sprint_id
+        r_json['id'] = f'rapidViewId={board_id}&sprintId={sprint_id}'
+    return r_json
+
+
+# Cache params for a closed sprint's added_sum, stored beside its sprint report
+ADDED_SUM_PARAMS = {'jamp': 'added_sum'}
+
+VELOCITY_WINDOW_DAYS = 365
+KEY_SPRINTS = 'sprints'
+
+
+def _end_of_today() -> datetime:
+    # End the window at the end of today rather than 'now', so the url (and the
+    # ...response cache key) stays the same for the whole day.
+    return datetime.combine(datetime.now().date(), datetime.max.time())
+
+
+def _velocity_windows(finished_after: datetime = None,
+                      finished_before: datetime = None,
+                      window_days: int = VELOCITY_WINDOW_DAYS) -> list:
+    """
+    Split the span of sprint finish dates into windows of at most window_days,
+    newest first.  The windows are anchored at finished_after, so a window that
+    ends in the past has the same url on every run.
+
+    :param finished_after: oldest finish date (default: window_days before finished_before).
+        A date after finished_before is clamped to it, leaving no windows.
+    :param finished_before: newest finish date (default: the end of today)
+    :return: list of (finished_after, finished_before) tuples, empty for an empty span
+    """
+    if finished_before is None:
+        finished_before = _end_of_today()
+    if finished_after is None:
+        finished_after = finished_before - timedelta(days=window_days)
+    finished_after = min(finished_after, finished_before)
+
+    windows = []
+    start = finished_after
+    while start < finished_before:
+        end = min(start + timedelta(days=window_days), finished_before)
+        windows.append((start, end))
+        start = end
+
+    return windows[::-1]
+
+
+def _velocity_report_path(board_id, finished_after: datetime, finished_before: datetime) -> str:
+    parms = f'rapidViewId={board_id}&sprintsFinishedBefore={jira_date_str(finished_before)}'\
+            f'&sprintsFinishedAfter={jira_date_str(finished_after)}'
+
+    return f'rapid/charts/velocity.json?{parms}'
+
+
+def _merge_velocity_json(r_jsons: list) -> dict:
+    """
+    Merge the velocity.json responses of several windows, newest first, into one
+    report.  A sprint finishing on a window boundary keeps its newest entry.
+    No windows (an empty span) is a report without sprints.
+    """
+    if not r_jsons:
+        return {KEY_SPRINTS: [], KEY_VELOCITY_STAT_ENTRIES: {}}
+    if len(r_jsons) == 1:
+        return r_jsons[0]
+
+    merged = {KEY_SPRINTS: [], KEY_VELOCITY_STAT_ENTRIES: {}}
+    seen = set()
+    for r_json in r_jsons:
+        for sprint in r_json.get(KEY_SPRINTS, []):
+            if sprint['id'] not in seen:
+                seen.add(sprint['id'])
+                merged[KEY_SPRINTS].append(sprint)
+        for sprint_id, entry in r_json.get(KEY_VELOCITY_STAT_ENTRIES, {}).items():
+            merged[KEY_VELOCITY_STAT_ENTRIES].setdefault(sprint_id, entry)
+
+    for key, value in r_jsons[0].items():
+        merged.setdefault(key, value)
+
+    return merged
+
+
+def _cfd_config_path(board_id) -> str:
+    parms = f'returnDefaultBoard=false&' \
+            f'rapidViewId={board_id}&'
+
+    return f'xboard/config.json?{parms}'
+
+
+def _cfd_report_path(board_id, config) -> str:
+    swimlane_parm = ""
+    for swimlane in config['currentViewConfig']['swimlanes']:
+        swimlane_parm += f"&swimlaneId={swimlane['id']}"
+
+    col_parm = ""
+    for col in config['currentViewConfig']['columns']:
+        col_parm += f"&columnId={col['id']}"
+
+    parms = f"rapidViewId={board_id}{swimlane_parm}{col_parm}"
+
+    return f'rapid/charts/cumulativeflowdiagram?{parms}'
+
+
+class ScheduledJIRA(JIRA):
+    """
+    JIRA whose session sends every request through a RequestScheduler, when one
+    is given.  Resources built on the session (SprintReport, JiraFieldMapper, ...)
+    are scheduled with it.
+
+    The session is instrumented for the profiler first, so request timings
+    exclude the time a request waits in the scheduler.
+    """
+
+    def __init__(self, *args, scheduler=None, **kwargs):
+        self._scheduler = scheduler
+        if scheduler is not None:
+            # The scheduler retries itself; JIRA.__init__ sets the session's retries
+            kwargs.setdefault('max_retries', 0)
+        super().__init__(*args, **kwargs)
+
+    def _create_http_basic_session(self, *args, **kwargs):
+        # Attach before JIRA.__init__ makes its first requests
+        super()._create_http_basic_session(*args, **kwargs)
+        PROFILER.instrument(self._session)
+        if self._scheduler is not None:
+            self._scheduler.attach(self._session)
+
+
+class JIRAReports(ScheduledJIRA):
+    """
+    JIRA client for the greenhopper chart endpoints.
+
+    When a ResponseCache is given, chart responses are served from it.  Sprint
+    reports for CLOSED sprints are cached permanently, together with the story
+    points of their added issues, so a cached closed sprint needs no requests.
+    All other charts are cached only for the cache's TTL.
+    """
+
+    def __init__(self, *args, cache=None, **kwargs):
+        # JIRA.__init__ may already make requests, so the cache must exist first
+        self._cache = cache
+        super().__init__(*args, **kwargs)
+
+    def _get_json(self, path, params=None, base=JIRA.JIRA_BASE_URL, permanent=False):
+        """
+        :param permanent: cache the response until it is evicted, as for closed sprints
+        """
+        if self._cache is None or base != self.AGILE_BASE_URL:
+            return super()._get_json(path, params=params, base=base)
+
+        url = self._get_url(path, base)
+        r_json = self._cache.get(url, params)
+        PROFILER.cache('response', hit=r_json is not None)
+        if r_json is None:
+            r_json = super()._get_json(path, params=params, base=base)
+            self._cache.put(url, r_json, params,
+                            permanent=permanent or is_closed_sprint_report(r_json))
+
+        return r_json
 
     def sprint_report(self, board_id, sprint_id) -> SprintReport:
-        # ...rest/greenhopper/1.0/rapid/charts/sprintreport?rapidViewId=1&sprintId=1
-        parms = f'rapidViewId={board_id}&sprintId={sprint_id}'
-        r_json = self._get_json(f'rapid/charts/sprintreport?{parms}',
-                                base=self.AGILE_BASE_URL)
-        # This is a hack to make the Sprint Report a resource, even if it's not
-        # ...really a resource.
-        if 'id' not in r_json:
-            r_json['board_id'] = board_id
-            r_json['sprint_id'] = sprint_id
-            r_json['id'] = f'rapidViewId={board_id}&sprintId={sprint_id}'
-
-        sprint_report = SprintReport(options=self._options, session=self._session, raw=r_json)
+        path = _sprint_report_path(board_id, sprint_id)
+        r_json = self._get_json(path, base=self.AGILE_BASE_URL)
+        r_json = _sprint_report_json(r_json, board_id, sprint_id)
+
+        # The added issues' story points come from 'search' requests, which the
+        # ...chart cache doesn't cover, so keep a closed sprint's sum with its report
+        cache_added_sum = self._cache is not None and is_closed_sprint_report(r_json)
+        added_sum = None
+        if cache_added_sum:
+            added_sum = self._cache.get(self._get_url(path, self.AGILE_BASE_URL), ADDED_SUM_PARAMS)
+            PROFILER.cache('added_sum', hit=added_sum is not None)
+
+        sprint_report = SprintReport(options=self._options, session=self._session, raw=r_json,
+                                     added_sum=added_sum)
+
+        if cache_added_sum and added_sum is None:
+            self._cache.put(self._get_url(path, self.AGILE_BASE_URL), sprint_report.added_sum,
+                            ADDED_SUM_PARAMS, permanent=True)
         return sprint_report
 
-    def velocity_report(self, board_id, finished_before=None, finished_after=None  ):
+    def velocity_report(self, board_id, finished_before=None, finished_after=None,
+                        window_days=VELOCITY_WINDOW_DAYS) -> VelocityReport:
         """
-         ...rest/greenhopper/1.0/rapid/charts/sprintreport?
+         ...rest/greenhopper/1.0/rapid/charts/velocity.json?
             rapidViewId=1&
-            sprintId=1
             sprintsFinishedBefore=2021-03-03T04%3A59%3A59.999Z&
             sprintsFinishedAfter=2020-12-02T05%3A00%3A00.000Z&_=1614720709744
-        """
-
-        finish_after_time = datetime.now()
-        finish_before_time = finish_after_time - timedelta(days=365)
-
-        finish_after_str = jira_date_str(finish_after_time)
-        finish_before_str = jira_date_str(finish_before_time)
 
-        parms = f'rapidViewId={board_id}&sprintsFinishedBefore={finish_after_str}'\
-                f'&sprintsFinishedAfter={finish_before_str}'
+        Spans longer than window_days are fetched one window at a time and merged.
+        Windows that ended before today are cached permanently, so a board's
+        history is only downloaded once.
 
-        r_json = self._get_json(f'rapid/charts/velocity.json?{parms}',
-                                base=self.AGILE_BASE_URL)
+        :param finished_before: newest sprint finish date (default: the end of today)
+        :param finished_after: oldest sprint finish date (default: window_days earlier)
+        """
+        today = datetime.combine(datetime.now().date(), datetime.min.time())
+        r_jsons = [self._get_json(_velocity_report_path(board_id, after, before),
+                                  base=self.AGILE_BASE_URL,
+                                  permanent=before < today)
+                   for after, before in _velocity_windows(finished_after, finished_before, window_days)]
 
+        r_json = _merge_velocity_json(r_jsons)
         r_json['id'] = board_id
 
         velocity_report = VelocityReport(options=self._options, session=self._session, raw=r_json)
@@ -65,24 +256,10 @@ class JIRAReports(JIRA):
             columnId=5&
             columnId=6
         """
-
-        parms = f'returnDefaultBoard=false&' \
-                f'rapidViewId={board_id}&'
-
-        config = self._get_json(f'xboard/config.json?{parms}',
+        config = self._get_json(_cfd_config_path(board_id),
                                 base=self.AGILE_BASE_URL)
 
-        swimlane_parm = ""
-        for swimlane in config['currentViewConfig']['swimlanes']:
-            swimlane_parm += f"&swimlaneId={swimlane['id']}"
-
-        col_parm = ""
-        for col in config['currentViewConfig']['columns']:
-            col_parm += f"&columnId={col['id']}"
-
-        parms = f"rapidViewId={board_id}{swimlane_parm}{col_parm}"
-
-        r_json = self._get_json(f'rapid/charts/cumulativeflowdiagram?{parms}',
+        r_json = self._get_json(_cfd_report_path(board_id, config),
                                 base=self.AGILE_BASE_URL)
 
         r_json['id'] = board_id
@@ -95,7 +272,7 @@ class JIRAReports(JIRA):
         return cfd_report
 
 
-class JIRATeams(JIRA):
+class JIRATeams(ScheduledJIRA):
 
     def teams(self, startAt=0, maxResults=50, type=None, name=None) -> ResultList:
         r_json = self._get_json('team', base=self.AGILE_BASE_URL)
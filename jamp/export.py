@@ -0,0 +1,301 @@
+import datetime
+import math
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+EXCEL_DATETIME_FORMAT = 'yyyy-mm-dd hh:mm:ss'
+MAX_SHEET_NAME_LENGTH = 31
+
+FORMAT_XLSX = 'xlsx'
+FORMAT_CSV = 'csv'
+FORMAT_PARQUET = 'parquet'
+FORMAT_ARROW = 'arrow'
+
+# File suffix -> output format.  Anything else is written as xlsx, as before.
+OUTPUT_FORMATS = {'.xlsx': FORMAT_XLSX,
+                  '.csv': FORMAT_CSV,
+                  '.parquet': FORMAT_PARQUET,
+                  '.arrow': FORMAT_ARROW,
+                  '.feather': FORMAT_ARROW}
+
+PARQUET_COMPRESSION = 'snappy'
+UNSAFE_FILENAME_CHARS = re.compile(r'[^\w.-]+')
+
+
+class StreamingSheet:
+    """
+    A worksheet written one row at a time.  Rows must arrive in order; in
+    constant_memory mode each row is flushed to disk as soon as the next one starts.
+    """
+
+    def __init__(self, worksheet, headers, header_format, date_format):
+        self._worksheet = worksheet
+        self._date_format = date_format
+        self._row = 0
+
+        for col, header in enumerate(headers):
+            self._worksheet.write_string(0, col, str(header), header_format)
+        self._row = 1
+
+    @property
+    def rows(self) -> int:
+        """Rows written, not counting the header."""
+        return self._row - 1
+
+    def _write_cell(self, col, value) -> None:
+        if isinstance(value, np.generic):
+            value = value.item()
+
+        # Blank cells for missing values, as DataFrame.to_excel writes them
+        if value is None or value is pd.NaT or (isinstance(value, float) and math.isnan(value)):
+            return
+
+        if isinstance(value, datetime.datetime):
+            self._worksheet.write_datetime(self._row, col, value, self._date_format)
+        else:
+            self._worksheet.write(self._row, col, value)
+
+    def write_row(self, row) -> None:
+        for col, value in enumerate(row):
+            self._write_cell(col, value)
+        self._row += 1
+
+    def write_frame(self, df: pd.DataFrame) -> None:
+        for row in df.itertuples(index=False, name=None):
+            self.write_row(row)
+
+
+class StreamingWorkbook:
+    """
+    An xlsx workbook written with xlsxwriter's constant_memory mode, so sheets
+    can be filled as each board or sprint is produced without the workbook (or a
+    DataFrame of the whole program) being held in memory.
+
+        with StreamingWorkbook('report.xlsx') as workbook:
+            sheet = workbook.add_sheet('Sprint Report', headers)
+            for row in rows:
+                sheet.write_row(row)
+    """
+
+    def __init__(self, filename: str):
+        self._workbook = xlsxwriter.Workbook(filename, {'constant_memory': True})
+        # The header style DataFrame.to_excel uses
+        self._header_format = self._workbook.add_format({'bold': True, 'border': 1,
+                                                         'align': 'center', 'valign': 'top'})
+        self._date_format = self._workbook.add_format({'num_format': EXCEL_DATETIME_FORMAT})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def add_sheet(self, name: str, headers) -> StreamingSheet:
+        worksheet = self._workbook.add_worksheet(name[:MAX_SHEET_NAME_LENGTH])
+        return StreamingSheet(worksheet, headers, self._header_format, self._date_format)
+
+    def close(self) -> None:
+        self._workbook.close()
+
+
+def output_format(filename: str, format: str = None) -> str:
+    """
+    :param format: explicit format, which wins over the file suffix
+    :return: one of the FORMAT_* values
+    """
+    if format:
+        return format
+    return OUTPUT_FORMATS.get(os.path.splitext(filename)[1].lower(), FORMAT_XLSX)
+
+
+def unique_columns(columns) -> list:
+    """
+    Rename repeated column names the way pandas.read_csv does ('% Complete',
+    '% Complete.1'), since typed formats need unique names.
+    """
+    seen = {}
+    unique = []
+    for column in columns:
+        if column in seen:
+            seen[column] += 1
+            unique.append(f'{column}.{seen[column]}')
+        else:
+            seen[column] = 0
+            unique.append(column)
+    return unique
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as err:
+        raise ImportError('Parquet and Arrow output need the optional pyarrow package '
+                          '(pip install pyarrow)') from err
+    return pyarrow
+
+
+class CsvTable:
+    """A csv file written in chunks, with the header before the first."""
+
+    def __init__(self, filename: str):
+        self._filename = filename
+        self._header = True
+        open(filename, 'w').close()
+
+    def write(self, df: pd.DataFrame) -> None:
+        df.to_csv(self._filename, mode='a', header=self._header, index=False)
+        self._header = False
+
+    def close(self) -> None:
+        pass
+
+
+class ParquetTable:
+    """A Parquet file written one row group per chunk."""
+
+    def __init__(self, filename: str, compression: str = PARQUET_COMPRESSION):
+        self._pa = _import_pyarrow()
+        self._filename = filename
+        self._compression = compression
+        self._writer = None
+
+    def write(self, df: pd.DataFrame) -> None:
+        table = self._pa.Table.from_pandas(df, preserve_index=False)
+        if self._writer is None:
+            self._writer = self._pa.parquet.ParquetWriter(self._filename, table.schema,
+                                                          compression=self._compression)
+        self._writer.write_table(table.cast(self._writer.schema))
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+class ArrowTable:
+    """An Arrow IPC (Feather v2) file written one record batch per chunk."""
+
+    def __init__(self, filename: str):
+        self._pa = _import_pyarrow()
+        self._filename = filename
+        self._schema = None
+        self._writer = None
+
+    def write(self, df: pd.DataFrame) -> None:
+        table = self._pa.Table.from_pandas(df, preserve_index=False)
+        if self._writer is None:
+            self._schema = table.schema
+            self._writer = self._pa.ipc.new_file(self._filename, self._schema)
+        self._writer.write_table(table.cast(self._schema))
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+class TypedTable:
+    """
+    Give every chunk unique column names and the declared dtypes before it is
+    written, so each chunk (and each run) produces the same schema.
+    """
+
+    def __init__(self, table, dtypes: dict = None):
+        self._table = table
+        self._dtypes = dtypes or {}
+
+    def write(self, df: pd.DataFrame) -> None:
+        df = df.set_axis(unique_columns(df.columns), axis=1)
+        dtypes = {column: dtype for column, dtype in self._dtypes.items() if column in df.columns}
+        self._table.write(df.astype(dtypes))
+
+    def close(self) -> None:
+        self._table.close()
+
+
+class ReportOutput:
+    """
+    Named tables written to a file in the format given, or chosen by its suffix.
+
+    xlsx writes each table as a sheet of one workbook.  The other formats hold a
+    single table, so the first table goes to the file itself and any further
+    ones to '<name>-<table><suffix>' beside it.  Tables can be written in
+    chunks, so reports can be streamed in any format.
+
+        with ReportOutput('report.parquet') as output:
+            table = output.add_table('Sprint Report', dtypes=SPRINT_REPORT_TYPES)
+            table.write(df)
+    """
+
+    def __init__(self, filename: str, format: str = None):
+        self._filename = filename
+        self._format = output_format(filename, format)
+        self._workbook = None
+        self._tables = []
+
+    @property
+    def format(self) -> str:
+        return self._format
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _table_filename(self, name: str) -> str:
+        if not self._tables:
+            return self._filename
+        stem, suffix = os.path.splitext(self._filename)
+        return f'{stem}-{UNSAFE_FILENAME_CHARS.sub("_", name)}{suffix}'
+
+    def add_table(self, name: str, columns=None, dtypes: dict = None):
+        """
+        :param name: sheet name, or file name suffix for the second and later tables
+        :param columns: xlsx header row, written before any chunk
+        :param dtypes: column -> dtype, applied to every chunk in the typed formats
+        :return: table with write(df)
+        """
+        if self._format == FORMAT_XLSX:
+            if self._workbook is None:
+                self._workbook = StreamingWorkbook(self._filename)
+            table = _SheetTable(self._workbook, name, columns)
+        else:
+            filename = self._table_filename(name)
+            if self._format == FORMAT_CSV:
+                table = TypedTable(CsvTable(filename), dtypes)
+            elif self._format == FORMAT_PARQUET:
+                table = TypedTable(ParquetTable(filename), dtypes)
+            elif self._format == FORMAT_ARROW:
+                table = TypedTable(ArrowTable(filename), dtypes)
+            else:
+                raise ValueError(f'Unknown output format {self._format}')
+
+        self._tables.append(table)
+        return table
+
+    def close(self) -> None:
+        for table in self._tables:
+            table.close()
+        if self._workbook is not None:
+            self._workbook.close()
+
+
+class _SheetTable:
+    """A workbook sheet, added when the first chunk arrives if no header was given."""
+
+    def __init__(self, workbook: StreamingWorkbook, name: str, columns=None):
+        self._workbook = workbook
+        self._name = name
+        self._sheet = None if columns is None else workbook.add_sheet(name, columns)
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self._sheet is None:
+            self._sheet = self._workbook.add_sheet(self._name, df.columns)
+        self._sheet.write_frame(df)
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import time
+
+from jamp.cache import SPRINT_STATE_CLOSED
+
+INCREMENTAL_GRACE_DAYS = 7
+STATE_FILE_VERSION = 1
+
+KEY_VERSION = 'version'
+KEY_SPRINTS = 'sprints'
+KEY_STATE = 'state'
+KEY_HASH = 'hash'
+KEY_ROW = 'row'
+KEY_CLOSED_SEEN = 'closedSeen'
+
+
+def report_hash(raw) -> str:
+    text = json.dumps(raw, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class SprintStateFile:
+    """
+    Local record of every sprint seen by previous runs: its last-seen state, the
+    hash of its sprint report and the report row built from it.
+
+    A sprint that has been CLOSED for longer than the grace period is not
+    fetched again; its stored row is reused.  New, active, future and recently
+    closed sprints are always fetched, since their reports can still change.
+    """
+
+    def __init__(self, path: str, grace_days: float = INCREMENTAL_GRACE_DAYS):
+        self._path = path
+        self._grace = grace_days * 24 * 60 * 60
+        self._sprints = {}
+        self.reused = 0
+        self.fetched = 0
+        self.changed = 0
+
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            if state.get(KEY_VERSION) == STATE_FILE_VERSION:
+                self._sprints = state[KEY_SPRINTS]
+
+    @staticmethod
+    def _key(board, sprint) -> str:
+        # The same sprint can show up on several boards, each with its own row
+        return f'{board.id}:{sprint.id}'
+
+    def is_current(self, board, sprint) -> bool:
+        """
+        True if the stored row for the sprint can be reused without fetching its
+        sprint report again.
+        """
+        entry = self._sprints.get(self._key(board, sprint))
+        if entry is None or entry[KEY_CLOSED_SEEN] is None:
+            return False
+
+        if str(sprint.state).upper() != SPRINT_STATE_CLOSED:
+            return False  # Reopened since the last run
+
+        return time.time() - entry[KEY_CLOSED_SEEN] > self._grace
+
+    def row(self, board, sprint) -> tuple:
+        self.reused += 1
+        return tuple(self._sprints[self._key(board, sprint)][KEY_ROW])
+
+    def update(self, board, sprint, new_hash: str, row: tuple) -> None:
+        """
+        :param new_hash: report_hash() of the sprint report just fetched
+        """
+        key = self._key(board, sprint)
+        state = str(sprint.state).upper()
+
+        entry = self._sprints.get(key, {})
+        if entry.get(KEY_HASH) != new_hash:
+            self.changed += 1
+        self.fetched += 1
+
+        closed_seen = entry.get(KEY_CLOSED_SEEN) if state == SPRINT_STATE_CLOSED else None
+        if state == SPRINT_STATE_CLOSED and closed_seen is None:
+            closed_seen = time.time()
+
+        self._sprints[key] = {KEY_STATE: state,
+                              KEY_HASH: new_hash,
+                              KEY_ROW: list(row),
+                              KEY_CLOSED_SEEN: closed_seen}
+
+    def save(self) -> None:
+        # Write then rename, so an interrupted run keeps the previous state
+        with open(self._path + '.tmp', 'w') as f:
+            json.dump({KEY_VERSION: STATE_FILE_VERSION, KEY_SPRINTS: self._sprints}, f)
+        os.replace(self._path + '.tmp', self._path)
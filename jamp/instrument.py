@@ -0,0 +1,236 @@
+"""
+Request and pipeline timing for a metrics run (metrics.py --profile).
+
+Each Jira session's request() is wrapped to time every HTTP request by
+endpoint, and the pipeline marks its phases (boards, sprints, sprint reports,
+added-issue lookups, writing, plotting, ...) with PROFILER.phase(name).  Both
+are no-ops until the profiler is enabled.
+"""
+import json
+import math
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+# Ids in a path (board/42/sprint) are folded so each endpoint is one row
+PATH_ID = re.compile(r'/\d+(?=/|$)')
+REST_PREFIX = '/rest/'
+
+CATEGORY_REQUEST = 'request'
+CATEGORY_PHASE = 'phase'
+
+
+def endpoint_name(url: str) -> str:
+    """
+    :return: the url's path from /rest/ on, without the query and with numeric ids
+        replaced by {id} (e.g. /rest/agile/1.0/board/{id}/sprint)
+    """
+    path = urlsplit(url).path
+    rest = path.find(REST_PREFIX)
+    if rest < 0:
+        return PATH_ID.sub('/{id}', path)
+
+    # Keep the api and its version (/rest/api/2) as they are
+    parts = path[rest:].split('/', 4)
+    if len(parts) < 5:
+        return '/'.join(parts)
+    return '/'.join(parts[:4]) + PATH_ID.sub('/{id}', '/' + parts[4])
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of the values, 0.0 if there are none."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)]
+
+
+class Timings:
+    """Durations (and bytes and requests made) recorded under one name."""
+
+    def __init__(self):
+        self.durations = []
+        self.bytes = 0
+        self.requests = 0
+
+    def summary(self) -> dict:
+        return {'count': len(self.durations),
+                'total': sum(self.durations),
+                'p50': percentile(self.durations, 50),
+                'p95': percentile(self.durations, 95),
+                'bytes': self.bytes,
+                'requests': self.requests}
+
+
+class Profiler:
+    """
+    Collects request timings, phase timings and cache hits from every thread.
+
+    Phases nest; a phase's time includes the phases inside it, and each
+    request is also counted against the phases open on its thread.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def reset(self) -> None:
+        with self._lock:
+            self._origin = time.perf_counter()
+            self._endpoints = {}
+            self._phases = {}
+            self._cache = Counter()
+            self._events = []
+
+    def _phase_stack(self) -> list:
+        if not hasattr(self._local, 'phases'):
+            self._local.phases = []
+        return self._local.phases
+
+    def _event(self, category: str, name: str, start: float, end: float, args: dict) -> None:
+        self._events.append({'cat': category,
+                             'name': name,
+                             'start': start - self._origin,
+                             'duration': end - start,
+                             'thread': threading.get_ident(),
+                             'args': args})
+
+    def instrument(self, session) -> None:
+        """
+        Time every request the session makes.  A session is only wrapped once.
+        """
+        if getattr(session, '_jamp_profiled', False):
+            return
+
+        request = session.request
+
+        def profiled_request(method, url, *args, **kwargs):
+            if not self.enabled:
+                return request(method, url, *args, **kwargs)
+
+            start = time.perf_counter()
+            status = None
+            size = 0
+            try:
+                response = request(method, url, *args, **kwargs)
+                status = response.status_code
+                if not kwargs.get('stream'):
+                    size = len(response.content)
+                return response
+            finally:
+                self.record_request(method, url, start, time.perf_counter(), status, size)
+
+        session.request = profiled_request
+        session._jamp_profiled = True
+
+    def record_request(self, method: str, url: str, start: float, end: float, status, size: int) -> None:
+        endpoint = endpoint_name(url)
+        phases = list(self._phase_stack())
+        with self._lock:
+            timings = self._endpoints.setdefault(endpoint, Timings())
+            timings.durations.append(end - start)
+            timings.bytes += size
+            for phase in set(phases):
+                self._phases.setdefault(phase, Timings()).requests += 1
+                self._phases[phase].bytes += size
+            self._event(CATEGORY_REQUEST, endpoint, start, end,
+                        {'method': method, 'status': status, 'bytes': size,
+                         'phase': phases[-1] if phases else None})
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+            with PROFILER.phase('sprint_report'):
+                ...
+        """
+        if not self.enabled:
+            yield
+            return
+
+        stack = self._phase_stack()
+        stack.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            stack.pop()
+            with self._lock:
+                self._phases.setdefault(name, Timings()).durations.append(end - start)
+                self._event(CATEGORY_PHASE, name, start, end, {})
+
+    def cache(self, name: str, hit: bool) -> None:
+        """Count a hit or miss in the named cache."""
+        if self.enabled:
+            with self._lock:
+                self._cache[(name, hit)] += 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            caches = sorted({name for name, _ in self._cache})
+            return {'endpoints': {name: timings.summary() for name, timings in self._endpoints.items()},
+                    'phases': {name: timings.summary() for name, timings in self._phases.items()},
+                    'cache': {name: {'hits': self._cache[(name, True)],
+                                     'misses': self._cache[(name, False)]}
+                              for name in caches}}
+
+    def table(self) -> str:
+        """The summary as text tables: endpoints, phases, then caches."""
+        summary = self.summary()
+        lines = []
+
+        def section(title, rows, extra):
+            width = max([len(title)] + [len(name) for name in rows])
+            lines.append(f'{title:<{width}}  {"Count":>7}  {"Total s":>9}  {"p50 ms":>9}  {"p95 ms":>9}'
+                         f'  {"KB":>9}  {extra:>8}'.rstrip())
+            for name, row in sorted(rows.items(), key=lambda item: -item[1]['total']):
+                lines.append(f'{name:<{width}}  {row["count"]:>7}  {row["total"]:>9.3f}'
+                             f'  {row["p50"] * 1000:>9.1f}  {row["p95"] * 1000:>9.1f}'
+                             f'  {row["bytes"] / 1e3:>9.1f}  {row["requests"] if extra else "":>8}'.rstrip())
+            lines.append('')
+
+        section('Endpoint', summary['endpoints'], '')
+        section('Phase', summary['phases'], 'Requests')
+        for name, counts in summary['cache'].items():
+            lines.append(f'{name} cache: {counts["hits"]} hits, {counts["misses"]} misses')
+
+        return '\n'.join(lines).rstrip() + '\n'
+
+    def write_json(self, filename: str) -> None:
+        with open(filename, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def write_chrome_trace(self, filename: str) -> None:
+        """
+        Write the requests and phases as complete ('X') events in the Chrome trace
+        event format, for chrome://tracing or Perfetto.
+        """
+        with self._lock:
+            events = list(self._events)
+
+        threads = {}
+        trace = []
+        for event in events:
+            tid = threads.setdefault(event['thread'], len(threads) + 1)
+            trace.append({'name': event['name'],
+                          'cat': event['cat'],
+                          'ph': 'X',
+                          'ts': round(event['start'] * 1e6, 3),
+                          'dur': round(event['duration'] * 1e6, 3),
+                          'pid': 1,
+                          'tid': tid,
+                          'args': event['args']})
+
+        with open(filename, 'w') as f:
+            json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+
+
+PROFILER = Profiler()
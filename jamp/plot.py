@@ -1,8 +1,65 @@
+import os
+
 import matplotlib.pyplot as plt
 import matplotlib.ticker as mtick
 import numpy as np
 import pandas as pd
-from io import StringIO
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from jamp.export import unique_columns, UNSAFE_FILENAME_CHARS
+from jamp.resources import CfdReport
+
+TEAM_GRID_COLUMNS = 4
+TEAM_PANEL_SIZE = (4.8, 3.0)  # inches
+TEAM_IMAGE_SIZE = (8 * 1.618, 8)  # inches, as MetricPlot.plot
+CFD_IMAGE_SIZE = (8 * 1.618, 8)  # inches
+
+# The % Complete marker: a flat bar
+HORZ = 10
+VERT = 1
+MARKER_VERTS = [[-1 * HORZ, -1 * VERT],
+                [1 * HORZ, -1 * VERT],
+                [1 * HORZ, 1 * VERT],
+                [-1 * HORZ, 1 * VERT],
+                [-1 * HORZ, -1 * VERT]]
+
+
+def _sprint_pivot(df: pd.DataFrame, index: list) -> pd.DataFrame:
+    # build_report repeats '% Complete' (story points, then issues).  Name the
+    # ...second one '% Complete.1', as pandas.read_csv does, so the columns can
+    # ...be selected whether the frame comes from memory or from a file.
+    df = df.set_axis(unique_columns(df.columns), axis=1)
+    return df.pivot_table(
+        values=['Story Points Committed', 'Story Points Completed', '% Complete'],
+        index=index,
+        aggfunc={'Story Points Committed': 'sum',
+                 'Story Points Completed': 'sum',
+                 '% Complete': 'mean'})
+
+
+def _draw_sprints(ax1, ax2, pos, pivot: pd.DataFrame, marker_size=100) -> None:
+    """
+    Committed/completed bars on ax1 and the % Complete line on its twin ax2.
+    """
+    ax1.bar(pos, pivot['Story Points Committed'], color='grey', align='edge', width=-0.4)
+    ax1.bar(pos, pivot['Story Points Completed'], color='green', align='edge', width=0.4)
+    ax1.set_ylabel('Story Points')
+    ax1.set_xlabel('Sprints')
+
+    ax2.yaxis.set_major_formatter(mtick.PercentFormatter(1.0))
+
+    ax2.scatter(pos, pivot['% Complete'], s=marker_size, c='purple', marker=MARKER_VERTS)
+    for x, y in zip(pos, pivot['% Complete']):
+        ax2.annotate("{:.0%}".format(y), (x, y))
+    ax2.plot(pos, pivot['% Complete'], color='purple')
+    ax2.set_ylabel('% Complete')
+    ax2.set_ylim(bottom=0)
+
+
+def _image_filename(image_dir: str, name) -> str:
+    return os.path.join(image_dir, f'{UNSAFE_FILENAME_CHARS.sub("_", str(name))}.png')
+
 
 class MetricPlot:
 
@@ -11,58 +68,13 @@ class MetricPlot:
         self._show = show
 
     def plot(self, df: pd.DataFrame) -> None:
-        print(df)
-        # Not sure why I cannot just drop the first column.
-        # ...When I read from CSV it works, but not direct
-        # ...from DataFrame.
-        buffer = StringIO()
-        df.to_csv(buffer, index=False)
-        buffer.seek(0)
-        df = pd.read_csv(buffer)
-        print(df)
-        pivot = df.pivot_table(
-            values=['Story Points Committed', 'Story Points Completed', '% Complete'],
-            index=['Sprint'],
-            aggfunc={'Story Points Committed': np.sum,
-                     'Story Points Completed': np.sum,
-                     '% Complete': np.mean})
-
-        print(pivot)
+        pivot = _sprint_pivot(df, ['Sprint'])
 
         pos = pivot.index
         fig, ax1 = plt.subplots()
         ax2 = ax1.twinx()
 
-        ax1.bar(pos, pivot['Story Points Committed'], color='grey', align='edge', width=-0.4)
-        ax1.bar(pos, pivot['Story Points Completed'], color='green', align='edge', width=0.4)
-        ax1.set_ylabel('Story Points')
-        ax1.set_xlabel('Sprints')
-
-        ax2.yaxis.set_major_formatter(mtick.PercentFormatter(1.0))
-
-        style = dict(linestyle=':',
-                     color='purple',
-                     markersize=30,
-                     mfc="C0",
-                     mec="C0")
-
-        horz = 10
-        vert = 1
-        verts = [[-1 * horz, -1 * vert],
-                 [1 * horz, -1 * vert],
-                 [1 * horz, 1 * vert],
-                 [-1 * horz, 1 * vert],
-                 [-1 * horz, -1 * vert]]
-
-        for index, point in enumerate(pivot['% Complete']):
-            x = pos[index]
-            y = point
-            print(index, x, y)
-            ax2.scatter(x, y, s=100, c='purple', marker=verts)
-            ax2.annotate("{:.0%}".format(y), (x, y))
-        ax2.plot(pos, pivot['% Complete'], color='purple')
-        ax2.set_ylabel('% Complete')
-        ax2.set_ylim(bottom=0)
+        _draw_sprints(ax1, ax2, pos, pivot)
 
         golden_ratio = 1.618
         vert = 8
@@ -71,3 +83,186 @@ class MetricPlot:
         plt.savefig(self._image_filename, dpi=100.0, format='png')
         if (self._show):
             plt.show()
+
+
+class TeamPlot:
+    """
+    Per-team sprint charts, from one pass over the sprint report.
+
+    The report is pivoted by team and sprint once.  The charts are drawn on
+    figures with their own Agg canvas rather than through pyplot, so nothing is
+    shown or kept in pyplot's figure registry.  One PNG per team reuses a single
+    figure, and a grid is one figure with a panel per team.  Either way the
+    rendering time grows linearly with the number of teams.
+    """
+
+    def __init__(self, columns: int = TEAM_GRID_COLUMNS, dpi: float = 100.0):
+        self._columns = columns
+        self._dpi = dpi
+
+    @staticmethod
+    def _teams(df: pd.DataFrame):
+        pivot = _sprint_pivot(df, ['Team', 'Sprint'])
+        for team, team_pivot in pivot.groupby(level='Team', sort=False):
+            yield team, team_pivot.droplevel('Team')
+
+    @staticmethod
+    def _draw_team(ax1, ax2, team, pivot: pd.DataFrame, marker_size) -> None:
+        # Numeric positions, so a reused axes doesn't keep the last team's sprints
+        pos = np.arange(len(pivot))
+        _draw_sprints(ax1, ax2, pos, pivot, marker_size)
+        ax1.set_xticks(pos)
+        ax1.set_xticklabels(pivot.index, rotation=30, ha='right', fontsize='small')
+        ax1.set_title(str(team))
+
+    @staticmethod
+    def _clear(ax1, ax2) -> None:
+        ax1.cla()
+        ax2.cla()
+        # cla() undoes the twinx() set up
+        ax2.yaxis.tick_right()
+        ax2.yaxis.set_label_position('right')
+        ax2.patch.set_visible(False)
+
+    def plot_grid(self, df: pd.DataFrame, image_file: str) -> int:
+        """
+        One image with a panel per team.
+
+        :return: number of teams drawn
+        """
+        teams = list(self._teams(df))
+        if not teams:
+            return 0
+
+        columns = min(self._columns, len(teams))
+        rows = -(-len(teams) // columns)
+        fig = Figure(figsize=(TEAM_PANEL_SIZE[0] * columns, TEAM_PANEL_SIZE[1] * rows))
+        FigureCanvasAgg(fig)
+
+        axes = fig.subplots(rows, columns, squeeze=False).ravel()
+        for ax1, (team, pivot) in zip(axes, teams):
+            self._draw_team(ax1, ax1.twinx(), team, pivot, marker_size=30)
+        for ax1 in axes[len(teams):]:
+            ax1.set_axis_off()
+
+        fig.tight_layout()
+        fig.savefig(image_file, dpi=self._dpi, format='png')
+        return len(teams)
+
+    def plot_each(self, df: pd.DataFrame, image_dir: str) -> list:
+        """
+        One image per team, named after the team, all drawn on the same figure.
+
+        :return: the image file names
+        """
+        os.makedirs(image_dir, exist_ok=True)
+
+        fig = Figure(figsize=TEAM_IMAGE_SIZE)
+        FigureCanvasAgg(fig)
+        ax1 = fig.add_subplot()
+        ax2 = ax1.twinx()
+
+        image_files = []
+        for team, pivot in self._teams(df):
+            self._clear(ax1, ax2)
+            self._draw_team(ax1, ax2, team, pivot, marker_size=100)
+
+            image_file = _image_filename(image_dir, team)
+            fig.savefig(image_file, dpi=self._dpi, format='png')
+            image_files.append(image_file)
+
+        return image_files
+
+
+class CfdPlot:
+    """
+    Stacked-area cumulative flow diagrams, the first board column on top and the
+    last (done) column at the bottom.
+
+    A board's CFD has a row per column change, which can be millions, while the
+    image is only a few thousand pixels wide.  The column counts are sampled
+    once per pixel across the image, so drawing time depends on the image size
+    rather than the board's history.
+    """
+
+    def __init__(self, size=CFD_IMAGE_SIZE, dpi: float = 100.0):
+        self._size = size
+        self._dpi = dpi
+
+    @property
+    def samples(self) -> int:
+        """Points drawn per column: one per pixel across the image."""
+        return max(2, int(self._size[0] * self._dpi))
+
+    def _sample_times(self, first, last) -> np.ndarray:
+        return np.linspace(first, last, self.samples).astype(np.int64)
+
+    def plot(self, cfd: CfdReport, image_file: str) -> bool:
+        """
+        :return: False, with no image written, if the board has no column changes
+        """
+        if len(cfd.changes()['timestamp']) == 0:
+            return False
+
+        times = self._sample_times(*cfd.time_span())
+        self._draw(times, cfd.column_counts_at(times), cfd.column_names(), cfd.board_name, image_file)
+        return True
+
+    def plot_frame(self, df: pd.DataFrame, columns, image_file: str, title: str = None) -> bool:
+        """
+        Plot CfdReport.report() or resampled_report() output.  Each sample takes
+        the last row at or before its time.
+
+        :param columns: the board columns, in board order
+        :return: False, with no image written, if the frame is empty
+        """
+        if df.empty:
+            return False
+
+        dates = df['date'].values.astype('datetime64[ms]').astype(np.int64)
+        counts = df[list(columns)].values
+        if len(dates) > 1 and (np.diff(dates) < 0).any():
+            order = np.argsort(dates, kind='stable')
+            dates, counts = dates[order], counts[order]
+
+        times = dates
+        if len(dates) > self.samples:
+            times = self._sample_times(dates[0], dates[-1])
+            counts = counts[np.searchsorted(dates, times, side='right') - 1]
+
+        self._draw(times, counts, columns, title, image_file)
+        return True
+
+    def plot_each(self, cfd_reports, image_dir: str) -> list:
+        """
+        One image per board, named after the board.
+
+        :return: the image file names
+        """
+        os.makedirs(image_dir, exist_ok=True)
+
+        image_files = []
+        for cfd in cfd_reports:
+            image_file = _image_filename(image_dir, cfd.board_name)
+            if self.plot(cfd, image_file):
+                image_files.append(image_file)
+        return image_files
+
+    def _draw(self, times: np.ndarray, counts: np.ndarray, columns, title, image_file: str) -> None:
+        fig = Figure(figsize=self._size)
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+
+        # Last column at the bottom of the stack, as Jira draws it
+        ax.stackplot(times.astype('datetime64[ms]'), counts[:, ::-1].T, labels=list(columns)[::-1])
+        handles, labels = ax.get_legend_handles_labels()
+        ax.legend(handles[::-1], labels[::-1], loc='upper left')
+
+        ax.set_ylabel('Issues')
+        ax.set_xlabel('Date')
+        ax.set_ylim(bottom=0)
+        if title:
+            ax.set_title(str(title))
+        fig.autofmt_xdate()
+
+        fig.savefig(image_file, dpi=self._dpi, format='png')
@@ -1,4 +1,3 @@
-import datetime
 import math
 import pprint
 import numpy as np
@@ -7,6 +6,7 @@ from jira.resources import Resource, GreenHopperResource
 
 import jamp
 from jamp import JiraFieldMapper, NAN, JIRA_KEY_KEY, JIRA_KEY_VALUE
+from jamp.instrument import PROFILER
 
 
 class Team(Resource):
@@ -19,6 +19,12 @@ class Team(Resource):
 
 KEY_ISSUE_KEYS_ADDED_DURING_SPRINT = 'issueKeysAddedDuringSprint'
 KEY_ESTIMATE_STATISTIC = 'estimateStatistic'
+KEY_CURRENT_ESTIMATE_STATISTIC = 'currentEstimateStatistic'
+
+# Limits for batched issue 'search' requests.  Jira caps maxResults (100 on Cloud)
+# ...and the JQL travels in the query string, so keep it well under URL limits.
+SEARCH_MAX_RESULTS = 100
+SEARCH_MAX_JQL_LENGTH = 2000
 
 STATS = ('completedIssuesInitialEstimateSum',
          'completedIssuesEstimateSum',
@@ -36,12 +42,96 @@ LISTS = ('completedIssues',
          KEY_ISSUE_KEYS_ADDED_DURING_SPRINT)
 COUNTS = [x + 'Count' for x in LISTS]
 
+# Lists whose initial estimates include the issues added during the sprint
+ESTIMATED_LISTS = ('completedIssues',
+                   'issuesNotCompletedInCurrentSprint',
+                   'puntedIssues')
+
+
+def _chunk_issue_keys(issue_keys: list,
+                      max_keys: int = SEARCH_MAX_RESULTS,
+                      max_length: int = SEARCH_MAX_JQL_LENGTH) -> list:
+    """
+    Split the issue keys into chunks that fit in one 'key in (...)' search.
+
+    :return: list of lists of issue keys
+    """
+    chunks = []
+    chunk = []
+    length = 0
+    for issue_key in issue_keys:
+        if chunk and (len(chunk) >= max_keys or length + len(issue_key) + 1 > max_length):
+            chunks.append(chunk)
+            chunk = []
+            length = 0
+        chunk.append(issue_key)
+        length += len(issue_key) + 1
+
+    if chunk:
+        chunks.append(chunk)
+
+    return chunks
+
+
+def _search_params(issue_keys: list, story_points_field: str) -> dict:
+    return {'jql': f"key in ({','.join(issue_keys)})",
+            'fields': story_points_field,
+            'maxResults': len(issue_keys)}
+
+
+def _sum_story_points(issues: list, story_points_field: str) -> float:
+    story_points_sum = 0
+    for issue in issues:
+        story_point = issue[jamp.JIRA_KEY_FIELDS].get(story_points_field)
+
+        # sometime story_points returns NoneType so check it first
+        if story_point:
+            story_points_sum += story_point
+
+    return story_points_sum
+
+
+def _estimate_value(statistic) -> float:
+    stat_field = statistic['statFieldValue'] if statistic else None
+    if stat_field:
+        return stat_field[JIRA_KEY_VALUE]
+    return 0.0
+
+
+def _estimate_index(issues_list: list) -> dict:
+    """
+    Map each issue key in a sprint report list to its (initial, current) estimate.
+
+    The first entry for a key wins, and indexing stops at the first issue without
+    an estimateStatistic: issues after it were never matched by the original
+    linear scan, so they count as unestimated.
+
+    :return: dict of issue key -> (initial, current)
+    """
+    index = {}
+    for issue in issues_list:
+        if KEY_ESTIMATE_STATISTIC not in issue:
+            break
+
+        if issue[JIRA_KEY_KEY] not in index:
+            index[issue[JIRA_KEY_KEY]] = (_estimate_value(issue[KEY_ESTIMATE_STATISTIC]),
+                                          _estimate_value(issue.get(KEY_CURRENT_ESTIMATE_STATISTIC)))
+
+    return index
+
 
 class SprintReport(GreenHopperResource):
     """A SprintReport."""
 
-    def __init__(self, options, session, raw=None):
-        self._map = JiraFieldMapper(options, session)
+    def __init__(self, options, session, raw=None, added_sum=None):
+        """
+        :param added_sum: story points of the issues added during the sprint, when
+            the caller has already fetched them.  Otherwise they are looked up
+            while parsing the raw report.
+        """
+        # Built on first use, so a report with a known added_sum makes no requests
+        self._map = None
+        self._prefetched_added_sum = added_sum
         options['agile_rest_path'] = 'greenhopper'
         path = 'rapid/charts/sprintreport?{0}'
         GreenHopperResource.__init__(self, path, options, session, raw)
@@ -64,23 +154,68 @@ class SprintReport(GreenHopperResource):
         # Save off the list of added issues
         self._added = raw['contents'][KEY_ISSUE_KEYS_ADDED_DURING_SPRINT]
 
-        self._added_sum = 0
-        for issue_key in self._added:
-            resource_format = f"issue/{issue_key}"
-            resource = self._build_resource(resource_format)
+        if self._prefetched_added_sum is None:
+            self._added_sum = self._story_points_sum(list(self._added))
+        else:
+            self._added_sum = self._prefetched_added_sum
 
-            story_points_field = self.jira_key('Story Points')
-            story_point = resource.raw[jamp.JIRA_KEY_FIELDS][story_points_field]
+        self._cache_contents()
 
-            # sometime story_points returns NoneType so check it first
-            if story_point:
-                self._added_sum += story_point
+        # Index the estimates once, then derive everything that depends on them
+        contents = raw['contents']
+        self._estimates = {name: _estimate_index(contents.get(name) or [])
+                           for name in ESTIMATED_LISTS}
+        self._issues_added_initial_estimate_sum = self._added_initial_estimate_sum()
+        self._committed = self._committed_sum()
+        self._committed_count = self._count_committed()
 
-    def _build_resource(self, resource_format):
+    def _cache_contents(self):
+        """
+        Store the stats, lists and counts as plain instance attributes, so reading
+        them is an ordinary attribute lookup rather than a trip through __getattr__.
+        Anything missing from the contents is left to __getattr__.
+        """
+        contents = self.contents
+        for item in STATS:
+            stat = getattr(contents, item, None)
+            if stat is not None:
+                self.__dict__[item] = self._normalize_contents_stat(stat)
+
+        for item, count in zip(LISTS, COUNTS):
+            if item == KEY_ISSUE_KEYS_ADDED_DURING_SPRINT:
+                value = self._added
+            elif hasattr(contents, item):
+                value = getattr(contents, item)
+            else:
+                continue
+            self.__dict__[item] = value
+            self.__dict__[count] = len(value) if value else 0
+
+    def _story_points_sum(self, issue_keys: list) -> float:
+        """
+        Sum the story points of the issues with batched 'search' requests rather
+        than one 'issue/<key>' request per issue.
+
+        :param issue_keys: issue keys (e.g. ['AV-14', 'AV-16'])
+        :return: sum of the story points, 0 if there are no issues
+        """
+        story_points_sum = 0
+        if not issue_keys:
+            return story_points_sum
+
+        story_points_field = self.jira_key('Story Points')
+        with PROFILER.phase('added_issues'):
+            for chunk in _chunk_issue_keys(issue_keys):
+                resource = self._build_resource('search', params=_search_params(chunk, story_points_field))
+                story_points_sum += _sum_story_points(resource.raw['issues'], story_points_field)
+
+        return story_points_sum
+
+    def _build_resource(self, resource_format, params=None):
         resource = Resource(resource_format,
                             options=self._options,
                             session=self._session)
-        resource.find(None)  # Simply calling find() populates the Resource
+        resource.find(None, params=params)  # Simply calling find() populates the Resource
         return resource
 
     def delete(self, params=None):
@@ -155,6 +290,8 @@ class SprintReport(GreenHopperResource):
             return super().__getattribute__(item)
 
     def jira_key(self, field_key) -> str:
+        if self._map is None:
+            self._map = JiraFieldMapper(self._options, self._session)
         return self._map.jira_key(field_key)
 
     @property
@@ -167,6 +304,9 @@ class SprintReport(GreenHopperResource):
 
     @property
     def committed(self) -> float:
+        return self._committed
+
+    def _committed_sum(self) -> float:
         committed = 0.0
         if not math.isnan(self.issuesNotCompletedInitialEstimateSum):
             committed = self.issuesNotCompletedInitialEstimateSum
@@ -175,12 +315,15 @@ class SprintReport(GreenHopperResource):
         if not math.isnan(self.puntedIssuesInitialEstimateSum):
             committed += self.puntedIssuesInitialEstimateSum
 
-        committed -= self.issues_added_initial_estimate_sum
+        committed -= self._issues_added_initial_estimate_sum
 
         return committed
 
     @property
     def committed_count(self) -> int:
+        return self._committed_count
+
+    def _count_committed(self) -> int:
         committed = 0
         committed += self.issuesNotCompletedInCurrentSprintCount
         committed += self.completedIssuesCount
@@ -201,42 +344,13 @@ class SprintReport(GreenHopperResource):
         percent_completed = self.completed_count / self.committed_count
         return percent_completed
 
-    def _initial_estimate_stat(self, issues_list: list, issue_match=None) -> float:
-        sum = 0
-        for issue in issues_list:
-            if KEY_ESTIMATE_STATISTIC not in issue:
-                return 0.0
-
-            stat_field = issue[KEY_ESTIMATE_STATISTIC]['statFieldValue']
-            if stat_field:
-                stat = stat_field[JIRA_KEY_VALUE]
-            else:
-                stat = 0.0
-
-            if issue_match:
-                if issue[JIRA_KEY_KEY] == issue_match:
-                    return stat
-            else:
-                sum += stat
-
-        return sum
-
-    def _final_estimate_stat(self, issues_list: list, issue_match=None) -> float:
-        sum = 0
-        for issue in issues_list:
-            stat_field = issue['currentEstimateStatistic']['statFieldValue']
-            if stat_field:
-                stat = stat_field[JIRA_KEY_VALUE]
-            else:
-                stat = 0.0
-
-            if issue_match:
-                if issue[JIRA_KEY_KEY] == issue_match:
-                    return stat
-            else:
-                sum += stat
-
-        return sum
+    def estimate(self, issues_list_name: str, issue_key: str) -> tuple:
+        """
+        :param issues_list_name: one of ESTIMATED_LISTS (e.g. 'completedIssues')
+        :param issue_key: issue key (e.g. 'AV-14')
+        :return: (initial, current) estimate of the issue in that list, or None
+        """
+        return self._estimates[issues_list_name].get(issue_key)
 
     @property
     def issues_added_initial_estimate_sum(self):
@@ -245,17 +359,68 @@ class SprintReport(GreenHopperResource):
         sprint report.
         :return:
         """
+        return self._issues_added_initial_estimate_sum
+
+    def _added_initial_estimate_sum(self) -> float:
         sum = 0.0
         for issue_key in self._added:
-            contents = self.raw['contents']
-            sum += self._initial_estimate_stat(contents['completedIssues'], issue_key)
-            sum += self._initial_estimate_stat(contents['issuesNotCompletedInCurrentSprint'], issue_key)
-            sum += self._initial_estimate_stat(contents['puntedIssues'], issue_key)
+            for estimates in self._estimates.values():
+                initial, _ = estimates.get(issue_key, (0.0, 0.0))
+                sum += initial
             # TODO: should this be included: 'issuesCompletedInAnotherSprint?????
 
         return sum
 
 
+# SprintReport figures kept by SprintSummary, under the same names
+SUMMARY_FIELDS = ('committed',
+                  'committed_count',
+                  'added_sum',
+                  'added_count',
+                  'puntedIssuesEstimateSum',
+                  'issuesNotCompletedEstimateSum',
+                  'completedIssuesEstimateSum',
+                  'puntedIssuesCount',
+                  'issuesNotCompletedInCurrentSprintCount',
+                  'completedIssuesCount',
+                  'percent_complete_count')
+
+
+class SprintSummary:
+    """
+    The sprint metadata and figures build_report needs from a SprintReport.
+
+    A SprintReport holds the full greenhopper json, the PropertyHolder tree built
+    from it, the session and a field mapper.  A program-wide extract only needs
+    a dozen numbers per sprint, so summarize each report as soon as it is fetched
+    and let the report itself be garbage collected.
+    """
+    __slots__ = ('sprint_id', 'sprint_name', 'sprint_state', 'digest') + SUMMARY_FIELDS
+
+    def __init__(self, sprint_id, sprint_name, sprint_state, digest=None, **figures):
+        self.sprint_id = sprint_id
+        self.sprint_name = sprint_name
+        self.sprint_state = sprint_state
+        self.digest = digest
+        for field in SUMMARY_FIELDS:
+            setattr(self, field, figures[field])
+
+    @classmethod
+    def from_report(cls, sprint_report: SprintReport, digest=None) -> 'SprintSummary':
+        """
+        :param digest: optional hash of the raw report, for change detection
+        """
+        sprint = sprint_report.sprint
+        return cls(sprint.id, sprint.name, sprint.state, digest,
+                   **{field: getattr(sprint_report, field) for field in SUMMARY_FIELDS})
+
+
+KEY_VELOCITY_STAT_ENTRIES = 'velocityStatEntries'
+VELOCITY_ESTIMATED = 'estimated'
+VELOCITY_COMPLETED = 'completed'
+VELOCITY_STATS = (VELOCITY_ESTIMATED, VELOCITY_COMPLETED)
+
+
 class VelocityReport(GreenHopperResource):
     """
     .../rapid/charts/velocity.json?
@@ -268,22 +433,60 @@ class VelocityReport(GreenHopperResource):
     def __init__(self, options, session, raw=None):
         options['agile_rest_path'] = 'greenhopper'
         path = 'rapid/charts/velocity.json?{0}'
+        self._frame = None
         GreenHopperResource.__init__(self, path, options, session, raw)
 
+    def frame(self) -> pd.DataFrame:
+        """
+        The velocityStatEntries as a DataFrame indexed by sprint id (int), with a
+        float column per stat in VELOCITY_STATS.  Stats without a value are NaN.
+        """
+        if self._frame is None:
+            entries = self.raw.get(KEY_VELOCITY_STAT_ENTRIES) or {}
+            sprint_ids = np.fromiter((int(sprint_id) for sprint_id in entries), dtype=np.int64,
+                                     count=len(entries))
+            stats = {stat: np.array([entry.get(stat, {}).get(JIRA_KEY_VALUE, NAN)
+                                     for entry in entries.values()], dtype=np.float64)
+                     for stat in VELOCITY_STATS}
+            self._frame = pd.DataFrame(stats, index=pd.Index(sprint_ids, name='sprint'))
+
+        return self._frame
+
     def _velocity_stat(self, sprint_id, stat):
         try:
-            stat_entry = self.raw['velocityStatEntries'][str(sprint_id)]
-        except KeyError as e:
-            return float('NaN')
-
-        committed = stat_entry[stat][JIRA_KEY_VALUE]
-        return float(committed)
+            return float(self.frame().at[int(sprint_id), stat])
+        except (KeyError, ValueError):
+            return NAN
 
     def committed(self, sprint_id: int) -> float:
-        return self._velocity_stat(sprint_id, 'estimated')
+        return self._velocity_stat(sprint_id, VELOCITY_ESTIMATED)
 
     def completed(self, sprint_id: int) -> float:
-        return self._velocity_stat(sprint_id, 'completed')
+        return self._velocity_stat(sprint_id, VELOCITY_COMPLETED)
+
+
+KEY_COLUMN_CHANGES = 'columnChanges'
+KEY_COLUMNS = 'columns'
+KEY_COLUMN_FROM = 'columnFrom'
+KEY_COLUMN_TO = 'columnTo'
+KEY_STATUS_TO = 'statusTo'
+KEY_FIRST_CHANGE_TIME = 'firstChangeTime'
+KEY_NOW = 'now'
+
+COL_UNKNOWN = -1
+
+# Column types of CfdReport.report() ahead of the per-board column counts, for
+# the typed output formats.  status_to mixes status ids with COL_UNKNOWN, which
+# Parquet and Arrow can't hold in one column, so it is written as text ('-1').
+CFD_REPORT_TYPES = {'date': 'datetime64[ns]',
+                    'key': 'string',
+                    'from': 'int64',
+                    'to': 'int64',
+                    'status_to': 'string'}
+
+# Bucket sizes for CfdReport.resampled_report, as pandas period aliases
+CFD_INTERVALS = {'daily': 'D',
+                 'weekly': 'W'}
 
 
 class CfdReport(GreenHopperResource):
@@ -295,95 +498,157 @@ class CfdReport(GreenHopperResource):
         options['agile_rest_path'] = 'greenhopper'
         path = 'rapid/charts/cumulativeflowdiagram?{0}'
         self._config = config
+        self._changes = None
         GreenHopperResource.__init__(self, path, options, session, raw)
 
+    def _parse_raw(self, raw):
+        """
+        Overridden so the columnChanges payload, which can hold millions of changes,
+        stays a plain dict in self.raw rather than being converted into
+        PropertyHolder attributes.
+
+        :param raw:
+        :return:
+        """
+        GreenHopperResource._parse_raw(self, {key: value for key, value in raw.items()
+                                              if key != KEY_COLUMN_CHANGES})
+        self.raw = raw
+
     @property
     def board_name(self) -> str:
         return self._config['currentViewConfig']['name']
 
+    def changes(self) -> dict:
+        """
+        The columnChanges payload flattened into one NumPy array per field, one
+        entry per change, in payload order.
+
+        :return: dict with 'timestamp' (ms since epoch), 'key', 'from', 'to' and
+            'status_to' arrays.  Unknown columns/statuses are COL_UNKNOWN.
+        """
+        if self._changes is None:
+            column_changes = self.raw[KEY_COLUMN_CHANGES]
+            events = [event for value in column_changes.values() for event in value]
+            count = len(events)
+
+            change_times = np.fromiter((int(key) for key in column_changes),
+                                       dtype=np.int64, count=len(column_changes))
+            per_change = np.fromiter((len(value) for value in column_changes.values()),
+                                     dtype=np.int64, count=len(column_changes))
+
+            self._changes = {
+                'timestamp': np.repeat(change_times, per_change),
+                'key': np.array([event['key'] for event in events], dtype=object),
+                'from': np.fromiter((event.get(KEY_COLUMN_FROM, COL_UNKNOWN) for event in events),
+                                    dtype=np.int64, count=count),
+                'to': np.fromiter((event.get(KEY_COLUMN_TO, COL_UNKNOWN) for event in events),
+                                  dtype=np.int64, count=count),
+                'status_to': np.array([event.get(KEY_STATUS_TO, COL_UNKNOWN) for event in events],
+                                      dtype=object),
+            }
+
+        return self._changes
+
+    def _column_deltas(self) -> np.ndarray:
+        """
+        Every change adds one to the column it enters and removes one from the
+        column it leaves.
+
+        :return: (changes x columns) int64 array of +1/-1 entries
+        """
+        changes = self.changes()
+        count = len(changes['timestamp'])
+        rows = np.arange(count)
+
+        delta = np.zeros((count, len(self.raw[KEY_COLUMNS])), dtype=np.int64)
+        entered = changes['to'] != COL_UNKNOWN
+        delta[rows[entered], changes['to'][entered]] += 1
+        exited = changes['from'] != COL_UNKNOWN
+        delta[rows[exited], changes['from'][exited]] -= 1
+
+        return delta
+
+    def column_counts(self) -> np.ndarray:
+        """
+        Number of issues in each board column after each change, i.e. the
+        cumulative sum of the entry/exit deltas.
+
+        :return: (changes x columns) int64 array
+        """
+        return self._column_deltas().cumsum(axis=0)
+
+    def column_counts_at(self, times) -> np.ndarray:
+        """
+        Number of issues in each board column at each of the given times.
+
+        :param times: ascending ms timestamps; a change at exactly that time counts
+        :return: (times x columns) int64 array, zero before the first change
+        """
+        timestamps = self.changes()['timestamp']
+        order = np.argsort(timestamps, kind='stable')
+        counts = self._column_deltas()[order].cumsum(axis=0)
+
+        positions = np.searchsorted(timestamps[order], times, side='right') - 1
+        at = np.zeros((len(positions), counts.shape[1]), dtype=np.int64)
+        known = positions >= 0
+        at[known] = counts[positions[known]]
+        return at
+
+    def time_span(self) -> tuple:
+        """
+        :return: (first, now) ms timestamps the chart covers, from the payload or
+            else from the changes themselves
+        """
+        timestamps = self.changes()['timestamp']
+        first = self.raw.get(KEY_FIRST_CHANGE_TIME, timestamps.min() if len(timestamps) else 0)
+        now = self.raw.get(KEY_NOW, timestamps.max() if len(timestamps) else first)
+        return first, now
+
+    def column_names(self) -> list:
+        return [column['name'] for column in self.raw[KEY_COLUMNS]]
+
+    def resampled_report(self, freq: str = CFD_INTERVALS['daily']) -> pd.DataFrame:
+        """
+        Per-column WIP at the end of each time bucket from the first change to
+        'now', one row per bucket rather than one per change.
+
+        :param freq: pandas period alias for the bucket size (e.g. 'D', 'W')
+        :return: DataFrame with the bucket start 'date' and one column per board column
+        """
+        if len(self.changes()['timestamp']) == 0:
+            return pd.DataFrame()
+
+        first, now = self.time_span()
+
+        periods = pd.period_range(start=pd.Timestamp(first, unit='ms'),
+                                  end=pd.Timestamp(now, unit='ms'),
+                                  freq=freq)
+        ends = periods.end_time.values.astype('datetime64[ms]').astype(np.int64)
+        counts = self.column_counts_at(np.minimum(ends, now))
+
+        data = {'date': periods.start_time.values.astype('datetime64[ns]')}
+        for index, column in enumerate(self.raw[KEY_COLUMNS]):
+            data[column['name']] = counts[:, index]
+
+        return pd.DataFrame(data)
+
     def report(self) -> pd.DataFrame:
-        KEY_COLUMN_CHANGES = 'columnChanges'
-        KEY_COLUMNS = 'columns'
-        KEY_COLUMN_FROM = 'columnFrom'
-        KEY_COLUMN_TO = 'columnTo'
-        KEY_STATUS_TO = 'statusTo'
-        KEY_CUM_WIP = 'cumWip'
-        KEY_DATE = 'date'
-
-        COL_UNKNOWN = -1
-
-        cum = {}
-        _entry = {}
-        _exit = {}
-        columns = self.raw[KEY_COLUMNS]
-        for index, title in enumerate(columns):
-            cum[index] = {'title': title['name'],
-                          'value': 0
-                          }
-            _entry[index] = 0
-            _exit[index] = 0
-
-        data = []
-        for col_key, value in self.raw[KEY_COLUMN_CHANGES].items():
-            # print(col_key)
-            timestamp = int(col_key)
-            ts = datetime.datetime.utcfromtimestamp(timestamp/1000).strftime('%Y-%m-%d %H:%M:%S')
-
-            for i in value:
-                col_from = i.get(KEY_COLUMN_FROM, COL_UNKNOWN)
-                col_to = i.get(KEY_COLUMN_TO, COL_UNKNOWN)
-                status_to = i.get(KEY_STATUS_TO, COL_UNKNOWN)
-
-                if col_from != COL_UNKNOWN:
-                    _exit[col_from] += 1
-
-                if col_to != COL_UNKNOWN:
-                    _entry[col_to] += 1
-
-                for index, col in enumerate(columns):
-                    cum[index]['value'] = _entry[index] - _exit[index]
-
-                if status_to in ("4", "10000"):
-                    count_open = 1
-                else:
-                    count_open = 0
+        changes = self.changes()
+        if len(changes['timestamp']) == 0:
+            return pd.DataFrame()
+
+        # Whole seconds, as the report has always shown
+        seconds = changes['timestamp'] // 1000 * 1000
+        data = {
+            'date': seconds.astype('datetime64[ms]').astype('datetime64[ns]'),
+            'key': changes['key'],
+            'from': changes['from'],
+            'to': changes['to'],
+            'status_to': changes['status_to'],
+        }
 
-                if status_to in ("5", "3"):
-                    count_wip = 1
-                else:
-                    count_wip = 0
+        counts = self.column_counts()
+        for index, column in enumerate(self.raw[KEY_COLUMNS]):
+            data[column['name']] = counts[:, index]
 
-                if status_to in ("6", "10001"):
-                    count_done = 1
-                else:
-                    count_done = 0
-
-                item = {
-                    'date': ts,
-                    'key': i['key'],
-                    'from': col_from,
-                    'to': col_to,
-                    'status_to': status_to,
-                    # 'cumEnterOpen': cum_enter_open,
-                    # 'cumExitOpen': cum_exit_open,
-                    # 'cumEnterInProgress': cum_enter_inprogress,
-                    # 'cumExitInProgress' : cum_exit_inprogress,
-                    # 'cumEnterFinished': cum_enter_finished,
-                    # 'cumExitFinished' : cum_exit_finished,
-                    # 'cumEnterDone' : cum_enter_done,
-                    # 'cumExitDone' : cum_exit_done,
-                    # 'cumWip' : cum_finished + cum_in_progress,
-                    # 'countOpen' : count_open,
-                    # 'countWip': count_wip,
-                    # 'countDone': count_done
-                }
-                for key, counter in cum.items():
-                    item[counter['title']] = counter['value']
-
-                data.append(item)
-
-        df = pd.DataFrame(data)
-        if data:
-            df = df.astype(dtype={'date': np.datetime64})
-
-        return pd.DataFrame(df)
+        return pd.DataFrame(data)
@@ -0,0 +1,233 @@
+"""
+A request scheduler shared by every Jira session of a run, so a parallel extract
+keeps just under the server's rate limit instead of being throttled.
+
+    scheduler = RequestScheduler(rate=10, max_concurrency=8)
+    reports = JIRAReports(server=..., basic_auth=..., scheduler=scheduler)
+
+Requests wait for a token (rate, burst) and for one of the concurrency slots.
+The number of slots adapts: it grows by one per round of successful requests
+and halves when the server throttles (AIMD).  A throttled request pauses every
+session for the response's Retry-After and is then retried.  When requests are
+waiting, sprint reports are sent first and added-issue searches last.
+
+Time spent waiting (for a slot, a token, a pause or a retry's backoff) is
+profiled as the 'schedule_wait' phase.  Sessions instrumented by the profiler
+before attach() time only the requests themselves.
+"""
+import random
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from heapq import heappush, heappop
+
+from jamp.instrument import PROFILER
+
+# Lower is sent first
+PRIORITY_REPORT = 0
+PRIORITY_AGILE = 1
+PRIORITY_DEFAULT = 2
+PRIORITY_LOOKUP = 3
+
+ENDPOINT_PRIORITIES = ((re.compile(r'/rest/greenhopper/'), PRIORITY_REPORT),
+                       (re.compile(r'/rest/agile/'), PRIORITY_AGILE),
+                       (re.compile(r'/rest/api/\d+/search'), PRIORITY_LOOKUP))
+
+# Throttled responses slow every session down; the others are only retried
+THROTTLE_STATUSES = (429, 503)
+RETRY_STATUSES = (429, 502, 503, 504)
+
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF = 1.0  # seconds, doubled on each retry without a Retry-After
+MAX_BACKOFF = 30.0
+MAX_RETRY_AFTER = 120.0  # a longer Retry-After is returned to the caller rather than waited out
+
+PHASE_WAIT = 'schedule_wait'
+
+
+def request_priority(url: str) -> int:
+    for pattern, priority in ENDPOINT_PRIORITIES:
+        if pattern.search(url):
+            return priority
+    return PRIORITY_DEFAULT
+
+
+def retry_after(response):
+    """
+    :return: seconds from the response's Retry-After header (delta seconds or an
+        HTTP date), or None if it has none
+    """
+    value = response.headers.get('Retry-After') if response is not None else None
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """rate tokens per second, holding at most burst."""
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = now
+
+    def take(self, now: float) -> float:
+        """
+        Take a token if one is available.
+
+        :return: 0.0 if a token was taken, otherwise the seconds until one is
+        """
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return 0.0
+        return (1.0 - self._tokens) / self.rate
+
+
+class RequestScheduler:
+
+    def __init__(self, rate: float = None, burst: float = None, max_concurrency: int = 8,
+                 min_concurrency: int = 1, max_retries: int = DEFAULT_MAX_RETRIES,
+                 backoff: float = DEFAULT_BACKOFF, max_retry_after: float = MAX_RETRY_AFTER,
+                 clock=time.monotonic, sleep=time.sleep):
+        """
+        :param rate: sustained requests per second, None for no limit
+        :param burst: requests that may be sent at once after an idle spell (default: rate)
+        :param max_concurrency: most requests in flight; the limit starts here
+        :param min_concurrency: fewest requests in flight, however often the server throttles
+        :param max_retries: retries of a throttled or failed (502, 503, 504) request
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_retry_after = max_retry_after
+        self._clock = clock
+        self._sleep = sleep
+
+        self._bucket = TokenBucket(rate, burst or max(1.0, rate), clock()) if rate else None
+        self._limit = float(self.max_concurrency)
+        self._active = 0
+        self._waiting = []
+        self._sequence = 0
+        self._paused_until = 0.0
+        self._last_decrease = float('-inf')
+        self._condition = threading.Condition()
+
+        self.throttled = 0
+        self.retried = 0
+
+    @property
+    def concurrency(self) -> int:
+        """Requests currently allowed in flight."""
+        return int(self._limit)
+
+    def attach(self, session) -> None:
+        """
+        Send every request of the session through the scheduler.  The session's
+        own retries are turned off, as the scheduler retries instead.
+        """
+        if getattr(session, '_jamp_scheduler', None) is self:
+            return
+
+        request = session.request
+
+        def scheduled_request(method, url, *args, **kwargs):
+            return self.send(request, method, url, *args, **kwargs)
+
+        session.request = scheduled_request
+        session._jamp_scheduler = self
+        # ResilientSession sleeps 10-40 s between its retries and ignores Retry-After
+        session.max_retries = 0
+
+    def send(self, request, method, url, *args, **kwargs):
+        """
+        Call request(method, url, ...) when the scheduler allows, retrying
+        throttled and failed responses.
+
+        :return: the response; the last one if the retries ran out
+        """
+        priority = request_priority(url)
+        attempt = 0
+        while True:
+            with PROFILER.phase(PHASE_WAIT):
+                self._acquire(priority)
+            start = self._clock()
+            response = None
+            try:
+                response = request(method, url, *args, **kwargs)
+            finally:
+                self._release(start, response)
+
+            if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                return response
+
+            delay = retry_after(response)
+            if delay is None:
+                delay = min(MAX_BACKOFF, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+            elif delay > self.max_retry_after:
+                return response
+
+            attempt += 1
+            self.retried += 1
+            if response.status_code in THROTTLE_STATUSES:
+                self._pause(delay)
+            else:
+                with PROFILER.phase(PHASE_WAIT):
+                    self._sleep(delay)
+
+    def _acquire(self, priority: int) -> None:
+        with self._condition:
+            ticket = (priority, self._sequence)
+            self._sequence += 1
+            heappush(self._waiting, ticket)
+
+            while True:
+                now = self._clock()
+                timeout = None
+                if self._waiting[0] == ticket and self._active < self.concurrency:
+                    timeout = self._paused_until - now
+                    if timeout <= 0:
+                        timeout = self._bucket.take(now) if self._bucket else 0.0
+                        if timeout <= 0:
+                            heappop(self._waiting)
+                            self._active += 1
+                            self._condition.notify_all()
+                            return
+
+                self._condition.wait(timeout)
+
+    def _release(self, start: float, response) -> None:
+        with self._condition:
+            self._active -= 1
+            status = response.status_code if response is not None else None
+            if status in THROTTLE_STATUSES:
+                self.throttled += 1
+                # One halving per round of requests: those already in flight
+                # ...when the limit dropped were sent under the old limit
+                if start > self._last_decrease:
+                    self._limit = max(float(self.min_concurrency), self._limit / 2)
+                    self._last_decrease = self._clock()
+            elif status is not None and status < 400:
+                self._limit = min(float(self.max_concurrency), self._limit + 1 / self._limit)
+            self._condition.notify_all()
+
+    def _pause(self, delay: float) -> None:
+        with self._condition:
+            self._paused_until = max(self._paused_until, self._clock() + delay)
+            self._condition.notify_all()
+
+    def summary(self) -> str:
+        return f'{self.throttled} throttled, {self.retried} retried, concurrency {self.concurrency}'
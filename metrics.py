@@ -1,3 +1,7 @@
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from typing import List
 
 import pandas as pd
@@ -6,38 +10,150 @@ import pprint
 import argparse
 
 from auth import Credential
-from jamp import JiraFieldMapper, NAN, _parse_server
-from jamp.client import JIRAReports, JIRATeams
-from jamp.resources import CfdReport
+from jamp import JiraFieldMapper, NAN, _parse_server, FIELD_MAPS, FIELD_MAP_CACHE_TTL
+from jamp.client import JIRAReports, JIRATeams, size_connection_pool, VELOCITY_WINDOW_DAYS
+from jamp.cache import ResponseCache, RESPONSE_CACHE_DIR
+from jamp.incremental import SprintStateFile, INCREMENTAL_GRACE_DAYS, report_hash
+from jamp.boards import BoardIndex, MATCH_STARTS_WITH
+from jamp.resources import CfdReport, CFD_INTERVALS, CFD_REPORT_TYPES, SprintSummary, VELOCITY_ESTIMATED, VELOCITY_COMPLETED
 from jamp.confluence import JampConfluence
-from jamp.plot import MetricPlot
+from jamp.plot import MetricPlot, TeamPlot, CfdPlot
+from jamp.export import ReportOutput, OUTPUT_FORMATS, unique_columns
+from jamp.flow import FlowMetrics, FLOW_SUMMARY_TYPES, THROUGHPUT_TYPES, AGING_WIP_TYPES, FLOW_ISSUE_TYPES
+from jamp.instrument import PROFILER
+from jamp.scheduler import RequestScheduler
+
+SPRINT_DATE_FORMAT = '%Y-%m-%d'
+
+COL_COMMITTED_VC = "Story Points Committed VC"
+COL_COMPLETED_VC = "Story Points Completed VC"
+
+HEADERS = ("Team",
+           "Sprint",
+           "State",
+           "Story Points Committed",
+           COL_COMMITTED_VC,
+           "Story Points Added",
+           "Story Points Removed",
+           "Story Points Not Completed",
+           "Story Points Completed",
+           COL_COMPLETED_VC,
+           "% Complete",
+           '# Issues Committed',
+           "# Issues Added",
+           "# Issues Removed",
+           "# Issues Not Completed",
+           "# Issues Completed",
+           "% Complete",
+           )
+
+# Column types for the typed output formats, by unique column name
+SPRINT_REPORT_TYPES = dict(zip(unique_columns(HEADERS),
+                               ('string', 'string', 'string') +
+                               ('float64',) * 8 +
+                               ('Int64',) * 5 +
+                               ('float64',)))
+
+SPRINT_REPORT_SHEET = 'Sprint Report'
+CFD_SHEET_PREFIX = 'CFD '
+
+FLOW_SUMMARY_SHEET = 'Flow Summary'
+THROUGHPUT_SHEET = 'Throughput'
+AGING_WIP_SHEET = 'Aging WIP'
+FLOW_ISSUES_SHEET = 'Flow Issues'
+FLOW_SHEET_TYPES = {FLOW_SUMMARY_SHEET: FLOW_SUMMARY_TYPES,
+                    THROUGHPUT_SHEET: THROUGHPUT_TYPES,
+                    AGING_WIP_SHEET: AGING_WIP_TYPES,
+                    FLOW_ISSUES_SHEET: FLOW_ISSUE_TYPES}
+MAX_TAB_NAME_LENGTH = 30
+
+
+def _parse_date(value: str) -> datetime:
+    return datetime.strptime(value, SPRINT_DATE_FORMAT)
+
+
+def _end_of_day(date: datetime):
+    if date is None:
+        return None
+    return datetime.combine(date.date(), datetime.max.time())
+
+
+def _earliest_sprint_start(sprints) -> datetime:
+    """
+    :return: the day the oldest sprint started, or None if no sprint has a start date
+    """
+    starts = []
+    for sprint in sprints:
+        # Agile API dates look like 2020-02-27T16:59:05.814-05:00
+        start = getattr(sprint, 'startDate', None)
+        if isinstance(start, str):
+            try:
+                starts.append(_parse_date(start[:10]))
+            except ValueError:
+                pass
+
+    return min(starts) if starts else None
+
 
 class JiraProgramMetrics:
 
     def __init__(self):
         self._args = self.parse_args()
         self._server = _parse_server(self._args)
+        self._boards = None
 
         cred = Credential(self._args.user)
 
-        # JIRA for all normal Jira activity (Boards, Sprints, Issues, etc.)
-        self.jira_client = JIRA(server=self._server,
-                                basic_auth=(cred.username, cred.password),
-                                options={
-                          'agile_rest_path': 'agile'
-                      })
+        # The field map is shared by every JiraFieldMapper (including the one in
+        # ...each SprintReport), so configure its disk cache before any are built.
+        FIELD_MAPS.configure(cache_dir=self._args.field_map_cache,
+                             ttl=self._args.field_map_ttl)
 
-        # JIRA_Reports used only for reporting, not for general Jira access
-        self.reports_client = JIRAReports(server=self._server,
-                                          basic_auth=(cred.username, cred.password))
+        if self.profile_requested:
+            PROFILER.enable()
 
-        if self.use_teams:
+        # One scheduler for every session, as the server limits the user, not the session
+        self._scheduler = self.build_scheduler()
+
+        with PROFILER.phase('connect'):
             # JIRA for all normal Jira activity (Boards, Sprints, Issues, etc.)
-            self.teams_client = JIRATeams(server=self._server,
-                                          basic_auth=(cred.username, cred.password),
-                                          options={
-                                       'agile_rest_path': 'teams-api'
-                                   })
+            self.jira_client = JIRA(server=self._server,
+                                    basic_auth=(cred.username, cred.password),
+                                    options={
+                              'agile_rest_path': 'agile'
+                          })
+
+            # JIRA_Reports used only for reporting, not for general Jira access
+            self.reports_client = JIRAReports(server=self._server,
+                                              basic_auth=(cred.username, cred.password),
+                                              cache=self.build_response_cache(),
+                                              scheduler=self._scheduler)
+
+            if self.use_teams:
+                # JIRA for all normal Jira activity (Boards, Sprints, Issues, etc.)
+                self.teams_client = JIRATeams(server=self._server,
+                                              basic_auth=(cred.username, cred.password),
+                                              options={
+                                           'agile_rest_path': 'teams-api'
+                                       },
+                                              scheduler=self._scheduler)
+
+        if self.profile_requested:
+            # jira_client's own start-up requests are only timed as the 'connect'
+            # ...phase.  The other clients' sessions are already instrumented,
+            # ...beneath their scheduler, so these are no-ops for them.
+            PROFILER.instrument(self.jira_client._session)
+            PROFILER.instrument(self.reports_client._session)
+            if self.use_teams:
+                PROFILER.instrument(self.teams_client._session)
+
+        # After instrumenting, so request timings exclude the scheduler's waits
+        if self._scheduler:
+            self._scheduler.attach(self.jira_client._session)
+
+        # Each worker needs its own pooled connection or requests discards them
+        size_connection_pool(self.jira_client._session, self.workers)
+        size_connection_pool(self.reports_client._session, self.workers)
 
         self._map = JiraFieldMapper(self.jira_client._options, self.jira_client._session)
 
@@ -49,7 +165,8 @@ class JiraProgramMetrics:
 
     @property
     def cfd_requested(self) -> bool:
-        return self._args.cfd is not None
+        # Flow metrics are derived from the boards' CFD reports
+        return self._args.cfd is not None or self._args.flow is not None
 
     @property
     def cfd_filename(self) -> bool:
@@ -59,6 +176,47 @@ class JiraProgramMetrics:
     def use_teams(self):
         return self._args.teams
 
+    @property
+    def plots_requested(self) -> bool:
+        return bool(self._args.page or self._args.team_grid or self._args.team_images)
+
+    def plot_teams(self, df: pd.DataFrame) -> None:
+        if not (self._args.team_grid or self._args.team_images):
+            return
+
+        team_plot = TeamPlot()
+        if self._args.team_grid:
+            team_plot.plot_grid(df, self._args.team_grid)
+        if self._args.team_images:
+            team_plot.plot_each(df, self._args.team_images)
+
+    @property
+    def profile_requested(self) -> bool:
+        return bool(self._args.profile or self._args.profile_json or self._args.profile_trace)
+
+    def report_profile(self) -> None:
+        print(PROFILER.table())
+        if self._args.profile_json:
+            PROFILER.write_json(self._args.profile_json)
+        if self._args.profile_trace:
+            PROFILER.write_chrome_trace(self._args.profile_trace)
+
+    def build_scheduler(self):
+        if self._args.rate_limit is None:
+            return None
+        return RequestScheduler(rate=self._args.rate_limit or None,
+                                burst=self._args.burst,
+                                max_concurrency=self.workers)
+
+    def build_response_cache(self):
+        if self._args.no_cache:
+            return None
+        return ResponseCache(self._args.cache_dir)
+
+    @property
+    def workers(self) -> int:
+        return max(1, self._args.workers)
+
     def parse_args(self):
         parser = argparse.ArgumentParser(description='Build Program in Jira')
         # group = parser.add_mutually_exclusive_group()
@@ -77,29 +235,110 @@ class JiraProgramMetrics:
                                  'extra path elements.')
         parser.add_argument('--cfd', type=str,
                             help='Create a Cumulative Flow Diagram output file with the specified file name')
+        parser.add_argument('--cfd_interval', type=str, choices=sorted(CFD_INTERVALS),
+                            help='Write the column WIP at the end of each day/week rather than one row '
+                                 'per column change')
+        parser.add_argument('--cfd_images', type=str,
+                            help='directory for one cumulative flow diagram image per board (with --cfd)')
+        parser.add_argument('--flow', type=str,
+                            help='Create a flow metrics output file with per-board cycle time, lead '
+                                 'time, throughput and aging WIP, computed from every board\'s CFD '
+                                 'report in one pass')
+        parser.add_argument('--flow_interval', type=str, choices=sorted(CFD_INTERVALS), default='weekly',
+                            help='Throughput period for --flow (default: weekly)')
+        parser.add_argument('--flow_start_column', type=int, default=1,
+                            help='Index of the first in-progress board column for --flow (default: 1)')
+        parser.add_argument('--flow_done_column', type=int,
+                            help='Index of the first done board column for --flow (default: the last)')
         parser.add_argument('--board', type=str,
                             help='Board name and matching criteria which uses the following '
                                  'syntax: [<name>:<match>;<str2>:<match2>;...] where match is one of'
                                  ' MATCH_EXACT | MATCH_STARTS_WITH.  (e.g. --board JAMP:MATCH_EXACT)')
         parser.add_argument('--teams', action='store_true',
                             help='Test/utilize the teams API (if provisioned on the jira instance)')
+        parser.add_argument('--field_map_cache', type=str,
+                            help='Directory used to cache the Jira field name map between runs')
+        parser.add_argument('--field_map_ttl', type=int, default=FIELD_MAP_CACHE_TTL,
+                            help='Seconds before a cached field name map is fetched again '
+                                 f'(default: {FIELD_MAP_CACHE_TTL})')
+        parser.add_argument('--cache-dir', type=str, default=RESPONSE_CACHE_DIR,
+                            help='Directory for the sprint, velocity and CFD report cache. Closed '
+                                 f'sprints are kept indefinitely (default: {RESPONSE_CACHE_DIR})')
+        parser.add_argument('--no-cache', action='store_true',
+                            help='Always download reports and leave the report cache untouched')
+        parser.add_argument('--incremental', type=str,
+                            help='State file for incremental extracts.  Sprints closed before the '
+                                 'previous runs are reused from it instead of being fetched again')
+        parser.add_argument('--incremental_grace_days', type=float, default=INCREMENTAL_GRACE_DAYS,
+                            help='Days a closed sprint keeps being fetched before it is reused from the '
+                                 f'state file (default: {INCREMENTAL_GRACE_DAYS})')
+        parser.add_argument('--velocity_since', type=_parse_date,
+                            help='Oldest sprint finish date (YYYY-MM-DD) fetched from the velocity chart. '
+                                 'Defaults to the start of the board\'s oldest sprint, or one window')
+        parser.add_argument('--velocity_until', type=_parse_date,
+                            help='Newest sprint finish date (YYYY-MM-DD) fetched from the velocity '
+                                 'chart (default: today)')
+        parser.add_argument('--velocity_window_days', type=int, default=VELOCITY_WINDOW_DAYS,
+                            help='Days of sprints fetched per velocity chart request; longer spans are '
+                                 f'fetched in several windows and merged (default: {VELOCITY_WINDOW_DAYS})')
+        parser.add_argument('--format', type=str, choices=sorted(set(OUTPUT_FORMATS.values())),
+                            help='Output format for --file and --cfd.  By default it follows the file '
+                                 'suffix (.xlsx, .csv, .parquet, .arrow/.feather), or xlsx for any other')
+        parser.add_argument('--stream', action='store_true',
+                            help='Write the sprint or CFD workbook as each board is fetched, in '
+                                 'constant memory, rather than building the whole report first')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Number of concurrent requests used to fetch board and sprint '
+                                 'reports (default: 1)')
+        parser.add_argument('--rate_limit', type=float,
+                            help='Schedule requests at no more than this many per second, backing off '
+                                 'when Jira throttles and honouring its Retry-After (0 schedules '
+                                 'without a fixed rate)')
+        parser.add_argument('--burst', type=float,
+                            help='Requests sent at once after an idle spell with --rate_limit '
+                                 '(default: the rate)')
+        parser.add_argument('--profile', action='store_true',
+                            help='Time each Jira endpoint and pipeline phase and print a summary '
+                                 'at the end of the run')
+        parser.add_argument('--profile_json', type=str,
+                            help='file name for the profile summary as JSON (implies --profile)')
+        parser.add_argument('--profile_trace', type=str,
+                            help='file name for a Chrome trace of every request and phase, for '
+                                 'chrome://tracing or Perfetto (implies --profile)')
         parser.add_argument('--file', type=str, required=True,
-                            help='file name for excel output file with suffix ".xlsx"')
+                            help='file name for the sprint report output file (e.g. ".xlsx", ".parquet")')
         parser.add_argument('--image', type=str, required=True,
                             help='file name for image file')
+        parser.add_argument('--team_grid', type=str,
+                            help='file name for an image with a sprint chart per team')
+        parser.add_argument('--team_images', type=str,
+                            help='directory for one sprint chart image per team')
+
+        args = parser.parse_args()
+        if args.velocity_since and args.velocity_until and args.velocity_since > args.velocity_until:
+            parser.error('--velocity_since must not be later than --velocity_until')
 
-        return parser.parse_args()
+        return args
 
     def board_list(self):
-        boards = []
+        # build_report and build_cfd both ask for the boards, so resolve them once per run
+        if self._boards is None:
+            with PROFILER.phase('boards'):
+                self._boards = self._resolve_boards()
+        return self._boards
+
+    def _resolve_boards(self):
         if not self._args.board:
             return self.jira_client.boards(maxResults=None)
 
+        index = BoardIndex(self.jira_client.boards(type='scrum', maxResults=None))
+
+        boards = []
         filters = self._args.board.split(';')
         for f in filters:
             tuple = f.split(":")
             if len(tuple) == 1:
-                command = 'MATCH_STARTS_WITH'
+                command = MATCH_STARTS_WITH
                 pattern = tuple[0]
             elif len(tuple) == 2:
                 (pattern, command) = tuple
@@ -107,137 +346,306 @@ class JiraProgramMetrics:
                 raise ValueError(f"Poorly formed filter {f}. Must be PATTERN:COMMAND, where"
                                  f"COMMAND is either 'MATCH_STARTS_WITH' or 'MATCH_EXACT'")
 
-            for b in self.jira_client.boards(type='scrum', maxResults=None):
-                print(b.name)
-                if "IDAP" in b.name:
-                    pprint.pprint(b.raw)
-                if command == 'MATCH_STARTS_WITH' and b.name.startswith(pattern):
-                    boards.append(b)
-                elif command == 'MATCH_EXACT' and b.name == pattern:
-                    boards.append(b)
+            boards.extend(index.match(pattern, command))
 
         return boards
 
-    def build_cfd(self) -> List[CfdReport]:
+    def iter_cfd(self):
         """
+        Fetch the boards' CFD reports one at a time.
         """
-        cfd_list = []
         for board in self.board_list():
             print(board, "hi")
-            cfd = self.reports_client.cfd_report(board_id=board.id)
-            cfd_list.append(cfd)
-        return cfd_list
-
-    def build_report(self) -> pd.DataFrame:
-        """
-        """
-
-        HEADERS = ("Team",
-                   "Sprint",
-                   "State",
-                   "Story Points Committed",
-                   "Story Points Committed VC",
-                   "Story Points Added",
-                   "Story Points Removed",
-                   "Story Points Not Completed",
-                   "Story Points Completed",
-                   "Story Points Completed VC",
-                   "% Complete",
-                   '# Issues Committed',
-                   "# Issues Added",
-                   "# Issues Removed",
-                   "# Issues Not Completed",
-                   "# Issues Completed",
-                   "% Complete",
-                   )
-
-        data = []
-        for board in self.board_list():
-            vr = self.reports_client.velocity_report(board_id=board.id)
-            print(f"Examining board: {board.name} ({board.id})")
-            if board.type != 'scrum':
-                continue
-
-            for sprint in self.jira_client.sprints(board_id=board.id, maxResults=None):
-                try:
-                    # Once during a run, Jira returned a internal error
-                    # ... HTTPS 500 "Passed List had more than one value."
-                    # ... Catch the error and continue on.
-                    print(f"Examining sprint: {sprint.name} ({sprint.id})")
-
-                    sr = self.reports_client.sprint_report(board_id=board.id, sprint_id=sprint.id)
-                except JIRAError as err:
-                    print("JIRAError occured: ", err)
-                    continue
-
-                if "IDAP" in board.name:
-                    pprint.pprint(sr.raw)
-
-                if sr.committed > 0.0:
-                    percent_complete = sr.completedIssuesEstimateSum / sr.committed
-                else:
-                    percent_complete = NAN
+            with PROFILER.phase('cfd_report'):
+                cfd = self.reports_client.cfd_report(board_id=board.id)
+            yield cfd
+
+    def build_cfd(self) -> List[CfdReport]:
+        """
+        """
+        return list(self.iter_cfd())
 
-                data.append((board.name,
-                             sr.sprint.name,
-                             sr.sprint.state,
-                             sr.committed,
-                             vr.committed(sprint.id),
-                             sr.added_sum,
-                             sr.puntedIssuesEstimateSum,
-                             sr.issuesNotCompletedEstimateSum,
-                             sr.completedIssuesEstimateSum,
-                             vr.completed(sprint.id),
-                             percent_complete,
-                             sr.committed_count,
-                             sr.added_count,
-                             sr.puntedIssuesCount,
-                             sr.issuesNotCompletedInCurrentSprintCount,
-                             sr.completedIssuesCount,
-                             sr.percent_complete_count,
+    def _fetch_board(self, board):
+        """
+        Fetch the velocity report and sprint list for a board.  Only scrum boards
+        have sprints, so other boards return nothing to examine.
+        """
+        if board.type != 'scrum':
+            return None, []
+
+        with PROFILER.phase('sprints'):
+            sprints = self.jira_client.sprints(board_id=board.id, maxResults=None)
+
+        # Reach back to the oldest sprint, or its velocity figures come back NaN
+        finished_after = self._args.velocity_since or _earliest_sprint_start(sprints)
+        with PROFILER.phase('velocity_report'):
+            vr = self.reports_client.velocity_report(board_id=board.id,
+                                                     finished_before=_end_of_day(self._args.velocity_until),
+                                                     finished_after=finished_after,
+                                                     window_days=self._args.velocity_window_days)
+        return vr, sprints
+
+    def _fetch_sprint_report(self, board, sprint) -> SprintSummary:
+        """
+        Fetch the sprint report and summarize it, so the full report can be freed
+        while the rest of the program is still being fetched.
+        """
+        try:
+            # Once during a run, Jira returned a internal error
+            # ... HTTPS 500 "Passed List had more than one value."
+            # ... Catch the error and continue on.
+            print(f"Examining sprint: {sprint.name} ({sprint.id})")
+
+            with PROFILER.phase('sprint_report'):
+                sr = self.reports_client.sprint_report(board_id=board.id, sprint_id=sprint.id)
+        except JIRAError as err:
+            print("JIRAError occured: ", err)
+            return None
+
+        digest = report_hash(sr.raw) if self._args.incremental else None
+        return SprintSummary.from_report(sr, digest=digest)
+
+    def _sprint_row(self, board, sprint, sr: SprintSummary) -> tuple:
+        """
+        The VC columns are left NaN; _merge_velocity fills them for every row at once.
+        """
+        if sr.committed > 0.0:
+            percent_complete = sr.completedIssuesEstimateSum / sr.committed
+        else:
+            percent_complete = NAN
+
+        return (board.name,
+                sr.sprint_name,
+                sr.sprint_state,
+                sr.committed,
+                NAN,
+                sr.added_sum,
+                sr.puntedIssuesEstimateSum,
+                sr.issuesNotCompletedEstimateSum,
+                sr.completedIssuesEstimateSum,
+                NAN,
+                percent_complete,
+                sr.committed_count,
+                sr.added_count,
+                sr.puntedIssuesCount,
+                sr.issuesNotCompletedInCurrentSprintCount,
+                sr.completedIssuesCount,
+                sr.percent_complete_count,
+                )
+
+    def build_report(self, sink=None) -> pd.DataFrame:
+        """
+        :param sink: optional callable given each board's rows as a DataFrame as soon
+            as the board is complete.  The rows are then not kept, and None is returned.
+        :return: the sprint report
+        """
+        if self._args.incremental:
+            sprint_state = SprintStateFile(self._args.incremental, self._args.incremental_grace_days)
+        else:
+            sprint_state = None
+
+        frames = []
+        velocity = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            # Fan out every board, then every sprint, to the pool, but consume the
+            # ...results in submission order so the rows are always in the same order.
+            board_futures = [(board, executor.submit(self._fetch_board, board))
+                             for board in self.board_list()]
+
+            sprint_futures = deque()
+            for board, future in board_futures:
+                print(f"Examining board: {board.name} ({board.id})")
+                vr, sprints = future.result()
+                if vr is not None:
+                    velocity[board.id] = vr.frame()
+                for sprint in sprints:
+                    if sprint_state and sprint_state.is_current(board, sprint):
+                        sprint_futures.append((board, sprint, None))
+                    else:
+                        sprint_futures.append((board, sprint,
+                                               executor.submit(self._fetch_sprint_report, board, sprint)))
+
+            data = []
+            row_keys = []  # (board id, sprint id) of each row, to look up the velocity figures
+            while sprint_futures:
+                board, sprint, future = sprint_futures.popleft()
+                if future is None:
+                    row = sprint_state.row(board, sprint)
+                else:
+                    sr = future.result()
+                    row = self._sprint_row(board, sprint, sr) if sr is not None else None
+                    if row and sprint_state:
+                        sprint_state.update(board, sprint, sr.digest, row)
+
+                if row:
+                    data.append(row)
+                    row_keys.append((board.id, sprint.id))
+
+                # Hand over each board's rows as soon as its last sprint is in
+                if data and (not sprint_futures or sprint_futures[0][0] is not board):
+                    df = pd.DataFrame.from_records(data, columns=HEADERS)
+                    self._merge_velocity(df, {board.id: velocity[board.id]} if board.id in velocity else {},
+                                         row_keys)
+                    if sink:
+                        sink(df)
+                    else:
+                        frames.append(df)
+                    data = []
+                    row_keys = []
+
+        if sprint_state:
+            sprint_state.save()
+            print(f"Incremental extract: {sprint_state.fetched} sprints fetched "
+                  f"({sprint_state.changed} changed), {sprint_state.reused} reused")
+
+        if sink:
+            return None
+        if not frames:
+            return pd.DataFrame(columns=HEADERS)
+        return pd.concat(frames, ignore_index=True)
+
+    @staticmethod
+    def _merge_velocity(df: pd.DataFrame, velocity: dict, row_keys: list) -> None:
+        """
+        Fill the VC columns from the boards' velocity reports with one indexed
+        lookup over all rows, rather than one call per row.
 
-                             ))
+        :param velocity: board id -> VelocityReport.frame()
+        :param row_keys: (board id, sprint id) of each row of df
+        """
+        if df.empty or not velocity:
+            return
 
-        df = pd.DataFrame.from_records(data, columns=HEADERS)
-        return df
+        stats = pd.concat(velocity, names=['board', 'sprint'])
+        rows = stats.reindex(pd.MultiIndex.from_tuples(row_keys, names=['board', 'sprint']))
+        df[COL_COMMITTED_VC] = rows[VELOCITY_ESTIMATED].to_numpy()
+        df[COL_COMPLETED_VC] = rows[VELOCITY_COMPLETED].to_numpy()
 
 
 
     def run(self):
+        with PROFILER.phase('run'):
+            self._run()
+
+        if self._scheduler:
+            print(f"Request scheduler: {self._scheduler.summary()}")
+        if self.profile_requested:
+            self.report_profile()
+
+    def _run(self):
 
         if self.use_teams:
             self.extract_teams()
 
         if self.cfd_requested:
-            self.build_cfd_report()
+            if self._args.stream:
+                self.stream_cfd_report()
+            else:
+                self.build_cfd_report()
 
 
         else:
-            df = self.build_report()
-            self.build_sprint_report(df)
+            if self._args.stream:
+                df = self.stream_sprint_report()
+            else:
+                df = self.build_report()
+                self.build_sprint_report(df)
+
+            with PROFILER.phase('plot'):
+                self.plot_teams(df)
 
             if self._args.page:
-                self._plotter.plot(df)
+                with PROFILER.phase('plot'):
+                    self._plotter.plot(df)
                 self._confluence.read(self._args.space, self._args.page)
                 self._confluence.attach(self._args.space, self._args.page, self._args.file)
                 self._confluence.attach(self._args.space, self._args.page, self._args.image)
     def build_sprint_report(self, df: pd.DataFrame):
-        # Create a Pandas Excel writer using XlsxWriter as the engine.
-        writer = pd.ExcelWriter(self._args.file, engine='xlsxwriter')
-        # Convert the dataframe to an XlsxWriter Excel object.
-        df.to_excel(writer, sheet_name='Sprint Report', index=False)
-        # Close the Pandas Excel writer and output the Excel file.
-        writer.save()
+        with PROFILER.phase('write'), ReportOutput(self._args.file, self._args.format) as output:
+            output.add_table(SPRINT_REPORT_SHEET, HEADERS, SPRINT_REPORT_TYPES).write(df)
+
+    def stream_sprint_report(self) -> pd.DataFrame:
+        """
+        Write the sprint report board by board as the sprints come in, so memory
+        doesn't grow with the size of the program.  The rows are only kept when a
+        plot needs the whole report.
+
+        :return: the sprint report when it is plotted, otherwise None
+        """
+        keep = [] if self.plots_requested else None
+
+        with ReportOutput(self._args.file, self._args.format) as output:
+            table = output.add_table(SPRINT_REPORT_SHEET, HEADERS, SPRINT_REPORT_TYPES)
+
+            def sink(df):
+                with PROFILER.phase('write'):
+                    table.write(df)
+                if keep is not None:
+                    keep.append(df)
+
+            self.build_report(sink=sink)
+
+        if keep is None:
+            return None
+        return pd.concat(keep, ignore_index=True) if keep else pd.DataFrame(columns=HEADERS)
+
+    def _cfd_frame(self, cfd: CfdReport) -> pd.DataFrame:
+        if self._args.cfd_interval:
+            return cfd.resampled_report(CFD_INTERVALS[self._args.cfd_interval])
+        return cfd.report()
+
+    def _cfd_sheet_name(self, cfd: CfdReport) -> str:
+        board_name_max = MAX_TAB_NAME_LENGTH - len(CFD_SHEET_PREFIX)
+        return f'{CFD_SHEET_PREFIX}{cfd.board_name[:board_name_max]}'
+
+    def _write_cfd(self, output: ReportOutput, cfd: CfdReport, cfd_plot: CfdPlot) -> None:
+        with PROFILER.phase('write'):
+            output.add_table(self._cfd_sheet_name(cfd), dtypes=CFD_REPORT_TYPES).write(self._cfd_frame(cfd))
+        if self._args.cfd_images:
+            with PROFILER.phase('plot'):
+                cfd_plot.plot_each([cfd], self._args.cfd_images)
+
+    def _write_flow(self, cfd_reports: list) -> None:
+        """
+        Write the flow metrics of every board, computed over the whole program in
+        one pass.
+        """
+        flow = FlowMetrics(cfd_reports, start_column=self._args.flow_start_column,
+                           done_column=self._args.flow_done_column)
+        with PROFILER.phase('flow'):
+            frames = {FLOW_SUMMARY_SHEET: flow.summary(),
+                      THROUGHPUT_SHEET: flow.throughput(CFD_INTERVALS[self._args.flow_interval]),
+                      AGING_WIP_SHEET: flow.aging_wip(),
+                      FLOW_ISSUES_SHEET: flow.issues()}
+
+        with PROFILER.phase('write'), ReportOutput(self._args.flow, self._args.format) as output:
+            for name, df in frames.items():
+                dtypes = FLOW_SHEET_TYPES[name]
+                output.add_table(name, list(dtypes), dtypes).write(df)
+
+    def _write_cfd_reports(self, cfd_reports) -> None:
+        flow_reports = [] if self._args.flow else None
+        with ReportOutput(self.cfd_filename, self._args.format) if self._args.cfd else nullcontext() as output:
+            cfd_plot = CfdPlot()
+            for cfd in cfd_reports:
+                if output:
+                    self._write_cfd(output, cfd, cfd_plot)
+                if flow_reports is not None:
+                    flow_reports.append(cfd)
+
+        if flow_reports is not None:
+            self._write_flow(flow_reports)
 
     def build_cfd_report(self):
-        cfd_list = self.build_cfd()
-        writer = pd.ExcelWriter(self.cfd_filename, engine='xlsxwriter')
-        MAX_TAB_NAME_LENGTH = 30
-        board_name_max = MAX_TAB_NAME_LENGTH - len('CFD ')
-        for cfd in cfd_list:
-            df = cfd.report()
-            df.to_excel(writer, sheet_name=f'CFD {cfd.board_name[:board_name_max]}', index=False)
-        writer.save()
+        self._write_cfd_reports(self.build_cfd())
+
+    def stream_cfd_report(self):
+        """
+        Write each board's CFD as soon as its report is fetched, then drop the
+        report, rather than holding every board in memory first.  With --flow the
+        reports are kept for the program's flow metrics, written at the end.
+        """
+        self._write_cfd_reports(self.iter_cfd())
 
     def extract_teams(self):
         teams = self.teams_client.teams()
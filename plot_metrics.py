@@ -3,21 +3,24 @@ import argparse
 
 import pandas as pd
 
-from jamp.plot import MetricPlot
+from jamp.plot import MetricPlot, TeamPlot
 
 
 class ExecutePlot:
 
     def __init__(self):
         self._args = self.parse_args()
-        self._plotter = MetricPlot(self._args.file,
-                                   "agile_metrics.png")
+        self._plotter = MetricPlot(self._args.image)
     def parse_args(self):
         parser = argparse.ArgumentParser(description='Build Program in Jira')
         parser.add_argument('--file', type=str, required=True,
                             help='file name for excel input')
         parser.add_argument('--image', type=str, required=True,
                             help='file name for image output')
+        parser.add_argument('--team_grid', type=str,
+                            help='file name for an image with a sprint chart per team')
+        parser.add_argument('--team_images', type=str,
+                            help='directory for one sprint chart image per team')
 
         return parser.parse_args()
 
@@ -28,5 +31,11 @@ class ExecutePlot:
         df = self.read()
         self._plotter.plot(df)
 
+        team_plot = TeamPlot()
+        if self._args.team_grid:
+            team_plot.plot_grid(df, self._args.team_grid)
+        if self._args.team_images:
+            team_plot.plot_each(df, self._args.team_images)
+
 if __name__ == "__main__":
     ExecutePlot().run()
@@ -6,7 +6,12 @@ from unittest.mock import patch, MagicMock
 
 import pytest
 
-from jamp import JiraFieldMapper
+from jira import JIRA
+
+from jamp import JiraFieldMapper, FIELD_MAPS
+from jamp.cache import ResponseCache
+from jamp.client import JIRAReports
+from jamp.instrument import PROFILER
 from jamp.resources import SprintReport
 
 dir_path = os.path.dirname(os.path.realpath(__file__))
@@ -70,6 +75,18 @@ def mock_issue_av16():
     return json.load(f)
 
 
+@pytest.fixture
+def mock_board_config():
+    f = open(os.path.join(dir_path, "test_data/mock_board_config.json"))
+    return json.load(f)
+
+
+@pytest.fixture
+def mock_cfd():
+    f = open(os.path.join(dir_path, "test_data/mock_cfd.json"))
+    return json.load(f)
+
+
 @pytest.fixture
 def mock_sprint_report_with_id(mock_sprint_report):
     r_json = mock_sprint_report.copy()
@@ -106,13 +123,13 @@ def sprint_report(mock_jira_key, mock_field_mapper, mock_field_mapper_build_map,
                   mock_options, mock_sprint_report_with_id, mock_velocity_report_with_id,
                   mock_issue_av14, mock_issue_av16):
 
-    resource_mock14 = MagicMock()
-    resource_mock14.raw = mock_issue_av14
+    search_mock = MagicMock()
+    search_mock.raw = {'startAt': 0,
+                       'maxResults': 2,
+                       'total': 2,
+                       'issues': [mock_issue_av14, mock_issue_av16]}
 
-    resource_mock16 = MagicMock()
-    resource_mock16.raw = mock_issue_av16
-
-    mock_field_mapper_build_map.side_effect = [resource_mock14, resource_mock16]
+    mock_field_mapper_build_map.side_effect = [search_mock]
 
     mock_jira_key.return_value = 'customfield_10111'
     sr = SprintReport(options=mock_options, session=None, raw=mock_sprint_report_with_id)
@@ -154,3 +171,31 @@ def sprint_6_report(mock_jira_key, mock_field_mapper, mock_field_mapper_build_ma
     sr = SprintReport(options=mock_options, session=None, raw=mock_sprint_6_report_json)
     return sr
 
+
+
+@pytest.fixture
+def response_cache(tmp_path):
+    return ResponseCache(str(tmp_path / 'cache'), ttl=60)
+
+
+@pytest.fixture
+def reports_client(response_cache):
+    # JIRA.__init__ requests the field list from the server
+    with patch.object(JIRA, 'fields', return_value=[]):
+        return JIRAReports(server='http://dog.atlassian.com', get_server_info=False, cache=response_cache)
+
+
+@pytest.fixture
+def global_profiler():
+    PROFILER.reset()
+    yield PROFILER
+    PROFILER.enabled = False
+    PROFILER.reset()
+
+
+@pytest.fixture
+def field_maps():
+    # FIELD_MAPS is shared by the whole process, so start and finish empty
+    FIELD_MAPS.clear()
+    yield FIELD_MAPS
+    FIELD_MAPS.clear()
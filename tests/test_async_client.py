@@ -0,0 +1,126 @@
+import asyncio
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from jira import JIRAError
+
+from jamp import FieldMapRegistry
+from jamp.async_client import AsyncJIRAReports
+from jamp.resources import SprintReport, VelocityReport, CfdReport
+
+
+@pytest.fixture
+def jira_app(mock_sprint_report, mock_velocity_report, mock_board_config, mock_cfd,
+             mock_issue_av14, mock_issue_av16):
+    stats = {'in_flight': 0, 'max_in_flight': 0, 'requests': []}
+
+    async def tracked(request, payload):
+        stats['requests'].append(request.path_qs)
+        stats['in_flight'] += 1
+        stats['max_in_flight'] = max(stats['in_flight'], stats['max_in_flight'])
+        await asyncio.sleep(0.01)
+        stats['in_flight'] -= 1
+        return web.json_response(payload)
+
+    async def sprint_report(request):
+        if request.query['sprintId'] == '500':
+            return web.Response(status=500, text="Passed List had more than one value.")
+        return await tracked(request, mock_sprint_report)
+
+    async def search(request):
+        if request.query.get('expand') == 'names':
+            return await tracked(request, {'names': {'customfield_10111': 'Story Points'}})
+        return await tracked(request, {'issues': [mock_issue_av14, mock_issue_av16]})
+
+    async def velocity(request):
+        return await tracked(request, mock_velocity_report)
+
+    async def config(request):
+        return await tracked(request, mock_board_config)
+
+    async def cfd(request):
+        return await tracked(request, mock_cfd)
+
+    app = web.Application()
+    app.router.add_get('/rest/greenhopper/1.0/rapid/charts/sprintreport', sprint_report)
+    app.router.add_get('/rest/greenhopper/1.0/rapid/charts/velocity.json', velocity)
+    app.router.add_get('/rest/greenhopper/1.0/xboard/config.json', config)
+    app.router.add_get('/rest/greenhopper/1.0/rapid/charts/cumulativeflowdiagram', cfd)
+    app.router.add_get('/rest/api/2/search', search)
+    return app, stats
+
+
+def run_with_server(app, coro_fn):
+    async def _run():
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            return await coro_fn(str(server.make_url('')).rstrip('/'))
+        finally:
+            await server.close()
+
+    with patch('jamp.FIELD_MAPS', FieldMapRegistry()):
+        return asyncio.run(_run())
+
+
+def test_async_sprint_reports(jira_app):
+    app, stats = jira_app
+
+    async def gather(server):
+        async with AsyncJIRAReports(server, basic_auth=('steve', 'secret'), max_in_flight=3) as client:
+            return await asyncio.gather(*[client.sprint_report(1, sprint_id) for sprint_id in range(10)])
+
+    reports = run_with_server(app, gather)
+
+    assert 10 == len(reports)
+    for sr in reports:
+        assert isinstance(sr, SprintReport)
+        assert 12.0 == sr.committed
+        assert 3.0 == sr.added_sum
+
+    assert stats['max_in_flight'] <= 3
+    # One field map lookup for the whole client
+    assert 1 == len([r for r in stats['requests'] if 'expand=names' in r])
+
+
+def test_async_sprint_report_error(jira_app):
+    app, stats = jira_app
+
+    async def fetch(server):
+        async with AsyncJIRAReports(server) as client:
+            await client.sprint_report(1, 500)
+
+    with pytest.raises(JIRAError):
+        run_with_server(app, fetch)
+
+
+def test_async_velocity_and_cfd_reports(jira_app):
+    app, stats = jira_app
+
+    async def fetch(server):
+        async with AsyncJIRAReports(server) as client:
+            return await asyncio.gather(client.velocity_report(1), client.cfd_report(1))
+
+    vr, cfd = run_with_server(app, fetch)
+
+    assert isinstance(vr, VelocityReport)
+    assert 18.0 == vr.committed(2)
+    assert isinstance(cfd, CfdReport)
+    assert 'JAMP Program' == cfd.board_name
+    assert any('columnId=4&columnId=5&columnId=6' in r for r in stats['requests'])
+
+
+def test_async_velocity_report_empty_span(jira_app):
+    app, stats = jira_app
+
+    async def fetch(server):
+        async with AsyncJIRAReports(server) as client:
+            return await client.velocity_report(1, finished_after=datetime(2030, 1, 1))
+
+    vr = run_with_server(app, fetch)
+
+    assert vr.frame().empty
+    assert not any('velocity.json' in r for r in stats['requests'])
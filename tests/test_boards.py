@@ -1,6 +1,49 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from jamp.boards import BoardIndex, MATCH_EXACT, MATCH_STARTS_WITH
+
 
 def test_av_boards(mock_av_boards):
     for b in mock_av_boards['views']:
         print(b)
 
     assert True
+
+
+def build_board(name, id):
+    mock_board = MagicMock()
+    mock_board.name = name
+    mock_board.id = id
+    return mock_board
+
+
+@pytest.fixture
+def board_index(mock_av_boards):
+    return BoardIndex([build_board(b['name'], b['id']) for b in mock_av_boards['views']])
+
+
+def test_board_index_exact(board_index, mock_av_boards):
+    assert len(mock_av_boards['views']) == len(board_index)
+
+    boards = board_index.match('IDAP board', MATCH_EXACT)
+    assert ['IDAP board'] == [b.name for b in boards]
+    assert [] == board_index.match('IDAP', MATCH_EXACT)
+
+
+def test_board_index_starts_with(board_index, mock_av_boards):
+    expected = [b['id'] for b in mock_av_boards['views'] if b['name'].startswith('IDAP')]
+
+    # Catalogue order, not name order
+    assert expected == [b.id for b in board_index.match('IDAP', MATCH_STARTS_WITH)]
+    assert len(mock_av_boards['views']) == len(board_index.starts_with(''))
+    assert [] == board_index.starts_with('zzz-no-such-board')
+
+
+def test_board_index_duplicate_names():
+    index = BoardIndex([build_board('Team A', 1), build_board('Team B', 2), build_board('Team A', 3)])
+
+    assert [1, 3] == [b.id for b in index.exact('Team A')]
+    assert [1, 2, 3] == [b.id for b in index.starts_with('Team')]
+    assert [] == index.match('Team A', 'MATCH_SOMETHING_ELSE')
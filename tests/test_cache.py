@@ -0,0 +1,132 @@
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+from jira import JIRA
+
+from jamp import JiraFieldMapper
+from jamp.cache import ResponseCache, is_closed_sprint_report
+from jamp.client import JIRAReports
+from jamp.resources import SprintReport
+
+SPRINT_REPORT_PATH = 'rapid/charts/sprintreport?rapidViewId=1&sprintId=1'
+
+
+@pytest.fixture
+def closed_sprint_report_json(mock_sprint_report):
+    r_json = mock_sprint_report.copy()
+    r_json['sprint'] = dict(r_json['sprint'], state='CLOSED')
+    return r_json
+
+
+def test_is_closed_sprint_report(mock_sprint_report, closed_sprint_report_json, mock_velocity_report):
+    assert not is_closed_sprint_report(mock_sprint_report)
+    assert is_closed_sprint_report(closed_sprint_report_json)
+    assert not is_closed_sprint_report(mock_velocity_report)
+
+
+def test_cache_round_trip(response_cache, mock_velocity_report):
+    assert response_cache.get('http://dog/velocity.json', {'rapidViewId': 1}) is None
+
+    response_cache.put('http://dog/velocity.json', mock_velocity_report, {'rapidViewId': 1})
+
+    assert mock_velocity_report == response_cache.get('http://dog/velocity.json', {'rapidViewId': 1})
+    assert response_cache.get('http://dog/velocity.json', {'rapidViewId': 2}) is None
+
+
+def test_cache_ttl(response_cache, mock_sprint_report, closed_sprint_report_json):
+    response_cache.put('http://dog/active', mock_sprint_report)
+    response_cache.put('http://dog/closed', closed_sprint_report_json, permanent=True)
+
+    with patch('jamp.cache.time.time', return_value=time.time() + 3600):
+        assert response_cache.get('http://dog/active') is None
+        assert closed_sprint_report_json == response_cache.get('http://dog/closed')
+
+
+def test_cache_lru_eviction(tmp_path, mock_sprint_report):
+    cache_dir = str(tmp_path / 'cache')
+    entry_size = len(str(mock_sprint_report))
+
+    response_cache = ResponseCache(cache_dir, max_bytes=int(entry_size * 3.5))
+    for i in range(3):
+        response_cache.put(f'http://dog/{i}', mock_sprint_report)
+        os.utime(os.path.join(cache_dir, f'{ResponseCache.key(f"http://dog/{i}")}.json'), (i, i))
+
+    # Using entry 0 makes entry 1 the least recently used
+    assert response_cache.get('http://dog/0')
+    response_cache.put('http://dog/3', mock_sprint_report)
+
+    assert response_cache.get('http://dog/1') is None
+    for i in (0, 2, 3):
+        assert response_cache.get(f'http://dog/{i}')
+
+
+@patch.object(JIRA, '_get_json')
+def test_reports_client_caches_closed_sprints(mock_get_json, reports_client, closed_sprint_report_json):
+    mock_get_json.side_effect = lambda *args, **kwargs: closed_sprint_report_json.copy()
+
+    for _ in range(3):
+        r_json = reports_client._get_json(SPRINT_REPORT_PATH, base=JIRA.AGILE_BASE_URL)
+        assert 'CLOSED' == r_json['sprint']['state']
+
+    assert 1 == mock_get_json.call_count
+
+    # A day later the closed sprint is still served from the cache
+    with patch('jamp.cache.time.time', return_value=time.time() + 24 * 3600):
+        reports_client._get_json(SPRINT_REPORT_PATH, base=JIRA.AGILE_BASE_URL)
+    assert 1 == mock_get_json.call_count
+
+
+@patch.object(JIRA, '_get_json')
+def test_reports_client_expires_active_sprints(mock_get_json, reports_client, mock_sprint_report):
+    mock_get_json.side_effect = lambda *args, **kwargs: mock_sprint_report.copy()
+
+    reports_client._get_json(SPRINT_REPORT_PATH, base=JIRA.AGILE_BASE_URL)
+    reports_client._get_json(SPRINT_REPORT_PATH, base=JIRA.AGILE_BASE_URL)
+    assert 1 == mock_get_json.call_count
+
+    with patch('jamp.cache.time.time', return_value=time.time() + 3600):
+        reports_client._get_json(SPRINT_REPORT_PATH, base=JIRA.AGILE_BASE_URL)
+    assert 2 == mock_get_json.call_count
+
+
+@patch.object(JIRA, '_get_json')
+def test_reports_client_only_caches_charts(mock_get_json, reports_client):
+    mock_get_json.return_value = {'names': {}}
+
+    reports_client._get_json('search?maxResults=1&expand=names')
+    reports_client._get_json('search?maxResults=1&expand=names')
+
+    assert 2 == mock_get_json.call_count
+
+
+@patch.object(SprintReport, '_build_resource')
+@patch.object(JiraFieldMapper, '_fetch_field_name_map')
+@patch.object(JIRA, '_get_json')
+def test_reports_client_cached_closed_sprint_needs_no_requests(mock_get_json, mock_fetch_field_name_map,
+                                                               mock_build_resource, field_maps,
+                                                               reports_client, response_cache,
+                                                               closed_sprint_report_json,
+                                                               mock_issue_av14, mock_issue_av16):
+    mock_get_json.side_effect = lambda *args, **kwargs: closed_sprint_report_json.copy()
+    mock_fetch_field_name_map.return_value = {'Story Points': 'customfield_10111'}
+    mock_build_resource.return_value.raw = {'issues': [mock_issue_av14, mock_issue_av16]}
+
+    first = reports_client.sprint_report(board_id=1, sprint_id=1)
+    assert 3.0 == first.added_sum
+    mock_build_resource.assert_called_once()
+
+    # A later run: a new client on the same cache and no field map in memory
+    field_maps.clear()
+    for mock in (mock_get_json, mock_fetch_field_name_map, mock_build_resource):
+        mock.reset_mock()
+    with patch.object(JIRA, 'fields', return_value=[]):
+        reports = JIRAReports(server='http://dog.atlassian.com', get_server_info=False, cache=response_cache)
+    second = reports.sprint_report(board_id=1, sprint_id=1)
+
+    assert 3.0 == second.added_sum
+    assert first.committed == second.committed
+    mock_get_json.assert_not_called()
+    mock_fetch_field_name_map.assert_not_called()
+    mock_build_resource.assert_not_called()
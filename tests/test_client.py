@@ -0,0 +1,87 @@
+import math
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+from jira import JIRA
+
+from jamp.client import _velocity_windows, _velocity_report_path, _merge_velocity_json
+
+
+def velocity_json(*sprint_ids):
+    return {'sprints': [{'id': i, 'name': f'Sprint {i}'} for i in sprint_ids],
+            'velocityStatEntries': {str(i): {'estimated': {'value': float(i), 'text': str(i)},
+                                             'completed': {'value': float(i), 'text': str(i)}}
+                                    for i in sprint_ids}}
+
+
+def window_parms(path):
+    parms = parse_qs(urlparse(path).query)
+    return parms['sprintsFinishedAfter'][0], parms['sprintsFinishedBefore'][0]
+
+
+def test_velocity_windows_default():
+    (after, before), = _velocity_windows()
+
+    assert datetime.now().date() == before.date()
+    assert timedelta(days=365) == before - after
+
+
+def test_velocity_windows_split_newest_first():
+    windows = _velocity_windows(datetime(2018, 1, 1), datetime(2020, 6, 1), window_days=365)
+
+    assert [(datetime(2020, 1, 1), datetime(2020, 6, 1)),
+            (datetime(2019, 1, 1), datetime(2020, 1, 1)),
+            (datetime(2018, 1, 1), datetime(2019, 1, 1))] == windows
+
+
+def test_velocity_windows_empty_span():
+    # A board whose oldest sprint starts in the future, or since later than until
+    assert [] == _velocity_windows(datetime(2030, 1, 1), None)
+    assert [] == _velocity_windows(datetime(2021, 1, 1), datetime(2020, 1, 1))
+
+
+def test_velocity_report_path_not_swapped():
+    path = _velocity_report_path(1, datetime(2020, 12, 2, 5), datetime(2021, 3, 3, 4, 59, 59, 999000))
+
+    assert ('2020-12-02T05:00:00.000Z', '2021-03-03T04:59:59.999Z') == window_parms(path)
+
+
+def test_merge_velocity_json():
+    merged = _merge_velocity_json([velocity_json(3, 2), velocity_json(2, 1)])
+
+    assert [3, 2, 1] == [s['id'] for s in merged['sprints']]
+    assert ['1', '2', '3'] == sorted(merged['velocityStatEntries'])
+
+    assert {'sprints': [], 'velocityStatEntries': {}} == _merge_velocity_json([])
+
+
+@patch.object(JIRA, '_get_json')
+def test_velocity_report_empty_span(mock_get_json, reports_client):
+    vr = reports_client.velocity_report(1, finished_after=datetime(2030, 1, 1))
+
+    assert 0 == mock_get_json.call_count
+    assert vr.frame().empty
+    assert math.isnan(vr.committed(1))
+
+
+@patch.object(JIRA, '_get_json')
+def test_velocity_report_multiple_windows(mock_get_json, reports_client):
+    responses = {'2018-01-01T00:00:00.000Z': velocity_json(1),
+                 '2019-01-01T00:00:00.000Z': velocity_json(2, 3)}
+    mock_get_json.side_effect = lambda path, **kwargs: responses.get(window_parms(path)[0], velocity_json(4))
+
+    finished_before = datetime.combine(datetime.now().date(), datetime.max.time())
+    vr = reports_client.velocity_report(1, finished_before=finished_before,
+                                        finished_after=datetime(2018, 1, 1), window_days=365)
+
+    windows = len(_velocity_windows(datetime(2018, 1, 1), finished_before, 365))
+    assert windows == mock_get_json.call_count
+    assert [1.0, 2.0, 3.0, 4.0] == [vr.committed(i) for i in (1, 2, 3, 4)]
+
+    # Windows that ended in the past are cached for good; only the current one expires
+    with patch('jamp.cache.time.time', return_value=time.time() + 24 * 3600):
+        reports_client.velocity_report(1, finished_before=finished_before,
+                                       finished_after=datetime(2018, 1, 1), window_days=365)
+    assert windows + 1 == mock_get_json.call_count
@@ -0,0 +1,116 @@
+import math
+
+import pandas as pd
+import pytest
+
+from jamp.export import StreamingWorkbook, ReportOutput, output_format, unique_columns
+from jamp.resources import CfdReport, CFD_REPORT_TYPES
+
+
+def test_streaming_workbook_round_trip(tmp_path):
+    filename = str(tmp_path / 'report.xlsx')
+    df = pd.DataFrame({'Team': ['A', 'B'],
+                       'Points': [1.5, float('nan')],
+                       'Count': [3, 4]})
+
+    with StreamingWorkbook(filename) as workbook:
+        sheet = workbook.add_sheet('Sprint Report', df.columns)
+        sheet.write_frame(df.iloc[:1])
+        sheet.write_frame(df.iloc[1:])
+        assert 2 == sheet.rows
+
+    actual = pd.read_excel(filename, sheet_name='Sprint Report')
+    assert list(df.columns) == list(actual.columns)
+    assert ['A', 'B'] == list(actual['Team'])
+    assert 1.5 == actual['Points'][0]
+    assert math.isnan(actual['Points'][1])
+    assert [3, 4] == list(actual['Count'])
+
+
+def test_streaming_cfd_matches_to_excel(tmp_path, mock_cfd, mock_board_config, mock_options):
+    mock_cfd['id'] = 1
+    df = CfdReport(options=mock_options, session=None, raw=mock_cfd, config=mock_board_config).report()
+
+    streamed = str(tmp_path / 'streamed.xlsx')
+    with StreamingWorkbook(streamed) as workbook:
+        workbook.add_sheet('CFD', df.columns).write_frame(df)
+
+    written = str(tmp_path / 'written.xlsx')
+    with pd.ExcelWriter(written, engine='xlsxwriter') as writer:
+        df.to_excel(writer, sheet_name='CFD', index=False)
+
+    pd.testing.assert_frame_equal(pd.read_excel(written, sheet_name='CFD'),
+                                  pd.read_excel(streamed, sheet_name='CFD'))
+
+
+HEADERS = ('Team', '% Complete', 'Count', '% Complete')
+TYPES = {'Team': 'string', '% Complete': 'float64', 'Count': 'Int64', '% Complete.1': 'float64'}
+
+
+def sprint_frame(team, count):
+    return pd.DataFrame.from_records([(team, 0.5, count, 0.25)], columns=HEADERS)
+
+
+@pytest.mark.parametrize("filename,format,expected", [('report.xlsx', None, 'xlsx'),
+                                                      ('report.PARQUET', None, 'parquet'),
+                                                      ('report.feather', None, 'arrow'),
+                                                      ('report.out', None, 'xlsx'),
+                                                      ('report.xlsx', 'csv', 'csv')])
+def test_output_format(filename, format, expected):
+    assert expected == output_format(filename, format)
+
+
+def test_unique_columns():
+    assert ['Team', '% Complete', 'Count', '% Complete.1'] == unique_columns(HEADERS)
+
+
+def test_report_output_csv(tmp_path):
+    filename = str(tmp_path / 'report.csv')
+    with ReportOutput(filename) as output:
+        table = output.add_table('Sprint Report', HEADERS, TYPES)
+        table.write(sprint_frame('A', 1))
+        table.write(sprint_frame('B', 2))
+
+    actual = pd.read_csv(filename)
+    assert list(TYPES) == list(actual.columns)
+    assert ['A', 'B'] == list(actual['Team'])
+
+
+@pytest.mark.parametrize("suffix,read", [('.parquet', pd.read_parquet), ('.arrow', pd.read_feather)])
+def test_report_output_typed(tmp_path, suffix, read):
+    pytest.importorskip('pyarrow')
+    filename = str(tmp_path / f'report{suffix}')
+
+    with ReportOutput(filename) as output:
+        table = output.add_table('Sprint Report', HEADERS, TYPES)
+        table.write(sprint_frame('A', 1))
+        table.write(sprint_frame('B', None))
+        output.add_table('CFD Board/1').write(pd.DataFrame({'x': [1]}))
+
+    actual = read(filename)
+    assert list(TYPES) == list(actual.columns)
+    assert ['A', 'B'] == list(actual['Team'])
+    assert 'Int64' == str(actual['Count'].dtype)
+    assert actual['Count'].isna()[1]
+
+    assert [1] == list(read(str(tmp_path / f'report-CFD_Board_1{suffix}'))['x'])
+
+
+@pytest.mark.parametrize("suffix,read", [('.parquet', pd.read_parquet), ('.arrow', pd.read_feather)])
+def test_report_output_cfd_removed_issue(tmp_path, mock_options, suffix, read):
+    pytest.importorskip('pyarrow')
+    # The last change removes A-1 from the board, so it has no statusTo
+    raw = {'id': 1,
+           'columns': [{'name': 'To Do'}, {'name': 'Done'}],
+           'columnChanges': {'1615964978999': [{'key': 'A-1', 'columnTo': 0, 'statusTo': '10000'}],
+                             '1615964990000': [{'key': 'A-1', 'columnFrom': 0}]}}
+    filename = str(tmp_path / f'cfd{suffix}')
+
+    with ReportOutput(filename) as output:
+        output.add_table('CFD Board 1', dtypes=CFD_REPORT_TYPES).write(
+            CfdReport(options=mock_options, session=None, raw=raw).report())
+
+    actual = read(filename)
+    assert ['10000', '-1'] == list(actual['status_to'])
+    assert [0, -1] == list(actual['to'])
+    assert [1, 0] == list(actual['To Do'])
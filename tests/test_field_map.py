@@ -0,0 +1,57 @@
+import os
+import time
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from jamp import JiraFieldMapper, FieldMapRegistry
+
+
+@pytest.fixture
+def mock_field_map():
+    return {'Story Points': 'customfield_10111', 'Summary': 'summary'}
+
+
+def test_registry_fetches_once_per_server(mock_field_map):
+    registry = FieldMapRegistry()
+    fetch = MagicMock(return_value=mock_field_map)
+
+    for _ in range(5):
+        assert mock_field_map == registry.get('http://dog.atlassian.com', fetch)
+
+    assert 1 == fetch.call_count
+
+    registry.get('http://cat.atlassian.com', fetch)
+    assert 2 == fetch.call_count
+
+
+def test_registry_disk_cache(tmp_path, mock_field_map):
+    fetch = MagicMock(return_value=mock_field_map)
+    FieldMapRegistry(cache_dir=str(tmp_path)).get('http://dog.atlassian.com', fetch)
+
+    # A new registry (i.e. the next run) reads the map back from disk
+    assert mock_field_map == FieldMapRegistry(cache_dir=str(tmp_path)).get('http://dog.atlassian.com', fetch)
+    assert 1 == fetch.call_count
+    assert 1 == len(os.listdir(tmp_path))
+
+
+def test_registry_disk_cache_expired(tmp_path, mock_field_map):
+    fetch = MagicMock(return_value=mock_field_map)
+    FieldMapRegistry(cache_dir=str(tmp_path)).get('http://dog.atlassian.com', fetch)
+
+    with patch('jamp.time.time', return_value=time.time() + 120):
+        FieldMapRegistry(cache_dir=str(tmp_path), ttl=60).get('http://dog.atlassian.com', fetch)
+
+    assert 2 == fetch.call_count
+
+
+@patch.object(JiraFieldMapper, '_fetch_field_name_map')
+def test_field_mappers_share_registry(mock_fetch, mock_options, mock_field_map):
+    mock_fetch.return_value = mock_field_map
+
+    with patch('jamp.FIELD_MAPS', FieldMapRegistry()):
+        mappers = [JiraFieldMapper(mock_options, None) for _ in range(3)]
+
+    assert 1 == mock_fetch.call_count
+    for mapper in mappers:
+        assert 'customfield_10111' == mapper.jira_key('Story Points')
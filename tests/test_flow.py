@@ -0,0 +1,115 @@
+import math
+
+import pandas as pd
+
+from jamp.flow import FlowMetrics, MS_PER_DAY
+from jamp.resources import CfdReport
+
+DAY = MS_PER_DAY
+T0 = 1615939200000  # 2021-03-17 00:00:00
+
+
+def board(board_id, changes, now):
+    return {'id': board_id,
+            'now': now,
+            'columns': [{'name': 'To Do'}, {'name': 'In Progress'}, {'name': 'Done'}],
+            'columnChanges': changes}
+
+
+def test_flow_metrics_milestones(mock_options):
+    raw = board(1, {str(T0): [{'key': 'A-1', 'columnTo': 0}, {'key': 'A-2', 'columnTo': 0},
+                              {'key': 'A-3', 'columnTo': 0}],
+                    str(T0 + 1 * DAY): [{'key': 'A-1', 'columnFrom': 0, 'columnTo': 1}],
+                    str(T0 + 2 * DAY): [{'key': 'A-2', 'columnFrom': 0, 'columnTo': 1}],
+                    str(T0 + 4 * DAY): [{'key': 'A-1', 'columnFrom': 1, 'columnTo': 2}],
+                    # A-2 is reopened after being done, then done again
+                    str(T0 + 5 * DAY): [{'key': 'A-2', 'columnFrom': 1, 'columnTo': 2}],
+                    str(T0 + 6 * DAY): [{'key': 'A-2', 'columnFrom': 2, 'columnTo': 1}],
+                    str(T0 + 8 * DAY): [{'key': 'A-2', 'columnFrom': 1, 'columnTo': 2}]},
+                now=T0 + 10 * DAY)
+    flow = FlowMetrics([CfdReport(options=mock_options, session=None, raw=raw)])
+
+    issues = flow.issues().set_index('key')
+    assert [3.0, 6.0] == list(issues.loc[['A-1', 'A-2'], 'cycle_time'])
+    assert [4.0, 8.0] == list(issues.loc[['A-1', 'A-2'], 'lead_time'])
+    assert math.isnan(issues.loc['A-3', 'started'])
+    assert math.isnan(issues.loc['A-3', 'cycle_time'])
+
+    assert flow.aging_wip().empty
+
+
+def test_flow_metrics_throughput_and_aging_wip_per_board(mock_options):
+    first = board(1, {str(T0): [{'key': 'A-1', 'columnTo': 1}, {'key': 'A-2', 'columnTo': 1}],
+                      str(T0 + 2 * DAY): [{'key': 'A-1', 'columnFrom': 1, 'columnTo': 2}],
+                      str(T0 + 9 * DAY): [{'key': 'A-2', 'columnFrom': 1, 'columnTo': 2}]},
+                  now=T0 + 10 * DAY)
+    # The same key on another board is a different issue
+    second = board(2, {str(T0): [{'key': 'A-1', 'columnTo': 1}],
+                       str(T0 + 1 * DAY): [{'key': 'B-1', 'columnTo': 1}]},
+                   now=T0 + 5 * DAY)
+    flow = FlowMetrics([CfdReport(options=mock_options, session=None, raw=first),
+                        CfdReport(options=mock_options, session=None, raw=second)])
+
+    throughput = flow.throughput('W')
+    assert ['1', '1'] == list(throughput['board'])
+    assert [pd.Timestamp('2021-03-15'), pd.Timestamp('2021-03-22')] == list(throughput['date'])
+    assert [1, 1] == list(throughput['throughput'])
+
+    wip = flow.aging_wip()
+    assert [('2', 'A-1', 5.0), ('2', 'B-1', 4.0)] == list(zip(wip['board'], wip['key'], wip['age']))
+
+    summary = flow.summary().set_index('board')
+    assert [2, 0] == list(summary['completed'])
+    assert [0, 2] == list(summary['wip'])
+    assert 5.5 == summary.loc['1', 'cycle_time_p50']
+
+
+def test_flow_metrics_boards_with_the_same_name(mock_options):
+    config = {'currentViewConfig': {'name': 'Team'}}
+    first = board(1, {str(T0): [{'key': 'A-1', 'columnTo': 1}]}, now=T0 + 10 * DAY)
+    second = board(2, {str(T0): [{'key': 'B-1', 'columnTo': 1}],
+                       str(T0 + 1 * DAY): [{'key': 'B-2', 'columnTo': 1},
+                                           {'key': 'B-1', 'columnFrom': 1, 'columnTo': 2}]},
+                   now=T0 + 3 * DAY)
+    flow = FlowMetrics([CfdReport(options=mock_options, session=None, raw=first, config=config),
+                        CfdReport(options=mock_options, session=None, raw=second, config=config)])
+
+    # Each board's WIP is aged at its own 'now'
+    wip = flow.aging_wip()
+    assert [(1, 'A-1', 10.0), (2, 'B-2', 2.0)] == list(zip(wip['board_id'], wip['key'], wip['age']))
+
+    summary = flow.summary()
+    assert [1, 2] == list(summary['board_id'])
+    assert ['Team', 'Team'] == list(summary['board'])
+    assert [0, 1] == list(summary['completed'])
+    assert [1, 1] == list(summary['wip'])
+
+
+def test_flow_metrics_done_column(mock_options):
+    raw = board(1, {str(T0): [{'key': 'A-1', 'columnTo': 0}],
+                    str(T0 + 3 * DAY): [{'key': 'A-1', 'columnFrom': 0, 'columnTo': 1}]},
+                now=T0 + 4 * DAY)
+    flow = FlowMetrics([CfdReport(options=mock_options, session=None, raw=raw)], start_column=0, done_column=1)
+
+    assert [3.0] == list(flow.issues()['cycle_time'])
+
+
+def test_flow_metrics_mock_cfd(mock_cfd, mock_board_config, mock_options):
+    mock_cfd['id'] = 1
+    cfd = CfdReport(options=mock_options, session=None, raw=mock_cfd, config=mock_board_config)
+    issues = FlowMetrics([cfd]).issues()
+
+    assert sorted(set(cfd.changes()['key'])) == sorted(issues['key'])
+    assert (issues['cycle_time'].dropna() >= 0).all()
+    assert (issues['lead_time'].dropna() >= issues['cycle_time'].dropna()).all()
+    assert {'JAMP Program'} == set(issues['board'])
+
+
+def test_flow_metrics_empty(mock_options):
+    raw = board(1, {}, now=T0)
+    flow = FlowMetrics([CfdReport(options=mock_options, session=None, raw=raw)])
+
+    assert flow.issues().empty
+    assert flow.throughput().empty
+    assert flow.aging_wip().empty
+    assert flow.summary().empty
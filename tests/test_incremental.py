@@ -0,0 +1,66 @@
+import time
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from jamp.incremental import SprintStateFile, report_hash
+
+
+def build(id, state=None):
+    mock = MagicMock()
+    mock.id = id
+    mock.state = state
+    return mock
+
+
+@pytest.fixture
+def state_file(tmp_path):
+    return str(tmp_path / 'sprints.json')
+
+
+@pytest.fixture
+def board():
+    return build(458)
+
+
+def record(state_file, board, sprints, grace_days=7):
+    sprint_state = SprintStateFile(state_file, grace_days)
+    for sprint in sprints:
+        raw = {'sprint': {'id': sprint.id, 'state': sprint.state}}
+        sprint_state.update(board, sprint, report_hash(raw), (board.id, sprint.id, 1.0))
+    sprint_state.save()
+    return sprint_state
+
+
+def test_new_sprint_is_fetched(state_file, board):
+    assert not SprintStateFile(state_file).is_current(board, build(1, 'closed'))
+
+
+def test_closed_sprint_is_reused_after_grace(state_file, board):
+    record(state_file, board, [build(1, 'closed'), build(2, 'active'), build(3, 'future')])
+
+    # Recently closed sprints are still fetched
+    sprint_state = SprintStateFile(state_file)
+    assert not sprint_state.is_current(board, build(1, 'closed'))
+
+    with patch('jamp.incremental.time.time', return_value=time.time() + 8 * 24 * 3600):
+        assert sprint_state.is_current(board, build(1, 'closed'))
+        assert not sprint_state.is_current(board, build(2, 'active'))
+        assert not sprint_state.is_current(board, build(3, 'future'))
+        # Reopened since the last run
+        assert not sprint_state.is_current(board, build(1, 'active'))
+        # Same sprint on another board has its own row
+        assert not sprint_state.is_current(build(459), build(1, 'closed'))
+
+    assert (458, 1, 1.0) == sprint_state.row(board, build(1, 'closed'))
+    assert 1 == sprint_state.reused
+
+
+def test_closed_time_kept_across_updates(state_file, board):
+    record(state_file, board, [build(1, 'closed')], grace_days=0)
+
+    with patch('jamp.incremental.time.time', return_value=time.time() + 60):
+        sprint_state = record(state_file, board, [build(1, 'closed')], grace_days=0)
+        assert sprint_state.is_current(board, build(1, 'closed'))
+        assert 0 == sprint_state.changed
+        assert 1 == sprint_state.fetched
@@ -0,0 +1,161 @@
+import json
+import os
+import sys
+import threading
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from auth import JIRA_PASSWORD_ENV
+from benchmarks.standin import StandinServer, ReplayProgram
+from jamp.instrument import Profiler, PROFILER, endpoint_name, percentile
+from metrics import JiraProgramMetrics
+
+
+@pytest.fixture
+def profiler():
+    profiler = Profiler()
+    profiler.enable()
+    return profiler
+
+
+class FakeSession:
+    def __init__(self, content=b'{}', status_code=200, error=None):
+        self.response = MagicMock(content=content, status_code=status_code)
+        self.error = error
+        self.requests = 0
+
+    def request(self, method, url, **kwargs):
+        self.requests += 1
+        if self.error:
+            raise self.error
+        return self.response
+
+
+def test_endpoint_name():
+    assert '/rest/agile/1.0/board/{id}/sprint' == \
+        endpoint_name('https://jira.example.com/jira/rest/agile/1.0/board/42/sprint?startAt=50')
+    assert '/rest/greenhopper/1.0/rapid/charts/sprintreport' == \
+        endpoint_name('http://localhost:8080/rest/greenhopper/1.0/rapid/charts/sprintreport?rapidViewId=1')
+    assert '/rest/api/2/search' == endpoint_name('http://localhost/rest/api/2/search')
+    assert '/rest/api/2/issue/{id}' == endpoint_name('http://localhost/rest/api/2/issue/10002')
+
+
+def test_percentile():
+    assert 0.0 == percentile([], 50)
+    assert 3 == percentile([5, 1, 3, 2, 4], 50)
+    assert 95 == percentile(list(range(1, 101)), 95)
+    assert 7 == percentile([7], 95)
+
+
+def test_profiler_disabled():
+    profiler = Profiler()
+    session = FakeSession()
+    profiler.instrument(session)
+
+    with profiler.phase('boards'):
+        session.request('GET', 'http://localhost/rest/agile/1.0/board')
+    profiler.cache('response', hit=True)
+
+    assert 1 == session.requests
+    assert {'endpoints': {}, 'phases': {}, 'cache': {}} == profiler.summary()
+
+
+def test_profiler_requests_and_phases(profiler):
+    session = FakeSession(content=b'x' * 100)
+    profiler.instrument(session)
+    profiler.instrument(session)  # wrapped only once
+
+    with profiler.phase('sprint_report'):
+        session.request('GET', 'http://localhost/rest/greenhopper/1.0/rapid/charts/sprintreport?sprintId=1')
+        with profiler.phase('added_issues'):
+            session.request('GET', 'http://localhost/rest/api/2/search?jql=x')
+            session.request('GET', 'http://localhost/rest/api/2/search?jql=y')
+    profiler.cache('response', hit=True)
+    profiler.cache('response', hit=False)
+    profiler.cache('response', hit=True)
+
+    summary = profiler.summary()
+    assert 2 == summary['endpoints']['/rest/api/2/search']['count']
+    assert 200 == summary['endpoints']['/rest/api/2/search']['bytes']
+    assert 1 == summary['endpoints']['/rest/greenhopper/1.0/rapid/charts/sprintreport']['count']
+
+    # A phase counts the requests of the phases inside it
+    assert 3 == summary['phases']['sprint_report']['requests']
+    assert 2 == summary['phases']['added_issues']['requests']
+    assert summary['phases']['sprint_report']['total'] >= summary['phases']['added_issues']['total']
+    assert {'response': {'hits': 2, 'misses': 1}} == summary['cache']
+
+    table = profiler.table()
+    assert '/rest/api/2/search' in table
+    assert 'added_issues' in table
+    assert 'response cache: 2 hits, 1 misses' in table
+
+
+def test_profiler_failed_request(profiler):
+    session = FakeSession(error=ConnectionError())
+    profiler.instrument(session)
+
+    with pytest.raises(ConnectionError):
+        session.request('GET', 'http://localhost/rest/api/2/field')
+
+    assert 1 == profiler.summary()['endpoints']['/rest/api/2/field']['count']
+
+
+def test_profiler_chrome_trace(profiler, tmp_path):
+    session = FakeSession()
+    profiler.instrument(session)
+
+    def work():
+        with profiler.phase('sprints'):
+            session.request('GET', 'http://localhost/rest/agile/1.0/board/1/sprint')
+
+    thread = threading.Thread(target=work)
+    thread.start()
+    thread.join()
+    work()
+
+    filename = str(tmp_path / 'trace.json')
+    profiler.write_chrome_trace(filename)
+    with open(filename) as f:
+        events = json.load(f)['traceEvents']
+
+    assert 4 == len(events)
+    assert {'X'} == {event['ph'] for event in events}
+    assert {1, 2} == {event['tid'] for event in events}
+    request = [event for event in events if event['cat'] == 'request'][0]
+    assert '/rest/agile/1.0/board/{id}/sprint' == request['name']
+    assert 'sprints' == request['args']['phase']
+    assert all(event['dur'] >= 0 for event in events)
+
+
+def test_metrics_profile(global_profiler, field_maps, tmp_path, capsys):
+    json_file = str(tmp_path / 'profile.json')
+    args = ['metrics.py',
+            '--user', 'bench',
+            '--no-cache',
+            '--file', str(tmp_path / 'sprints.xlsx'),
+            '--image', str(tmp_path / 'sprints.png'),
+            '--profile_json', json_file,
+            '--profile_trace', str(tmp_path / 'trace.json')]
+
+    with StandinServer(ReplayProgram(boards=2, sprints=3)) as server:
+        with patch.object(sys, 'argv', args + ['--server', server.url]), \
+                patch.dict(os.environ, {JIRA_PASSWORD_ENV: 'bench'}):
+            JiraProgramMetrics().run()
+
+    with open(json_file) as f:
+        summary = json.load(f)
+
+    assert 6 == summary['endpoints']['/rest/greenhopper/1.0/rapid/charts/sprintreport']['count']
+    assert 6 == summary['phases']['sprint_report']['count']
+    assert 2 == summary['phases']['sprints']['count']
+    for phase in ('connect', 'boards', 'velocity_report', 'write', 'run'):
+        assert phase in summary['phases']
+    assert summary['endpoints']['/rest/agile/1.0/board']['bytes'] > 0
+    # One SprintReport fetches the field map, the rest find it in the registry
+    assert 1 == summary['cache']['field_map']['misses']
+    assert summary['cache']['field_map']['hits'] > 0
+
+    assert 'Endpoint' in capsys.readouterr().out
+    assert os.path.getsize(tmp_path / 'trace.json') > 0
@@ -1,13 +1,18 @@
 import os
 import sys
+from datetime import datetime
 from pprint import pprint
 from unittest.mock import patch, MagicMock
 
+import pandas as pd
 import pytest
+from jira import JIRA, JIRAError
 from jira.resources import Board
 
 from auth import JIRA_PASSWORD_ENV
-from metrics import JiraProgramMetrics
+from jamp.flow import FlowMetrics
+from jamp.resources import VelocityReport, CfdReport
+from metrics import JiraProgramMetrics, _earliest_sprint_start
 
 
 @pytest.fixture
@@ -32,6 +37,16 @@ def build_sprint(name, id):
     return mock_sprint
 
 
+def build_velocity_report(sprint_ids=(100, 200, 300, 400), estimated=5.0, completed=4.0) -> VelocityReport:
+    options = {'agile_rest_path': None, 'server': 'localhost', 'agile_rest_api_version': '2'}
+    raw = {'id': 1,
+           'sprints': [{'id': i} for i in sprint_ids],
+           'velocityStatEntries': {str(i): {'estimated': {'value': estimated, 'text': str(estimated)},
+                                            'completed': {'value': completed, 'text': str(completed)}}
+                                   for i in sprint_ids}}
+    return VelocityReport(options=options, session=None, raw=raw)
+
+
 @pytest.fixture
 def mock_sprints():
     mock_sprints = []
@@ -156,6 +171,7 @@ def test_metrics_required_args_good_password(mock_jira_field_mapper,
     mock_jira_client_instance = mock_jira.return_value
     mock_jira_client_instance.boards.return_value = mock_boards
     mock_jira_client_instance.sprints.return_value = mock_sprints
+    mock_jira_reports.return_value.velocity_report.return_value = build_velocity_report()
 
     mock_jira_reports.return_value.sprint_report.return_value = mock_sprint_report
 
@@ -203,6 +219,7 @@ def test_metrics_args_board(mock_jira_field_mapper,
     mock_jira_client_instance = mock_jira.return_value
     mock_jira_client_instance.boards.return_value = mock_boards
     mock_jira_client_instance.sprints.return_value = mock_sprints
+    mock_jira_reports.return_value.velocity_report.return_value = build_velocity_report()
 
     mock_jira_reports.return_value.sprint_report.return_value = mock_sprint_report
 
@@ -250,6 +267,7 @@ def test_metrics_args_board_no_command(mock_jira_field_mapper,
     mock_jira_client_instance = mock_jira.return_value
     mock_jira_client_instance.boards.return_value = mock_boards
     mock_jira_client_instance.sprints.return_value = mock_sprints
+    mock_jira_reports.return_value.velocity_report.return_value = build_velocity_report()
 
     mock_jira_reports.return_value.sprint_report.return_value = mock_sprint_report
 
@@ -277,3 +295,385 @@ def test_metrics_args_board_no_command(mock_jira_field_mapper,
     assert not mock_jira_teams.called
 
     assert mock_jira_field_mapper.called
+
+
+def build_sprint_report(board_id, sprint_id):
+    if sprint_id == 300:
+        raise JIRAError(status_code=500, text="Passed List had more than one value.")
+
+    mock_sprint_report = MagicMock()
+    mock_sprint_report.raw = {'sprint': {'id': sprint_id}}
+    mock_sprint_report.sprint.name = f"{board_id}/{sprint_id}"
+    mock_sprint_report.sprint.state = 'CLOSED'
+    mock_sprint_report.committed = float(board_id + sprint_id)
+    mock_sprint_report.added_sum = 1.0
+    mock_sprint_report.puntedIssuesEstimateSum = 2.0
+    mock_sprint_report.issuesNotCompletedEstimateSum = 3.0
+    mock_sprint_report.completedIssuesEstimateSum = 4.0
+    mock_sprint_report.committed_count = 5
+    mock_sprint_report.added_count = 1
+    mock_sprint_report.puntedIssuesCount = 1
+    mock_sprint_report.issuesNotCompletedInCurrentSprintCount = 1
+    mock_sprint_report.completedIssuesCount = 3
+    mock_sprint_report.percent_complete_count = 0.6
+    return mock_sprint_report
+
+
+@pytest.mark.parametrize("workers", ["1", "8"])
+@patch('metrics.JIRA')
+@patch('metrics.JIRAReports')
+@patch('metrics.JIRATeams')
+@patch('metrics.JiraFieldMapper')
+def test_metrics_workers_order(mock_jira_field_mapper,
+                               mock_jira_teams,
+                               mock_jira_reports,
+                               mock_jira,
+                               program_metrics,
+                               mock_server,
+                               mock_password,
+                               mock_user,
+                               mock_boards,
+                               mock_sprints,
+                               workers):
+    mock_jira_client_instance = mock_jira.return_value
+    mock_jira_client_instance.boards.return_value = mock_boards
+    mock_jira_client_instance.sprints.return_value = mock_sprints
+    mock_jira_reports.return_value.velocity_report.return_value = build_velocity_report()
+
+    mock_jira_reports.return_value.sprint_report.side_effect = build_sprint_report
+
+    pm = program_metrics(["metrics.py",
+                          '--user', mock_user,
+                          '--server', mock_server,
+                          '--board', 'IDAP',
+                          '--workers', workers,
+                          '--file', 'dummy_file.xlsx',
+                          '--image', 'dummy_image.png'
+                          ],
+                         password=mock_password)
+
+    df = pm.build_report()
+
+    # Sprint 300 raised a JIRAError on every board and is skipped
+    board_ids = [b.id for b in mock_boards if b.name.startswith('IDAP') and b.type == 'scrum']
+    expected = [f"{b}/{s}" for b in board_ids for s in (100, 200, 400)]
+    assert expected == list(df['Sprint'])
+    assert [5.0] * len(expected) == list(df['Story Points Committed VC'])
+    assert [4.0] * len(expected) == list(df['Story Points Completed VC'])
+
+
+@patch('metrics.JIRA')
+@patch('metrics.JIRAReports')
+@patch('metrics.JIRATeams')
+@patch('metrics.JiraFieldMapper')
+def test_metrics_incremental(mock_jira_field_mapper,
+                             mock_jira_teams,
+                             mock_jira_reports,
+                             mock_jira,
+                             program_metrics,
+                             mock_server,
+                             mock_password,
+                             mock_user,
+                             mock_boards,
+                             mock_sprints,
+                             tmp_path):
+    for sprint in mock_sprints:
+        sprint.state = 'active' if sprint.id == 400 else 'closed'
+
+    mock_jira_client_instance = mock_jira.return_value
+    mock_jira_client_instance.boards.return_value = mock_boards
+    mock_jira_client_instance.sprints.return_value = mock_sprints
+    mock_jira_reports.return_value.velocity_report.return_value = build_velocity_report()
+
+    mock_jira_reports.return_value.sprint_report.side_effect = build_sprint_report
+
+    args = ["metrics.py",
+            '--user', mock_user,
+            '--server', mock_server,
+            '--board', 'IDAP',
+            '--incremental', str(tmp_path / 'sprints.json'),
+            '--incremental_grace_days', '0',
+            '--file', 'dummy_file.xlsx',
+            '--image', 'dummy_image.png'
+            ]
+
+    first = program_metrics(args, password=mock_password).build_report()
+    first_calls = mock_jira_reports.return_value.sprint_report.call_count
+
+    second = program_metrics(args, password=mock_password).build_report()
+    second_calls = mock_jira_reports.return_value.sprint_report.call_count - first_calls
+
+    # Only the active sprint (and the one that failed) is fetched again on each board
+    assert 8 == first_calls
+    assert 4 == second_calls
+    assert list(first['Sprint']) == list(second['Sprint'])
+    assert list(first['Story Points Committed']) == list(second['Story Points Committed'])
+
+
+@patch('metrics.JIRA')
+@patch('metrics.JIRAReports')
+@patch('metrics.JIRATeams')
+@patch('metrics.JiraFieldMapper')
+def test_metrics_board_list_fetched_once(mock_jira_field_mapper,
+                                         mock_jira_teams,
+                                         mock_jira_reports,
+                                         mock_jira,
+                                         program_metrics,
+                                         mock_server,
+                                         mock_password,
+                                         mock_user,
+                                         mock_boards):
+    mock_jira_client_instance = mock_jira.return_value
+    mock_jira_client_instance.boards.return_value = mock_boards
+
+    pm = program_metrics(["metrics.py",
+                          '--user', mock_user,
+                          '--server', mock_server,
+                          '--board', 'IDAP board:MATCH_EXACT;IDAP;NO SUCH BOARD:MATCH_EXACT',
+                          '--file', 'dummy_file.xlsx',
+                          '--image', 'dummy_image.png'
+                          ],
+                         password=mock_password)
+
+    boards = pm.board_list()
+    assert boards is pm.board_list()
+
+    idap = [b.name for b in mock_boards if b.name.startswith('IDAP')]
+    assert ['IDAP board'] + idap == [b.name for b in boards]
+    assert 1 == mock_jira_client_instance.boards.call_count
+
+
+def test_earliest_sprint_start(mock_sprints):
+    mock_sprints[1].startDate = '2020-02-27T16:59:05.814-05:00'
+    mock_sprints[2].startDate = '2020-02-13T11:52:32.922-05:00'
+
+    # MagicMock sprints without a real start date are skipped
+    assert datetime(2020, 2, 13) == _earliest_sprint_start(mock_sprints)
+    assert _earliest_sprint_start(mock_sprints[:1]) is None
+
+
+@patch('metrics.JIRA')
+@patch('metrics.JIRAReports')
+@patch('metrics.JIRATeams')
+@patch('metrics.JiraFieldMapper')
+def test_metrics_velocity_window_args(mock_jira_field_mapper,
+                                      mock_jira_teams,
+                                      mock_jira_reports,
+                                      mock_jira,
+                                      program_metrics,
+                                      mock_server,
+                                      mock_password,
+                                      mock_user,
+                                      mock_sprints):
+    mock_jira.return_value.sprints.return_value = mock_sprints
+
+    args = ["metrics.py",
+            '--user', mock_user,
+            '--server', mock_server,
+            '--velocity_since', '2018-01-01',
+            '--velocity_until', '2021-03-03',
+            '--velocity_window_days', '90',
+            '--file', 'dummy_file.xlsx',
+            '--image', 'dummy_image.png'
+            ]
+
+    program_metrics(args, password=mock_password)._fetch_board(build_board('ABC', 150, 'scrum'))
+
+    mock_jira_reports.return_value.velocity_report.assert_called_once_with(
+        board_id=150,
+        finished_before=datetime(2021, 3, 3, 23, 59, 59, 999999),
+        finished_after=datetime(2018, 1, 1),
+        window_days=90)
+
+
+def test_metrics_velocity_since_after_until(program_metrics, mock_server, mock_user):
+    info, out, err = program_metrics(["metrics.py",
+                                      '--user', mock_user,
+                                      '--server', mock_server,
+                                      '--velocity_since', '2021-03-03',
+                                      '--velocity_until', '2018-01-01',
+                                      '--file', 'dummy_file.xlsx',
+                                      '--image', 'dummy_image.png'],
+                                     exception=SystemExit)
+    assert '--velocity_since must not be later than --velocity_until' in err
+    assert 2 == info.value.code
+
+
+@patch('metrics.JIRA')
+@patch('metrics.JIRAReports')
+@patch('metrics.JIRATeams')
+@patch('metrics.JiraFieldMapper')
+def test_metrics_future_sprints_velocity(mock_jira_field_mapper,
+                                         mock_jira_teams,
+                                         mock_jira_reports,
+                                         mock_jira,
+                                         program_metrics,
+                                         mock_server,
+                                         mock_password,
+                                         mock_user,
+                                         reports_client):
+    # The board's only sprint starts in the future, so there is no velocity window
+    sprint = build_sprint('Sprint 9.1', 900)
+    sprint.startDate = '2030-01-06T16:59:05.814-05:00'
+    mock_jira.return_value.sprints.return_value = [sprint]
+    args = ["metrics.py",
+            '--user', mock_user,
+            '--server', mock_server,
+            '--file', 'dummy_file.xlsx',
+            '--image', 'dummy_image.png'
+            ]
+    pm = program_metrics(args, password=mock_password)
+    pm.reports_client = reports_client
+
+    with patch.object(JIRA, '_get_json') as mock_get_json:
+        vr, sprints = pm._fetch_board(build_board('ABC', 150, 'scrum'))
+
+    assert 0 == mock_get_json.call_count
+    assert vr.frame().empty
+    assert [sprint] == sprints
+
+
+@patch('metrics.JIRA')
+@patch('metrics.JIRAReports')
+@patch('metrics.JIRATeams')
+@patch('metrics.JiraFieldMapper')
+def test_metrics_stream_sprint_report(mock_jira_field_mapper,
+                                      mock_jira_teams,
+                                      mock_jira_reports,
+                                      mock_jira,
+                                      program_metrics,
+                                      mock_server,
+                                      mock_password,
+                                      mock_user,
+                                      mock_boards,
+                                      mock_sprints,
+                                      tmp_path):
+    mock_jira_client_instance = mock_jira.return_value
+    mock_jira_client_instance.boards.return_value = mock_boards
+    mock_jira_client_instance.sprints.return_value = mock_sprints
+    mock_jira_reports.return_value.velocity_report.return_value = build_velocity_report()
+    mock_jira_reports.return_value.sprint_report.side_effect = build_sprint_report
+
+    args = ["metrics.py",
+            '--user', mock_user,
+            '--server', mock_server,
+            '--board', 'IDAP',
+            '--stream',
+            '--file', str(tmp_path / 'streamed.xlsx'),
+            '--image', 'dummy_image.png'
+            ]
+    pm = program_metrics(args, password=mock_password)
+
+    sinks = []
+    assert pm.build_report(sink=sinks.append) is None
+    # One frame per board, each with its own velocity figures
+    assert len({frame['Team'][0] for frame in sinks}) == len(sinks)
+
+    assert pm.stream_sprint_report() is None
+    expected = pm.build_report()
+    actual = pd.read_excel(str(tmp_path / 'streamed.xlsx'), sheet_name='Sprint Report')
+
+    assert list(expected.columns) == [c.replace('.1', '') for c in actual.columns]
+    assert list(expected['Sprint']) == list(actual['Sprint'])
+    assert list(expected['Story Points Committed VC']) == list(actual['Story Points Committed VC'])
+
+    # The same rows written as typed Parquet
+    pytest.importorskip('pyarrow')
+    pm._args.file = str(tmp_path / 'report.parquet')
+    pm.build_sprint_report(expected)
+    parquet = pd.read_parquet(pm._args.file)
+
+    assert ['% Complete', '% Complete.1'] == [c for c in parquet.columns if c.startswith('% Complete')]
+    assert 'Int64' == str(parquet['# Issues Completed'].dtype)
+    assert list(expected['Sprint']) == list(parquet['Sprint'])
+
+
+@patch('metrics.JIRA')
+@patch('metrics.JIRAReports')
+@patch('metrics.JIRATeams')
+@patch('metrics.JiraFieldMapper')
+def test_metrics_cfd_images(mock_jira_field_mapper,
+                            mock_jira_teams,
+                            mock_jira_reports,
+                            mock_jira,
+                            program_metrics,
+                            mock_server,
+                            mock_password,
+                            mock_user,
+                            mock_boards,
+                            mock_cfd,
+                            mock_options,
+                            tmp_path):
+    mock_jira.return_value.boards.return_value = mock_boards
+    mock_jira_reports.return_value.cfd_report.side_effect = lambda board_id: CfdReport(
+        options=dict(mock_options), session=None, raw=dict(mock_cfd, id=board_id),
+        config={'currentViewConfig': {'name': f'Board {board_id}'}})
+
+    args = ["metrics.py",
+            '--user', mock_user,
+            '--server', mock_server,
+            '--board', 'IDAP',
+            '--stream',
+            '--cfd', str(tmp_path / 'cfd.csv'),
+            '--cfd_images', str(tmp_path / 'cfd'),
+            '--file', 'dummy_file.xlsx',
+            '--image', 'dummy_image.png'
+            ]
+    pm = program_metrics(args, password=mock_password)
+    pm.stream_cfd_report()
+
+    boards = pm.board_list()
+    assert sorted(f'Board_{b.id}.png' for b in boards) == sorted(os.listdir(tmp_path / 'cfd'))
+
+
+@pytest.mark.parametrize("suffix", ['.xlsx', '.csv'])
+@pytest.mark.parametrize("stream", [False, True])
+@patch('metrics.JIRA')
+@patch('metrics.JIRAReports')
+@patch('metrics.JIRATeams')
+@patch('metrics.JiraFieldMapper')
+def test_metrics_flow(mock_jira_field_mapper,
+                      mock_jira_teams,
+                      mock_jira_reports,
+                      mock_jira,
+                      program_metrics,
+                      mock_server,
+                      mock_password,
+                      mock_user,
+                      mock_boards,
+                      mock_cfd,
+                      mock_options,
+                      tmp_path,
+                      stream,
+                      suffix):
+    mock_jira.return_value.boards.return_value = mock_boards
+    mock_jira_reports.return_value.cfd_report.side_effect = lambda board_id: CfdReport(
+        options=dict(mock_options), session=None, raw=dict(mock_cfd, id=board_id),
+        config={'currentViewConfig': {'name': f'Board {board_id}'}})
+
+    flow_file = str(tmp_path / f'flow{suffix}')
+    args = ["metrics.py",
+            '--user', mock_user,
+            '--server', mock_server,
+            '--board', 'IDAP',
+            '--flow', flow_file,
+            '--file', 'dummy_file.xlsx',
+            '--image', 'dummy_image.png'
+            ] + (['--stream'] if stream else [])
+    pm = program_metrics(args, password=mock_password)
+    pm.run()
+
+    if suffix == '.xlsx':
+        summary = pd.read_excel(flow_file, sheet_name='Flow Summary')
+        issues = pd.read_excel(flow_file, sheet_name='Flow Issues')
+    else:
+        summary = pd.read_csv(flow_file)
+        issues = pd.read_csv(str(tmp_path / f'flow-Flow_Issues{suffix}'))
+
+    # One pass over the program: a summary row per board, in board id order
+    boards = pm.board_list()
+    assert sorted(b.id for b in boards) == list(summary['board_id'])
+    assert [f'Board {board_id}' for board_id in summary['board_id']] == list(summary['board'])
+    expected = FlowMetrics([CfdReport(options=dict(mock_options), session=None, raw=dict(mock_cfd, id=1))])
+    assert len(boards) * len(expected.issues()) == len(issues)
+    assert list(expected.summary()['completed']) == list(summary['completed'][:1])
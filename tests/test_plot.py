@@ -1,9 +1,106 @@
-from jamp.plot import MetricPlot
+import os
+
+import numpy as np
+from matplotlib.figure import Figure
+
+from jamp.plot import MetricPlot, TeamPlot, CfdPlot
+from jamp.resources import CfdReport
 
 from unittest.mock import patch, MagicMock
 
+import pytest
+
 @patch("jamp.plot.plt")
 def test_metric_plot(mock_plt, mock_metrics_df):
     mock_plt.subplots.return_value = (MagicMock(), MagicMock())
     mp = MetricPlot("bob")
-    mp.plot(mock_metrics_df)
\ No newline at end of file
+    mp.plot(mock_metrics_df)
+
+
+@patch("jamp.plot.plt")
+def test_metric_plot_in_memory_frame(mock_plt, mock_metrics_df):
+    ax1, ax2 = MagicMock(), MagicMock()
+    ax1.twinx.return_value = ax2
+    mock_plt.subplots.return_value = (MagicMock(), ax1)
+
+    # The frame as build_report returns it, with '% Complete' twice
+    df = mock_metrics_df.set_axis([c.replace('.1', '') for c in mock_metrics_df.columns], axis=1)
+    assert 2 == list(df.columns).count('% Complete')
+
+    MetricPlot("bob").plot(df)
+
+    # One scatter call for every sprint's (story points) % Complete
+    expected = mock_metrics_df.groupby('Sprint')['% Complete'].mean()
+    ax2.scatter.assert_called_once()
+    x, y = ax2.scatter.call_args[0]
+    assert list(expected.index) == list(x)
+    assert list(expected) == pytest.approx(list(y), nan_ok=True)
+    assert len(expected) == ax2.annotate.call_count
+
+
+def test_team_plot_each_reuses_one_figure(mock_metrics_df, tmp_path):
+    with patch('jamp.plot.Figure', wraps=Figure) as mock_figure:
+        image_files = TeamPlot().plot_each(mock_metrics_df, str(tmp_path / 'teams'))
+
+    mock_figure.assert_called_once()
+    assert mock_metrics_df['Team'].nunique() == len(image_files)
+    assert all(os.path.getsize(f) > 0 for f in image_files)
+    assert 'JAMP_Team_2.png' in [os.path.basename(f) for f in image_files]
+
+
+def test_team_plot_grid(mock_metrics_df, tmp_path):
+    image_file = str(tmp_path / 'teams.png')
+
+    assert mock_metrics_df['Team'].nunique() == TeamPlot(columns=2).plot_grid(mock_metrics_df, image_file)
+    assert os.path.getsize(image_file) > 0
+
+
+@pytest.fixture
+def cfd_report(mock_cfd, mock_options):
+    return CfdReport(options=mock_options, session=None, raw=dict(mock_cfd, id=1),
+                     config={'currentViewConfig': {'name': 'JAMP board'}})
+
+
+def test_cfd_plot(cfd_report, tmp_path):
+    cfd_plot = CfdPlot(size=(4, 3), dpi=50)
+    with patch.object(CfdPlot, '_draw', wraps=cfd_plot._draw) as mock_draw:
+        assert cfd_plot.plot(cfd_report, str(tmp_path / 'cfd.png'))
+
+    # One sample per pixel across, from the first change to 'now'
+    times, counts, columns, title, _ = mock_draw.call_args[0]
+    assert 200 == cfd_plot.samples == len(times)
+    assert (cfd_report.raw['firstChangeTime'], cfd_report.raw['now']) == (times[0], times[-1])
+    assert cfd_report.report()[columns].iloc[-1].tolist() == counts[-1].tolist()
+    assert 'JAMP board' == title
+    assert os.path.getsize(tmp_path / 'cfd.png') > 0
+
+
+def test_cfd_plot_frame_downsamples(cfd_report, tmp_path):
+    df = cfd_report.report()
+    columns = cfd_report.column_names()
+    cfd_plot = CfdPlot(size=(0.1, 1), dpi=100)
+    assert len(df) > cfd_plot.samples
+
+    with patch.object(CfdPlot, '_draw') as mock_draw:
+        assert cfd_plot.plot_frame(df, columns, str(tmp_path / 'cfd.png'))
+
+    times, counts, _, _, _ = mock_draw.call_args[0]
+    assert cfd_plot.samples == len(times) == len(counts)
+    assert df[columns].iloc[0].tolist() == counts[0].tolist()
+    assert df[columns].iloc[-1].tolist() == counts[-1].tolist()
+
+    # Each sample is the last row at or before its time
+    dates = df['date'].values.astype('datetime64[ms]').astype(np.int64)
+    for time, row in zip(times, counts):
+        assert df[columns].iloc[np.searchsorted(dates, time, side='right') - 1].tolist() == row.tolist()
+
+
+def test_cfd_plot_each(cfd_report, mock_options, tmp_path):
+    empty = CfdReport(options=mock_options, session=None,
+                      raw={'id': 2, 'columns': [{'name': 'To Do'}], 'columnChanges': {}},
+                      config={'currentViewConfig': {'name': 'Empty board'}})
+
+    image_files = CfdPlot(size=(4, 3), dpi=50).plot_each([cfd_report, empty], str(tmp_path / 'cfd'))
+
+    assert ['JAMP_board.png'] == [os.path.basename(f) for f in image_files]
+    assert os.path.getsize(image_files[0]) > 0
@@ -1,7 +1,10 @@
 import math
+from unittest.mock import patch
 
-from jamp import NAN
-from jamp.resources import SprintReport, COUNTS, STATS, LISTS, VelocityReport
+from jamp import NAN, JiraFieldMapper
+from jamp.resources import SprintReport, COUNTS, STATS, LISTS, VelocityReport, CfdReport, _chunk_issue_keys, \
+    _estimate_index, SprintSummary, SUMMARY_FIELDS
+import pandas as pd
 import pytest
 
 
@@ -63,6 +66,18 @@ def test_velocity_report(mock_velocity_report_with_id, mock_options, test_input,
             assert sprint.completed.value == e['completed']
 
 
+def test_velocity_report_frame(mock_velocity_report_with_id, mock_options):
+    vr = VelocityReport(options=mock_options, session=None, raw=mock_velocity_report_with_id)
+    frame = vr.frame()
+
+    assert [1, 2] == sorted(frame.index)
+    assert [11.0, 18.0] == list(frame.loc[[1, 2], 'estimated'])
+    assert [11.0, 16.0] == list(frame.loc[[1, 2], 'completed'])
+    assert 18.0 == vr.committed(2)
+    assert 16.0 == vr.completed('2')
+    assert math.isnan(vr.committed(3))
+
+
 def test_sprint_1_report_committed(sprint_1_report):
     assert 39.0 == sprint_1_report.committed
 
@@ -74,3 +89,185 @@ def test_sprint_2_report_committed(sprint_2_report):
 def test_sprint_6_report_committed(sprint_6_report):
     assert 68.0 == sprint_6_report.committed
 
+
+
+def estimated_issue(key, initial, current=None):
+    return {'key': key,
+            'estimateStatistic': {'statFieldValue': {'value': initial}},
+            'currentEstimateStatistic': {'statFieldValue': {'value': current} if current is not None else {}}}
+
+
+def test_estimate_index_first_match_and_stop():
+    issues = [estimated_issue('AV-1', 1.0, 2.0),
+              estimated_issue('AV-1', 5.0),
+              {'key': 'AV-2', 'estimateStatistic': {'statFieldValue': {}},
+               'currentEstimateStatistic': {'statFieldValue': {}}},
+              {'key': 'AV-3'},  # No estimateStatistic: nothing after it is indexed
+              estimated_issue('AV-4', 8.0)]
+
+    assert {'AV-1': (1.0, 2.0), 'AV-2': (0.0, 0.0)} == _estimate_index(issues)
+
+
+@patch.object(SprintReport, '_build_resource')
+@patch.object(JiraFieldMapper, '_build_field_name_map')
+def test_sprint_report_added_initial_estimate_index(mock_field_mapper, mock_build_resource,
+                                                    mock_options, mock_sprint_1_report_json):
+    contents = mock_sprint_1_report_json['contents']
+    contents['completedIssues'] = [estimated_issue('AV-1', 3.0, 2.0), estimated_issue('AV-2', 5.0)]
+    contents['issuesNotCompletedInCurrentSprint'] = [{'key': 'AV-9'}, estimated_issue('AV-3', 8.0)]
+    contents['puntedIssues'] = [estimated_issue('AV-1', 1.0)]
+    contents['issueKeysAddedDuringSprint'] = {'AV-1': True, 'AV-3': True}
+
+    sr = SprintReport(options=mock_options, session=None, raw=mock_sprint_1_report_json, added_sum=0)
+
+    # AV-1 in completed and punted, AV-3 hidden behind an issue without estimates
+    assert 4.0 == sr.issues_added_initial_estimate_sum
+    assert (3.0, 2.0) == sr.estimate('completedIssues', 'AV-1')
+    assert sr.estimate('issuesNotCompletedInCurrentSprint', 'AV-3') is None
+
+
+def test_sprint_report_added_sum(sprint_report):
+    # AV-14 (1.0) + AV-16 (2.0)
+    assert 3.0 == sprint_report.added_sum
+
+
+@patch.object(SprintReport, '_build_resource')
+@patch.object(JiraFieldMapper, '_build_field_name_map')
+@patch.object(JiraFieldMapper, 'jira_key')
+def test_sprint_report_added_single_search(mock_jira_key, mock_field_mapper, mock_build_resource,
+                                           mock_options, mock_sprint_report_with_id,
+                                           mock_issue_av14, mock_issue_av16):
+    mock_jira_key.return_value = 'customfield_10111'
+    mock_build_resource.return_value.raw = {'issues': [mock_issue_av14, mock_issue_av16]}
+
+    sr = SprintReport(options=mock_options, session=None, raw=mock_sprint_report_with_id)
+
+    assert 3.0 == sr.added_sum
+    mock_build_resource.assert_called_once()
+    (resource_format,), kwargs = mock_build_resource.call_args
+    assert 'search' == resource_format
+    assert 'key in (AV-14,AV-16)' == kwargs['params']['jql']
+    assert 'customfield_10111' == kwargs['params']['fields']
+
+
+@patch.object(SprintReport, '_build_resource')
+@patch.object(JiraFieldMapper, '_build_field_name_map')
+@patch.object(JiraFieldMapper, 'jira_key')
+def test_sprint_report_no_added_no_search(mock_jira_key, mock_field_mapper, mock_build_resource,
+                                          mock_options, mock_sprint_1_report_json):
+    mock_sprint_1_report_json['contents']['issueKeysAddedDuringSprint'] = {}
+
+    sr = SprintReport(options=mock_options, session=None, raw=mock_sprint_1_report_json)
+
+    assert 0 == sr.added_sum
+    mock_build_resource.assert_not_called()
+
+
+def test_chunk_issue_keys():
+    keys = [f'AV-{i}' for i in range(250)]
+
+    chunks = _chunk_issue_keys(keys, max_keys=100)
+    assert [100, 100, 50] == [len(c) for c in chunks]
+    assert keys == [k for c in chunks for k in c]
+
+    chunks = _chunk_issue_keys(keys, max_keys=100, max_length=60)
+    assert all(len(','.join(c)) < 60 for c in chunks)
+    assert keys == [k for c in chunks for k in c]
+
+
+def reference_cfd_counts(raw):
+    """Per-change column counts, computed the straightforward way."""
+    counts = [0] * len(raw['columns'])
+    rows = []
+    for value in raw['columnChanges'].values():
+        for change in value:
+            if 'columnFrom' in change:
+                counts[change['columnFrom']] -= 1
+            if 'columnTo' in change:
+                counts[change['columnTo']] += 1
+            rows.append(list(counts))
+    return rows
+
+
+def test_cfd_report(mock_cfd, mock_options):
+    cfd = CfdReport(options=mock_options, session=None, raw=dict(mock_cfd, id=1))
+    df = cfd.report()
+
+    titles = [c['name'] for c in mock_cfd['columns']]
+    assert ['date', 'key', 'from', 'to', 'status_to'] + titles == list(df.columns)
+    assert 'datetime64[ns]' == str(df['date'].dtype)
+    assert reference_cfd_counts(mock_cfd) == df[titles].values.tolist()
+
+    first = df.iloc[0]
+    assert pd.Timestamp('2021-03-17 07:09:38') == first['date']
+    assert ('JAMP-1', -1, 0, '10000') == (first['key'], first['from'], first['to'], first['status_to'])
+
+
+def test_cfd_report_grouped_and_unknown_changes(mock_options):
+    raw = {'id': 1,
+           'columns': [{'name': 'To Do'}, {'name': 'Done'}],
+           'columnChanges': {'1615964978999': [{'key': 'A-1', 'columnTo': 0, 'statusTo': '10000'},
+                                               {'key': 'A-2', 'columnTo': 0}],
+                             '1615964979000': [{'key': 'A-1', 'columnFrom': 0, 'columnTo': 1,
+                                                'statusTo': '10001'}],
+                             '1615964990000': [{'key': 'A-2', 'columnFrom': 0}]}}
+    df = CfdReport(options=mock_options, session=None, raw=raw).report()
+
+    assert reference_cfd_counts(raw) == df[['To Do', 'Done']].values.tolist()
+    assert [-1, -1, 0, 0] == list(df['from'])
+    assert [0, 0, 1, -1] == list(df['to'])
+    assert ['10000', -1, '10001', -1] == list(df['status_to'])
+    assert pd.Timestamp('2021-03-17 07:09:38') == df['date'][1]
+
+
+def test_cfd_report_empty(mock_options):
+    raw = {'id': 1, 'columns': [{'name': 'To Do'}], 'columnChanges': {}}
+    assert CfdReport(options=mock_options, session=None, raw=raw).report().empty
+
+
+@pytest.mark.parametrize("freq", ['D', 'W'])
+def test_cfd_resampled_report(mock_cfd, mock_options, freq):
+    cfd = CfdReport(options=mock_options, session=None, raw=dict(mock_cfd, id=1))
+    df = cfd.resampled_report(freq)
+    changes = cfd.report()
+    titles = [c['name'] for c in mock_cfd['columns']]
+
+    assert ['date'] + titles == list(df.columns)
+    first = pd.Timestamp(mock_cfd['firstChangeTime'], unit='ms').to_period(freq).start_time
+    assert first == df['date'].iloc[0]
+    assert df['date'].is_monotonic_increasing
+
+    # Each bucket holds the counts after the last change before the bucket ends
+    for _, row in df.iterrows():
+        bucket_end = pd.Period(row['date'], freq=freq).end_time
+        before = changes[changes['date'] <= bucket_end]
+        expected = before[titles].iloc[-1].tolist() if len(before) else [0] * len(titles)
+        assert expected == row[titles].tolist()
+
+    assert changes[titles].iloc[-1].tolist() == df[titles].iloc[-1].tolist()
+
+
+def test_cfd_daily_report_rows(mock_cfd, mock_options):
+    cfd = CfdReport(options=mock_options, session=None, raw=dict(mock_cfd, id=1))
+    df = cfd.resampled_report('D')
+
+    first = pd.Timestamp(mock_cfd['firstChangeTime'], unit='ms').normalize()
+    now = pd.Timestamp(mock_cfd['now'], unit='ms').normalize()
+    assert (now - first).days + 1 == len(df)
+
+
+def test_sprint_summary(sprint_report):
+    summary = SprintSummary.from_report(sprint_report, digest='abc')
+
+    assert sprint_report.sprint.name == summary.sprint_name
+    assert sprint_report.sprint.state == summary.sprint_state
+    for field in SUMMARY_FIELDS:
+        expected, value = getattr(sprint_report, field), getattr(summary, field)
+        assert (math.isnan(expected) and math.isnan(value)) or expected == value
+    assert 'abc' == summary.digest
+    assert not hasattr(summary, '__dict__')
+
+
+def test_sprint_report_contents_precomputed(sprint_report):
+    for item in COUNTS + list(STATS) + list(LISTS):
+        assert item in sprint_report.__dict__
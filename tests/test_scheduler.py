@@ -0,0 +1,225 @@
+import json
+import os
+import sys
+import threading
+import time
+from email.utils import formatdate
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+import pytest
+from jira import JIRAError
+
+from auth import JIRA_PASSWORD_ENV
+from benchmarks.standin import StandinServer, ReplayProgram
+from jamp.client import JIRAReports
+from jamp.scheduler import RequestScheduler, TokenBucket, request_priority, retry_after, \
+    PRIORITY_REPORT, PRIORITY_AGILE, PRIORITY_DEFAULT, PRIORITY_LOOKUP, PHASE_WAIT
+from metrics import JiraProgramMetrics
+
+
+def response(status_code=200, headers=None):
+    return MagicMock(status_code=status_code, headers=headers or {})
+
+
+def test_request_priority():
+    assert PRIORITY_REPORT == request_priority(
+        'http://jira/rest/greenhopper/1.0/rapid/charts/sprintreport?rapidViewId=1&sprintId=2')
+    assert PRIORITY_AGILE == request_priority('http://jira/rest/agile/1.0/board/1/sprint')
+    assert PRIORITY_LOOKUP == request_priority('http://jira/rest/api/2/search?jql=key+in+(AV-1)')
+    assert PRIORITY_DEFAULT == request_priority('http://jira/rest/api/2/serverInfo')
+
+
+def test_retry_after():
+    assert retry_after(response()) is None
+    assert retry_after(None) is None
+    assert 7.0 == retry_after(response(headers={'Retry-After': '7'}))
+    assert 0 < retry_after(response(headers={'Retry-After': formatdate(time.time() + 30, usegmt=True)})) <= 30
+    assert retry_after(response(headers={'Retry-After': 'soon'})) is None
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=10.0, burst=2.0, now=0.0)
+    assert 0.0 == bucket.take(0.0)
+    assert 0.0 == bucket.take(0.0)
+    assert pytest.approx(0.1) == bucket.take(0.0)
+    assert 0.0 == bucket.take(0.1)
+
+
+def test_scheduler_rate_limit():
+    scheduler = RequestScheduler(rate=50.0, burst=1.0)
+    request = MagicMock(return_value=response())
+
+    start = time.monotonic()
+    for _ in range(6):
+        scheduler.send(request, 'GET', 'http://jira/rest/api/2/field')
+
+    assert 6 == request.call_count
+    assert time.monotonic() - start >= 0.09
+
+
+def test_scheduler_aimd():
+    scheduler = RequestScheduler(max_concurrency=8, min_concurrency=2, max_retries=0)
+
+    scheduler.send(MagicMock(return_value=response(429)), 'GET', 'http://jira/rest/api/2/field')
+    assert 4 == scheduler.concurrency
+    scheduler.send(MagicMock(return_value=response(429)), 'GET', 'http://jira/rest/api/2/field')
+    scheduler.send(MagicMock(return_value=response(429)), 'GET', 'http://jira/rest/api/2/field')
+    assert 2 == scheduler.concurrency
+    assert 3 == scheduler.throttled
+
+    # Additive increase: about one slot per round of successful requests
+    ok = MagicMock(return_value=response())
+    for _ in range(6):
+        scheduler.send(ok, 'GET', 'http://jira/rest/api/2/field')
+    assert 4 == scheduler.concurrency
+    for _ in range(100):
+        scheduler.send(ok, 'GET', 'http://jira/rest/api/2/field')
+    assert 8 == scheduler.concurrency
+
+
+def test_scheduler_retries():
+    sleeps = []
+    scheduler = RequestScheduler(max_retries=2, sleep=sleeps.append)
+    request = MagicMock(side_effect=[response(502), response(429, {'Retry-After': '0'}), response()])
+
+    assert 200 == scheduler.send(request, 'GET', 'http://jira/rest/api/2/field').status_code
+    assert 2 == scheduler.retried
+    # Only the 502 sleeps on its own thread; the 429 pauses every request
+    assert 1 == len(sleeps)
+
+    # The retries run out, or the Retry-After is too long to wait for
+    request = MagicMock(return_value=response(503, {'Retry-After': '0'}))
+    assert 503 == scheduler.send(request, 'GET', 'http://jira/rest/api/2/field').status_code
+    assert 3 == request.call_count
+    request = MagicMock(return_value=response(429, {'Retry-After': '3600'}))
+    assert 429 == scheduler.send(request, 'GET', 'http://jira/rest/api/2/field').status_code
+    assert 1 == request.call_count
+
+
+def test_scheduler_priority():
+    scheduler = RequestScheduler(max_concurrency=1)
+    started = threading.Event()
+    release = threading.Event()
+    order = []
+
+    def request(method, url):
+        order.append(url)
+        if url == 'first':
+            started.set()
+            release.wait(5)
+        return response()
+
+    def send(url):
+        scheduler.send(request, 'GET', url)
+
+    threads = [threading.Thread(target=send, args=('first',))]
+    threads[0].start()
+    started.wait(5)
+    for url in ('/rest/api/2/search', '/rest/agile/1.0/board', '/rest/greenhopper/1.0/rapid/charts/sprintreport'):
+        threads.append(threading.Thread(target=send, args=(url,)))
+        threads[-1].start()
+        time.sleep(0.05)
+
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert ['first',
+            '/rest/greenhopper/1.0/rapid/charts/sprintreport',
+            '/rest/agile/1.0/board',
+            '/rest/api/2/search'] == order
+
+
+class Session:
+    def __init__(self):
+        self.max_retries = 3
+
+    def request(self, method, url, **kwargs):
+        return MagicMock(status_code=200, content=b'{}')
+
+
+def test_scheduler_profiled_requests_exclude_waits(global_profiler):
+    global_profiler.enable()
+    session = Session()
+    # Instrumented beneath the scheduler, as ScheduledJIRA and metrics.py do
+    global_profiler.instrument(session)
+    RequestScheduler(rate=20.0, burst=1.0).attach(session)
+
+    for _ in range(4):
+        session.request('GET', 'http://jira/rest/api/2/field')
+
+    summary = global_profiler.summary()
+    endpoint = summary['endpoints']['/rest/api/2/field']
+    assert 4 == endpoint['count']
+    assert endpoint['total'] < 0.05
+    # Three of the requests wait about 50 ms for a token
+    assert 4 == summary['phases'][PHASE_WAIT]['count']
+    assert summary['phases'][PHASE_WAIT]['total'] >= 0.12
+    assert 0 == summary['phases'][PHASE_WAIT]['requests']
+
+
+def test_scheduler_standin_throttled():
+    scheduler = RequestScheduler(max_concurrency=4, max_retries=10)
+    with StandinServer(ReplayProgram(), retry_after=0, seed=1) as server:
+        reports = JIRAReports(server=server.url, basic_auth=('bench', 'x'), scheduler=scheduler)
+        assert 0 == reports._session.max_retries
+
+        server.throttle_rate = 0.3
+        for sprint_id in (1000, 1001, 1002):
+            assert sprint_id == reports.sprint_report(board_id=1, sprint_id=sprint_id).sprint_id
+
+        server.throttle_rate = 1.0
+        with pytest.raises(JIRAError) as err:
+            reports.sprint_report(board_id=1, sprint_id=1000)
+
+    assert 429 == err.value.status_code
+    assert 0 < scheduler.throttled == server.statuses[429]
+
+
+def test_metrics_rate_limit(tmp_path, capsys):
+    args = ['metrics.py',
+            '--user', 'bench',
+            '--no-cache',
+            '--workers', '4',
+            '--rate_limit', '0',
+            '--file', str(tmp_path / 'sprints.csv'),
+            '--image', str(tmp_path / 'sprints.png')]
+
+    with StandinServer(ReplayProgram(boards=2, sprints=4), throttle_rate=0.2, retry_after=0, seed=3) as server:
+        with patch.object(sys, 'argv', args + ['--server', server.url]), \
+                patch.dict(os.environ, {JIRA_PASSWORD_ENV: 'bench'}):
+            JiraProgramMetrics().run()
+
+    assert server.statuses[429] > 0
+    assert 8 == len(pd.read_csv(tmp_path / 'sprints.csv'))
+    assert 'Request scheduler:' in capsys.readouterr().out
+
+
+def test_metrics_rate_limit_profile(global_profiler, tmp_path):
+    json_file = str(tmp_path / 'profile.json')
+    args = ['metrics.py',
+            '--user', 'bench',
+            '--no-cache',
+            '--workers', '4',
+            '--rate_limit', '0',
+            '--profile_json', json_file,
+            '--file', str(tmp_path / 'sprints.csv'),
+            '--image', str(tmp_path / 'sprints.png')]
+
+    # Every Retry-After pause is one second, far longer than any stand-in request
+    with StandinServer(ReplayProgram(boards=2, sprints=4), throttle_rate=0.2, retry_after=1, seed=3) as server:
+        with patch.object(sys, 'argv', args + ['--server', server.url]), \
+                patch.dict(os.environ, {JIRA_PASSWORD_ENV: 'bench'}):
+            JiraProgramMetrics().run()
+
+    with open(json_file) as f:
+        summary = json.load(f)
+
+    assert server.statuses[429] > 0
+    assert summary['phases'][PHASE_WAIT]['total'] >= 1.0
+    # Request timings exclude the pauses, and each retry is timed on its own
+    for name, endpoint in summary['endpoints'].items():
+        assert endpoint['p95'] < 1.0, name
+    assert server.requests['sprint_report'] == \
+        summary['endpoints']['/rest/greenhopper/1.0/rapid/charts/sprintreport']['count']
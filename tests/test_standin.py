@@ -0,0 +1,60 @@
+from datetime import datetime
+
+import pytest
+from jira import JIRA, JIRAError
+
+from benchmarks.standin import StandinServer, ReplayProgram, story_points
+from jamp.client import JIRAReports
+
+
+@pytest.fixture
+def standin():
+    with StandinServer(ReplayProgram(boards=2, sprints=4, cfd_transitions=200)) as server:
+        yield server
+
+
+def test_standin_agile_pages(standin):
+    jira = JIRA(server=standin.url, basic_auth=('bench', 'x'), options={'agile_rest_path': 'agile'})
+
+    assert ['Board 1', 'Board 2'] == [b.name for b in jira.boards()]
+    sprints = jira.sprints(board_id=2, maxResults=None)
+    assert [2000, 2001, 2002, 2003] == [s.id for s in sprints]
+    assert ['closed', 'closed', 'closed', 'active'] == [s.state for s in sprints]
+
+
+def test_standin_reports(standin):
+    reports = JIRAReports(server=standin.url, basic_auth=('bench', 'x'))
+
+    sr = reports.sprint_report(board_id=1, sprint_id=1001)
+    assert 'Board 1 Sprint 2' == sr.sprint.name
+    # The added issue is looked up with a 'search' request
+    assert story_points('IDAP-1275') == sr.added_sum
+
+    vr = reports.velocity_report(board_id=1, finished_after=datetime(2019, 1, 1),
+                                 finished_before=datetime(2021, 1, 1))
+    assert [1002, 1001, 1000] == [sprint['id'] for sprint in vr.raw['sprints']]
+
+    cfd = reports.cfd_report(board_id=2)
+    assert 'Board 2' == cfd.board_name
+    assert 200 == len(cfd.report())
+
+    # The field map is one more 'search', and two years of velocity are three windows
+    assert {'server_info': 1, 'fields': 1, 'sprint_report': 1, 'search': 2, 'velocity': 3,
+            'board_config': 1, 'cfd': 1} == standin.requests
+
+
+@pytest.mark.parametrize("throttle_rate, error_rate, status", [(1.0, 0.0, 429), (0.0, 1.0, 500)])
+def test_standin_injected_failures(throttle_rate, error_rate, status):
+    with StandinServer(ReplayProgram(), retry_after=7) as server:
+        reports = JIRAReports(server=server.url, basic_auth=('bench', 'x'))
+        server.statuses.clear()
+        server.throttle_rate = throttle_rate
+        server.error_rate = error_rate
+
+        with pytest.raises(JIRAError) as err:
+            reports.sprint_report(board_id=1, sprint_id=1000)
+
+    assert status == err.value.status_code
+    if status == 429:
+        assert '7' == err.value.response.headers['Retry-After']
+    assert {status: 1} == server.statuses
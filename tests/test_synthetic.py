@@ -0,0 +1,72 @@
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+from benchmarks.standin import StandinServer, story_points
+from benchmarks.synthetic import SyntheticProgram
+from jamp.client import JIRAReports
+from jamp.resources import CfdReport
+
+
+def payloads(program):
+    return json.dumps([program.sprint_report(1, 1003), program.velocity(1), program.cfd(1)])
+
+
+def test_synthetic_program_is_deterministic():
+    assert payloads(SyntheticProgram(sprints=5, seed=3)) == payloads(SyntheticProgram(sprints=5, seed=3))
+    assert payloads(SyntheticProgram(sprints=5, seed=3)) != payloads(SyntheticProgram(sprints=5, seed=4))
+
+    # Sprints don't depend on the order they are generated in
+    program = SyntheticProgram(sprints=5, seed=3)
+    later = program.sprint_report(1, 1004)
+    assert json.dumps(later) == json.dumps(SyntheticProgram(sprints=5, seed=3).sprint_report(1, 1004))
+
+
+@pytest.mark.parametrize("added_ratio, punted_ratio", [(0.0, 0.0), (0.5, 0.2)])
+def test_synthetic_sprint_churn(added_ratio, punted_ratio):
+    program = SyntheticProgram(sprints=3, issues=40, added_ratio=added_ratio, punted_ratio=punted_ratio)
+    contents = program.sprint_report(1, 1001)['contents']
+
+    issues = [issue for name in ('completedIssues', 'issuesNotCompletedInCurrentSprint', 'puntedIssues')
+              for issue in contents[name]]
+    assert 40 + round(40 * added_ratio) == len(issues)
+    assert round(40 * added_ratio) == len(contents['issueKeysAddedDuringSprint'])
+    assert (punted_ratio == 0) == (len(contents['puntedIssues']) == 0)
+
+    completed = sum(i['currentEstimateStatistic']['statFieldValue']['value'] for i in contents['completedIssues'])
+    assert completed == contents['completedIssuesEstimateSum']['value']
+
+
+def test_synthetic_program_served():
+    program = SyntheticProgram(boards=2, sprints=4, issues=20, seed=1)
+
+    with StandinServer(program) as server:
+        reports = JIRAReports(server=server.url, basic_auth=('bench', 'x'))
+        sr = reports.sprint_report(board_id=2, sprint_id=2002)
+        vr = reports.velocity_report(board_id=2, finished_after=datetime(2019, 12, 1))
+        cfd = reports.cfd_report(board_id=2)
+
+    added = program.sprint_report(2, 2002)['contents']['issueKeysAddedDuringSprint']
+    assert sum(story_points(key) for key in added) == sr.added_sum
+    assert vr.committed(2002) == sr.committed
+    assert vr.completed(2002) == sr.completedIssuesEstimateSum
+
+    # Every issue is created into the first column once
+    df = cfd.report()
+    created = df[df['from'] == -1]
+    assert created['key'].is_unique
+    assert df['date'].is_monotonic_increasing
+    assert list(df.iloc[-1][cfd.column_names()]) == list(CfdReport(
+        options={'agile_rest_path': None, 'server': 'localhost', 'agile_rest_api_version': '2'},
+        session=None, raw=dict(program.cfd(2), id=2)).column_counts()[-1])
+
+
+def test_synthetic_program_write(tmp_path):
+    program = SyntheticProgram(boards=2, sprints=3)
+    count = program.write(str(tmp_path))
+
+    assert count == len(os.listdir(tmp_path))
+    with open(tmp_path / 'board_2_sprint_2001_report.json') as f:
+        assert program.sprint_report(2, 2001) == json.load(f)